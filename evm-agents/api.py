@@ -1,26 +1,47 @@
-import os
+import asyncio
 import json
 import logging
-from typing import Dict, List, Any, Optional
-from fastapi import FastAPI, HTTPException
+import time
+import uuid
+from typing import Dict, List, Any, Literal, Optional
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('evm_agents.log')
-    ]
-)
+from log_setup import configure_logging, request_id_var
+
+# Configure logging: JSON lines written by a background thread, rotated by size
+configure_logging('evm_agents.log')
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
+from sessions import create_session_store, new_session_id
+from jobs import JobQueue, QueueFullError, create_job_store
+from metrics import REQUEST_SECONDS, collect_spans, render_metrics
+from node_pool import NodePool
+from ttl_cache import CHAINS_CACHE_TTL, TOKENS_CACHE_TTL, TTLCache
+
+# Server-side prompt dialogue for clients that opt into sessions
+session_store = create_session_store()
+
+def _run_code_job(payload: Dict[str, Any], on_stage) -> Dict[str, Any]:
+    """Job handler for /code/jobs, run in a worker thread"""
+    from coder import code
+    return code(prompt=payload["prompt"], cache=payload["cache"], on_stage=on_stage)
+
+# Background /code generation for clients that submit and poll
+code_jobs = JobQueue(_run_code_job, create_job_store())
+
+# Long-lived node processes serving transactions.js for /chains, /tokens and /quote
+node_pool = NodePool()
+
+# Chains and token lists change rarely, so they are cached per process
+lifi_cache = TTLCache()
+
 # Initialize FastAPI
 app = FastAPI(
     title="EVM Agents API",
@@ -37,18 +58,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    """Tag log records with a request id, log the duration and observe it in the HTTP latency histogram"""
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:16]
+    token = request_id_var.set(request_id)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, method=request.method, status=status)
+        logger.info("Request finished", extra={
+            "method": request.method, "endpoint": endpoint, "status": status, "duration_ms": round(elapsed * 1000, 1)
+        })
+        request_id_var.reset(token)
+
 class PromptRequest(BaseModel):
     prompt: str
     history: Optional[List[str]] = Field(default_factory=list)
+    session_id: Optional[str] = None  # Continue a server-side session; history is then not sent or returned
+    use_session: bool = False  # Start a new server-side session when no session_id is given
+    trace: bool = False  # Include per-stage timings (spans) in the response
 
 class CodeRequest(BaseModel):
     prompt: str
     history: Optional[List[str]] = Field(default_factory=list)
+    cache: Literal["default", "bypass"] = "default"  # "bypass" regenerates instead of serving cached code
+    trace: bool = False  # Include per-stage timings (spans) in the response
+
+@app.on_event("startup")
+async def startup():
+    """Start the node worker pool and the code job workers"""
+    await node_pool.start()
+    await code_jobs.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop the node and code job workers and release the session and job stores"""
+    await code_jobs.close()
+    await node_pool.close()
+    await session_store.close()
+
+def _stage_summary(spans: List[Dict[str, Any]]) -> str:
+    return ", ".join(f"{s['stage']}={s['ms']}ms" for s in spans if "ms" in s) or "no stages"
 
 @app.get("/")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy"}
+    return {"status": "healthy", "node_pool": node_pool.stats()}
 
 @app.post("/prompt", summary="Evaluate and improve a trading agent prompt")
 async def process_prompt(request: PromptRequest):
@@ -56,7 +120,7 @@ async def process_prompt(request: PromptRequest):
     Process a trading agent prompt, evaluate it, and provide improvement suggestions.
     
     Args:
-        request: PromptRequest containing the prompt and optional history
+        request: PromptRequest containing the prompt and optional history or session
         
     Returns:
         Dict containing the evaluation results and improvement suggestions
@@ -65,13 +129,39 @@ async def process_prompt(request: PromptRequest):
     
     try:
         from prompt import improve_prompt
-        result = improve_prompt(prompt=request.prompt, history=request.history)
-        logger.info("Prompt processing completed successfully")
+        session_id = request.session_id or (new_session_id() if request.use_session else None)
+        history = request.history
+        if session_id:
+            history = await session_store.get(session_id) or []
+
+        with collect_spans() as spans:
+            result = await asyncio.to_thread(improve_prompt, prompt=request.prompt, history=history)
+        logger.info(f"Prompt processing completed successfully: {_stage_summary(spans)}")
+        if request.trace:
+            result["spans"] = spans
+
+        if session_id:
+            await session_store.set(session_id, result.pop("history"))
+            result["session_id"] = session_id
         return result
     except Exception as e:
         logger.error(f"Error processing prompt: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.delete("/session/{session_id}", summary="End a server-side prompt session")
+async def end_session(session_id: str):
+    """
+    Delete a server-side prompt session.
+    
+    Args:
+        session_id: Session to delete
+        
+    Returns:
+        Dict confirming the deletion
+    """
+    await session_store.delete(session_id)
+    return {"status": "deleted", "session_id": session_id}
+
 @app.post("/code", summary="Generate code for a trading agent")
 async def generate_code(request: CodeRequest):
     """
@@ -87,13 +177,64 @@ async def generate_code(request: CodeRequest):
     
     try:
         from coder import code
-        result = code(prompt=request.prompt)
-        logger.info("Code generation completed successfully")
+        with collect_spans() as spans:
+            # In a worker thread, so job polls and stage callbacks aren't stuck behind the LLM calls
+            result = await asyncio.to_thread(code, prompt=request.prompt, cache=request.cache)
+        logger.info(f"Code generation completed successfully (cache: {result.get('cache')}): {_stage_summary(spans)}")
+        if request.trace:
+            result["spans"] = spans
         return result
     except Exception as e:
         logger.error(f"Error generating code: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/code/jobs", status_code=202, summary="Submit a code generation job")
+async def submit_code_job(request: CodeRequest):
+    """
+    Queue code generation and return immediately. Poll GET /code/jobs/{job_id}
+    for progress and the result.
+    
+    Args:
+        request: CodeRequest containing the prompt and optional cache mode
+        
+    Returns:
+        Dict containing the job id and its initial status
+    """
+    try:
+        job = await code_jobs.submit({"prompt": request.prompt, "cache": request.cache})
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=f"Too many queued jobs: {str(e)}")
+    logger.info(f"Queued code job {job['id']} for prompt: {request.prompt[:100]}...")
+    return {"job_id": job["id"], "status": job["status"], "poll": f"/code/jobs/{job['id']}"}
+
+@app.get("/code/jobs/{job_id}", summary="Get the status of a code generation job")
+async def get_code_job(job_id: str):
+    """
+    Get a job's status, the stages completed so far and, once finished, the
+    generated code (result) or error.
+    
+    Args:
+        job_id: Id returned by POST /code/jobs
+        
+    Returns:
+        Dict containing the job record
+    """
+    job = await code_jobs.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@app.get("/code/cache", summary="Generated code cache statistics")
+async def code_cache_stats():
+    """
+    Hit-rate counters and size of the generated code cache.
+
+    Returns:
+        Dict of counters, entry count and bytes used
+    """
+    from coder import CODE_CACHE
+    return CODE_CACHE.stats()
+
 @app.get("/chains", summary="Get supported chains information")
 async def get_chains():
     """
@@ -105,21 +246,7 @@ async def get_chains():
     logger.info("Getting supported chains information...")
     
     try:
-        # Execute the JavaScript code to get chains data
-        import subprocess
-        import json
-        
-        process = subprocess.run(
-            ["node", "-e", "require('./transactions').getChains().then(data => console.log(JSON.stringify(data)))"],
-            capture_output=True,
-            text=True,
-            cwd=os.path.dirname(os.path.abspath(__file__))
-        )
-        
-        if process.returncode != 0:
-            raise Exception(f"Failed to get chains: {process.stderr}")
-        
-        chains_data = json.loads(process.stdout)
+        chains_data = await lifi_cache.get("chains", lambda: node_pool.call("getChains"), CHAINS_CACHE_TTL)
         logger.info("Retrieved chains information successfully")
         return {"chains": chains_data}
     except Exception as e:
@@ -140,27 +267,35 @@ async def get_tokens(chain_id: int):
     logger.info(f"Getting tokens for chain ID: {chain_id}...")
     
     try:
-        # Execute the JavaScript code to get tokens data
-        import subprocess
-        import json
-        
-        process = subprocess.run(
-            ["node", "-e", f"require('./transactions').getTokens({{chainId: {chain_id}}}).then(data => console.log(JSON.stringify(data)))"],
-            capture_output=True,
-            text=True,
-            cwd=os.path.dirname(os.path.abspath(__file__))
+        tokens_data = await lifi_cache.get(
+            ("tokens", chain_id),
+            lambda: node_pool.call("getTokens", {"chainId": chain_id}),
+            TOKENS_CACHE_TTL
         )
-        
-        if process.returncode != 0:
-            raise Exception(f"Failed to get tokens: {process.stderr}")
-        
-        tokens_data = json.loads(process.stdout)
         logger.info(f"Retrieved tokens for chain ID {chain_id} successfully")
         return {"tokens": tokens_data}
     except Exception as e:
         logger.error(f"Error getting tokens for chain {chain_id}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics", summary="Prometheus metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Stage and request latency histograms and token counters, in the Prometheus
+    text format.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/metrics", summary="Chains and tokens cache metrics")
+async def cache_metrics():
+    """
+    Hit, miss and refresh counters for the chains and tokens cache.
+
+    Returns:
+        Dict of counters, entry count and hit ratio
+    """
+    return lifi_cache.stats()
+
 @app.post("/quote", summary="Get a quote for swapping tokens")
 async def get_quote(request: dict):
     """
@@ -175,21 +310,7 @@ async def get_quote(request: dict):
     logger.info(f"Getting quote: {json.dumps(request)[:100]}...")
     
     try:
-        # Execute the JavaScript code to get quote
-        import subprocess
-        import json
-        
-        process = subprocess.run(
-            ["node", "-e", f"require('./transactions').getQuote({json.dumps(request)}).then(data => console.log(JSON.stringify(data)))"],
-            capture_output=True,
-            text=True,
-            cwd=os.path.dirname(os.path.abspath(__file__))
-        )
-        
-        if process.returncode != 0:
-            raise Exception(f"Failed to get quote: {process.stderr}")
-        
-        quote_data = json.loads(process.stdout)
+        quote_data = await node_pool.call("getQuote", request)
         logger.info("Retrieved quote successfully")
         return quote_data
     except Exception as e:
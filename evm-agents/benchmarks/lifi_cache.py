@@ -0,0 +1,57 @@
+"""
+Upstream fetches and latency for the chains/tokens cache under concurrent load.
+
+A fake fetch with fixed latency stands in for LiFi. Checks that a burst of
+concurrent requests for one chain causes a single fetch, that stale entries are
+served without waiting while one background refresh runs, and reports latency.
+
+Usage (from evm-agents/):
+    python -m benchmarks.lifi_cache --concurrency 100 --latency 0.2
+"""
+import argparse
+import asyncio
+import time
+
+from ttl_cache import TTLCache
+
+
+async def main(concurrency: int, latency: float) -> None:
+    fetches = 0
+
+    async def fetch_tokens():
+        nonlocal fetches
+        fetches += 1
+        await asyncio.sleep(latency)
+        return {"1": [{"symbol": "USDC"}]}
+
+    cache = TTLCache(stale=60)
+    key = ("tokens", 1)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(cache.get(key, fetch_tokens, ttl=0.5) for _ in range(concurrency)))
+    cold = time.perf_counter() - start
+    assert fetches == 1, f"expected 1 upstream fetch for a cold burst, got {fetches}"
+    print(f"cold burst of {concurrency}: {fetches} fetch, {cold * 1000:.1f}ms")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(cache.get(key, fetch_tokens, ttl=0.5) for _ in range(concurrency)))
+    print(f"warm burst of {concurrency}: {fetches} fetch total, {(time.perf_counter() - start) * 1000:.2f}ms")
+
+    await asyncio.sleep(0.6)  # Let the entry go stale
+    start = time.perf_counter()
+    await asyncio.gather(*(cache.get(key, fetch_tokens, ttl=0.5) for _ in range(concurrency)))
+    stale = time.perf_counter() - start
+    assert stale < latency, "stale entries should be served without waiting for the refresh"
+    await asyncio.sleep(latency * 1.5)
+    assert fetches == 2, f"expected one background refresh, got {fetches - 1}"
+    print(f"stale burst of {concurrency}: served in {stale * 1000:.2f}ms, 1 background refresh")
+
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.latency))
@@ -0,0 +1,72 @@
+"""
+Requests per second: a node subprocess per request vs the persistent worker pool.
+
+Both sides call the worker's "ping" method so no LiFi traffic is involved; what is
+measured is the fixed cost of getting a request into node and the answer back. The
+per-request side spawns `node -e "require('./transactions')..."` exactly like the old
+endpoints did, including module loading, and runs it inline as the old async
+handlers did, so it also blocks the event loop.
+
+Requires `npm install` in evm-agents/ so transactions.js can load.
+
+Usage (from evm-agents/):
+    python -m benchmarks.node_pool --requests 100 --concurrency 1 8 32
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import time
+
+from node_pool import NodePool
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPAWN_SCRIPT = "require('./transactions'); Promise.resolve('pong').then(data => console.log(JSON.stringify(data)))"
+
+
+async def _spawn_once() -> None:
+    process = subprocess.run(["node", "-e", SPAWN_SCRIPT], capture_output=True, text=True, cwd=SERVICE_DIR)
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr)
+
+
+async def _pool_once(pool: NodePool) -> None:
+    await pool.call("ping")
+
+
+async def _drive(call, requests: int, concurrency: int) -> float:
+    """
+    Issue `requests` calls with at most `concurrency` in flight; return req/s.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await call()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+async def main(requests: int, concurrency_levels, pool_size: int) -> None:
+    pool = NodePool(pool_size)
+    await pool.start()
+    try:
+        await pool.call("ping")  # Warm up
+        print(f"{'concurrency':>11}  {'subprocess req/s':>16}  {'pool req/s':>10}  {'speedup':>7}")
+        for concurrency in concurrency_levels:
+            spawn_rps = await _drive(_spawn_once, requests, concurrency)
+            pool_rps = await _drive(lambda: _pool_once(pool), requests, concurrency)
+            print(f"{concurrency:>11}  {spawn_rps:>16.1f}  {pool_rps:>10.1f}  {pool_rps / spawn_rps:>6.1f}x")
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--pool-size", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.pool_size))
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# SQLite file holding generated code, relative to this service
+CODE_CACHE_PATH = os.getenv("CODE_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "code_cache.sqlite3"))
+# Total size of cached outputs before least recently used entries are evicted
+CODE_CACHE_MAX_BYTES = int(os.getenv("CODE_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Canonical form of a strategy prompt: Unicode-normalized with whitespace collapsed.
+    Case is kept, since account names and addresses can be case-sensitive.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", prompt)).strip()
+
+
+def fingerprint(*parts: str) -> str:
+    """
+    Short stable hash of everything that shapes the generated code (prompt
+    templates, docs, token list, model names), used as the cache version.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class CodeCache:
+    """
+    Persistent, content-addressed store of validated /code outputs. Entries are
+    keyed by sha256(version, normalized prompt) and evicted least recently used
+    first once their total size passes `max_bytes`.
+    """
+
+    def __init__(self, version: str, path: str = CODE_CACHE_PATH, max_bytes: int = CODE_CACHE_MAX_BYTES):
+        self.version = version
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        """
+        The SQLite connection, opened on first use so that importing coder does
+        not create the file. Callers hold self._lock.
+        """
+        if self._conn is None:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS code_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS code_cache_last_used ON code_cache (last_used)")
+            db.commit()
+            self._conn = db
+        return self._conn
+
+    def key(self, prompt: str) -> str:
+        return hashlib.sha256(f"{self.version}\0{normalize_prompt(prompt)}".encode()).hexdigest()
+
+    def get(self, prompt: str) -> Optional[Dict[str, Any]]:
+        key = self.key(prompt)
+        with self._lock:
+            row = self._db.execute("SELECT value FROM code_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE code_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, prompt: str, output: Dict[str, Any]) -> None:
+        """
+        Store a validated output. Callers must only pass code that passed validation.
+        """
+        value = json.dumps(output, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO code_cache (key, value, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (self.key(prompt), value, len(value.encode()), now, now)
+            )
+            self.stores += 1
+            self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM code_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM code_cache ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM code_cache WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self.bypasses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM code_cache").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
@@ -1,7 +1,7 @@
 import os
 import json
 import requests
-from typing import Dict, List, Any, Optional, Union, Tuple
+from typing import Callable, Dict, List, Any, Optional, Union, Tuple
 
 # LangChain imports
 from langchain.agents import Tool, AgentExecutor, create_openai_functions_agent
@@ -15,6 +15,9 @@ from langchain_core.runnables.history import RunnableWithMessageHistory
 # Set your OpenAI API key
 from dotenv import load_dotenv
 
+from code_cache import CodeCache, fingerprint
+from metrics import record_message_tokens, span
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -434,20 +437,7 @@ async function executeTransaction(transaction, wallet) {
 [/CODE]
 """
 
-def code(prompt: str) -> Dict[str, Any]:
-    """
-    Generate code for a trading agent based on the provided prompt.
-    
-    Args:
-        prompt: The trading agent prompt to generate code for
-        
-    Returns:
-        Dict containing the generated code and execution interval
-    """
-    model = ChatOpenAI(model="o4-mini")
-
-    prompt_template = ChatPromptTemplate.from_messages([
-        ("system", """
+CODER_PROMPT = """
         You are <Agent EVM>, a trading agent launcher created by Xade for EVM chains.
 
         Your task is to generate code to run on a serverless function to execute a user's trading positions across various EVM chains using the LiFi protocol.
@@ -509,19 +499,56 @@ def code(prompt: str) -> Dict[str, Any]:
             > - Do not implement the continuous execution logic. That will be handled by the AWS Lambda function.
             > - Remove all comments from the code except those needed for understanding complex operations.
             > - Make sure to convert all token amounts to their smallest unit (wei, etc.) using the token's decimals.
-        """),
+        """
+
+CODER_MODEL = "o4-mini"
+
+# Validated outputs by prompt. The version changes whenever the prompt, docs, token
+# list or model change, so stale code is never served after a deploy.
+CODE_CACHE = CodeCache(fingerprint(CODER_PROMPT, TRANSACTIONS_CODE, TRANSACTIONS_USAGE, TOKENS, BASELINE_JS, CODER_MODEL))
+
+def _no_stage(stage: str, data: Dict[str, Any]) -> None:
+    pass
+
+def code(prompt: str, cache: str = "default", on_stage: Callable[[str, Dict[str, Any]], None] = _no_stage) -> Dict[str, Any]:
+    """
+    Generate code for a trading agent based on the provided prompt.
+    
+    Args:
+        prompt: The trading agent prompt to generate code for
+        cache: "bypass" to regenerate instead of serving cached code
+        on_stage: Called with (stage name, partial result) as each stage finishes
+        
+    Returns:
+        Dict containing the generated code and execution interval
+    """
+    if cache == "bypass":
+        CODE_CACHE.record_bypass()
+    else:
+        cached = CODE_CACHE.get(prompt)
+        if cached is not None:
+            return {**cached, "cache": "hit"}
+
+    model = ChatOpenAI(model=CODER_MODEL)
+
+    prompt_template = ChatPromptTemplate.from_messages([
+        ("system", CODER_PROMPT),
         ("human", "{input}")
     ])
 
-    formatted_prompt = prompt_template.format(
-        input=prompt,
-        TRANSACTIONS_CODE=TRANSACTIONS_CODE,
-        TRANSACTIONS_USAGE=TRANSACTIONS_USAGE,
-        TOKENS=TOKENS,
-        BASELINE_JS=BASELINE_JS
-    )
+    with span("prompt_render", endpoint="code"):
+        formatted_prompt = prompt_template.format(
+            input=prompt,
+            TRANSACTIONS_CODE=TRANSACTIONS_CODE,
+            TRANSACTIONS_USAGE=TRANSACTIONS_USAGE,
+            TOKENS=TOKENS,
+            BASELINE_JS=BASELINE_JS
+        )
 
-    response = model.invoke(formatted_prompt).content
+    with span("llm_generate", model=CODER_MODEL, endpoint="code"):
+        message = model.invoke(formatted_prompt)
+    record_message_tokens(CODER_MODEL, message)
+    response = message.content
 
     if response.startswith('```json'):
         response = response.replace('```json', '').replace('```', '').strip()
@@ -529,11 +556,17 @@ def code(prompt: str) -> Dict[str, Any]:
         response = response.replace('```', '').strip()
     
     try:
-        result = json.loads(response)
-        return {
+        with span("json_parse", endpoint="code"):
+            result = json.loads(response)
+        output = {
             "code": result['code'],
             "interval": result['interval']
-        } 
+        }
+        on_stage("generate", output)
+        # Only well-formed outputs with both fields are cached
+        if output["code"] and output["interval"]:
+            CODE_CACHE.put(prompt, output)
+        return {**output, "cache": "bypass" if cache == "bypass" else "miss"}
     except json.JSONDecodeError:
         return {
             "error": "Failed to parse response as JSON",
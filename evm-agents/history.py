@@ -0,0 +1,82 @@
+import json
+import os
+from typing import Any, Dict, List
+
+# Token budget for the dialogue history sent back to the model on each round
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+# Share of the budget reserved for the rolling summary of evicted turns
+SUMMARY_SHARE = 0.25
+# Rough characters-per-token ratio for English prompts
+CHARS_PER_TOKEN = 4
+# Characters of an evicted draft kept in the summary
+DRAFT_SNIPPET_CHARS = 120
+
+SUMMARY_PREFIX = "Summary: "
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate, good enough for budgeting.
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _condense(entry: str) -> str:
+    """
+    One-line digest of a history entry that is being evicted.
+    """
+    if entry.startswith(SUMMARY_PREFIX):
+        return entry[len(SUMMARY_PREFIX):]
+    if entry.startswith("AI: "):
+        try:
+            result = json.loads(entry[4:])
+            questions = " / ".join(result.get("questions") or [])
+            return f"rated {result.get('rating')}; asked: {questions or 'nothing'}"
+        except (ValueError, AttributeError):
+            pass
+    if entry.startswith("Human: "):
+        entry = "draft: " + entry[7:]
+    return entry[:DRAFT_SNIPPET_CHARS].replace("\n", " ")
+
+
+def compact_history(history: List[str], budget: int = HISTORY_TOKEN_BUDGET) -> List[str]:
+    """
+    Fit history into `budget` estimated tokens. The newest entries are kept verbatim;
+    older ones are folded into a single leading "Summary:" entry whose size is capped,
+    so the history never grows past the budget however many rounds are played.
+    """
+    if sum(estimate_tokens(entry) for entry in history) <= budget:
+        return list(history)
+
+    recent_budget = int(budget * (1 - SUMMARY_SHARE))
+    kept: List[str] = []
+    used = 0
+    for entry in reversed(history):
+        cost = estimate_tokens(entry)
+        if used + cost > recent_budget:
+            # Always keep the newest entry, truncated if it alone is over budget
+            if not kept:
+                kept.append(entry[:recent_budget * CHARS_PER_TOKEN])
+            break
+        kept.append(entry)
+        used += cost
+    kept.reverse()
+
+    evicted = history[:len(history) - len(kept)]
+    summary = "; ".join(_condense(entry) for entry in evicted)
+    summary_chars = int(budget * SUMMARY_SHARE) * CHARS_PER_TOKEN
+    if len(summary) > summary_chars:
+        # Keep the most recent part of the summary
+        summary = "…" + summary[-(summary_chars - 1):]
+    return [SUMMARY_PREFIX + summary] + kept
+
+
+def record_turn(history: List[str], draft: str, result: Dict[str, Any]) -> List[str]:
+    """
+    Append one refinement round (the user's draft and the structured result) and
+    enforce the budget.
+    """
+    return compact_history(history + [
+        "Human: " + draft,
+        "AI: " + json.dumps(result, ensure_ascii=False)
+    ])
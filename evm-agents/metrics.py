@@ -0,0 +1,171 @@
+import contextlib
+import contextvars
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Prefix of every exported metric name
+NAMESPACE = "evm_agents"
+# Histogram buckets in seconds, from a JSON parse to a slow gpt-5 call
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """
+    Monotonic counter with labels, rendered in the Prometheus text format.
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = f"{NAMESPACE}_{name}"
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with labels, rendered in the Prometheus text format.
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = BUCKETS):
+        self.name = f"{NAMESPACE}_{name}"
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> ([count per bucket, +Inf], sum)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "stage_duration_seconds",
+    "Time spent in each pipeline stage (LLM call, node call, prompt render, JSON parse)",
+    ("stage", "model", "endpoint")
+)
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens reported by the model provider", ("model", "kind"))
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Time to handle an HTTP request", ("endpoint", "method", "status"))
+
+METRICS = [STAGE_SECONDS, LLM_TOKENS, REQUEST_SECONDS]
+
+# Spans of the current request, when the caller asked for them
+_spans: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = contextvars.ContextVar("spans", default=None)
+
+
+def render_metrics() -> str:
+    """
+    All metrics in the Prometheus text exposition format, for GET /metrics.
+    """
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+@contextlib.contextmanager
+def collect_spans() -> Iterator[List[Dict[str, Any]]]:
+    """
+    Collect the spans recorded by the code inside the block, including worker
+    threads started with asyncio.to_thread, into the yielded list.
+    """
+    token = _spans.set([])
+    try:
+        yield _spans.get()
+    finally:
+        _spans.reset(token)
+
+
+def record_span(stage: str, seconds: float, model: str = "", endpoint: str = "", **attrs: Any) -> None:
+    """
+    Record a finished stage: observe it in STAGE_SECONDS and, if spans are being
+    collected, add it to the request's spans with its attributes.
+    """
+    STAGE_SECONDS.observe(seconds, stage=stage, model=model, endpoint=endpoint)
+    spans = _spans.get()
+    if spans is not None:
+        labels = {key: value for key, value in (("model", model), ("endpoint", endpoint)) if value}
+        spans.append({"stage": stage, "ms": round(seconds * 1000, 1), **labels, **attrs})
+
+
+@contextlib.contextmanager
+def span(stage: str, model: str = "", endpoint: str = "", **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time the block as `stage`. The yielded dict can be filled with extra span
+    attributes; an exception is recorded as `error` and re-raised.
+    """
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        record_span(stage, time.perf_counter() - start, model=model, endpoint=endpoint, **attrs)
+
+
+def record_tokens(model: str, prompt_tokens: Optional[int], completion_tokens: Optional[int], cached_tokens: Optional[int] = 0) -> None:
+    """
+    Count provider-reported tokens by model and kind, and add them to the spans.
+    """
+    counts = {"prompt": prompt_tokens or 0, "completion": completion_tokens or 0, "cached": cached_tokens or 0}
+    for kind, count in counts.items():
+        if count:
+            LLM_TOKENS.inc(count, model=model, kind=kind)
+    spans = _spans.get()
+    if spans is not None:
+        spans.append({"stage": "llm_usage", "model": model, **{f"{kind}_tokens": count for kind, count in counts.items()}})
+
+
+def record_message_tokens(model: str, message: Any) -> None:
+    """
+    record_tokens for a chat model reply, from its usage_metadata if present.
+    """
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        cached = (usage.get("input_token_details") or {}).get("cache_read")
+        record_tokens(model, usage.get("input_tokens"), usage.get("output_tokens"), cached)
@@ -0,0 +1,204 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Number of long-lived node processes serving transactions.js
+NODE_POOL_SIZE = int(os.getenv("NODE_POOL_SIZE", "2"))
+# Seconds a single call may take before its worker is restarted
+NODE_CALL_TIMEOUT = float(os.getenv("NODE_CALL_TIMEOUT", "30"))
+# Seconds between health pings to idle workers
+NODE_HEALTH_INTERVAL = float(os.getenv("NODE_HEALTH_INTERVAL", "15"))
+# Largest single response line (token lists run to several MB)
+NODE_MAX_LINE_BYTES = 64 * 1024 * 1024
+
+WORKER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class NodeWorkerError(Exception):
+    """Raised when a worker call fails, times out or the worker dies."""
+
+
+class NodeWorkerTimeout(NodeWorkerError):
+    """Raised when a worker does not answer within the call timeout."""
+
+
+class NodeWorker:
+    """
+    One `node worker.js` process. Calls are multiplexed over its stdin/stdout by
+    request id, so a worker serves many in-flight requests at once.
+    """
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def start(self) -> None:
+        self.process = await asyncio.create_subprocess_exec(
+            "node", "worker.js",
+            cwd=WORKER_DIR,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=NODE_MAX_LINE_BYTES
+        )
+        self._tasks = [
+            asyncio.create_task(self._read_responses()),
+            asyncio.create_task(self._drain_stderr())
+        ]
+        logger.info(f"Started node worker {self.index} (pid {self.process.pid})")
+
+    async def _read_responses(self) -> None:
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                break
+            try:
+                message = json.loads(line)
+            except ValueError:
+                logger.warning(f"Node worker {self.index} wrote a non-JSON line: {line[:200]!r}")
+                continue
+            future = self._pending.pop(message.get("id"), None)
+            if future is None or future.done():
+                continue
+            if "error" in message:
+                future.set_exception(NodeWorkerError(message["error"]))
+            else:
+                future.set_result(message.get("result"))
+        self._fail_pending(NodeWorkerError(f"Node worker {self.index} exited"))
+
+    async def _drain_stderr(self) -> None:
+        while True:
+            line = await self.process.stderr.readline()
+            if not line:
+                break
+            logger.info(f"[node {self.index}] {line.decode(errors='replace').rstrip()}")
+
+    def _fail_pending(self, error: Exception) -> None:
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+
+    async def call(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: float = NODE_CALL_TIMEOUT) -> Any:
+        if not self.alive:
+            raise NodeWorkerError(f"Node worker {self.index} is not running")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        payload = json.dumps({"id": request_id, "method": method, "params": params or {}}) + "\n"
+        self.process.stdin.write(payload.encode())
+        await self.process.stdin.drain()
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._pending.pop(request_id, None)
+            raise NodeWorkerTimeout(f"{method} timed out after {timeout}s on node worker {self.index}")
+
+    async def stop(self) -> None:
+        if self.alive:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), 5)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        for task in self._tasks:
+            task.cancel()
+        self._fail_pending(NodeWorkerError(f"Node worker {self.index} stopped"))
+
+
+class NodePool:
+    """
+    Fixed-size pool of node workers. Calls go to the least busy live worker; dead or
+    hung workers are restarted by the call path and by a periodic health check.
+    """
+
+    def __init__(self, size: int = NODE_POOL_SIZE):
+        self.size = max(1, size)
+        self.workers: List[NodeWorker] = []
+        self.restarts = 0
+        self._health_task: Optional[asyncio.Task] = None
+        self._restart_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        self.workers = [NodeWorker(i) for i in range(self.size)]
+        await asyncio.gather(*(worker.start() for worker in self.workers))
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+        await asyncio.gather(*(worker.stop() for worker in self.workers), return_exceptions=True)
+
+    async def _restart(self, worker: NodeWorker, failed: Optional[asyncio.subprocess.Process] = None) -> None:
+        """
+        Replace a worker. `failed` is the process a call timed out on; if it has
+        already been replaced by a concurrent restart, nothing is done.
+        """
+        async with self._restart_lock:
+            if worker.alive and (failed is None or worker.process is not failed):
+                return
+            logger.warning(f"Restarting node worker {worker.index}")
+            await worker.stop()
+            await worker.start()
+            self.restarts += 1
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(NODE_HEALTH_INTERVAL)
+            for worker in self.workers:
+                process = worker.process
+                try:
+                    if not worker.alive:
+                        raise NodeWorkerError("not running")
+                    await worker.call("ping", timeout=5)
+                except NodeWorkerError as e:
+                    logger.warning(f"Node worker {worker.index} failed health check: {e}")
+                    await self._restart(worker, process)
+
+    async def call(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: float = NODE_CALL_TIMEOUT) -> Any:
+        """
+        Call a transactions.js function on the least busy worker.
+        """
+        worker = min(self.workers, key=lambda w: (not w.alive, w.in_flight))
+        if not worker.alive:
+            await self._restart(worker)
+        process = worker.process
+        try:
+            with span("node_call", endpoint=method):
+                return await worker.call(method, params, timeout)
+        except NodeWorkerTimeout:
+            # The worker may be wedged, so it is replaced
+            await self._restart(worker, process)
+            raise
+        except NodeWorkerError:
+            # Errors thrown by the JS code leave the worker usable
+            if not worker.alive:
+                await self._restart(worker)
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "alive": sum(worker.alive for worker in self.workers),
+            "in_flight": sum(worker.in_flight for worker in self.workers),
+            "restarts": self.restarts
+        }
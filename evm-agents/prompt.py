@@ -1,5 +1,6 @@
 import os
 import json
+import logging
 import requests
 from typing import Dict, List, Any, Optional, Union, Tuple
 
@@ -14,6 +15,8 @@ from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_core.runnables.history import RunnableWithMessageHistory
 # Set your OpenAI API key
 from dotenv import load_dotenv
+from history import compact_history, record_turn
+from metrics import record_message_tokens, span
 
 # Load environment variables from .env file
 load_dotenv()
@@ -21,6 +24,8 @@ load_dotenv()
 # Get OpenAI API key from environment variables
 os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
 
+logger = logging.getLogger(__name__)
+
 API_DOCS = {
     # LiFi get supported chains
     "getChains": {
@@ -213,12 +218,14 @@ OUTPUT_FORMAT = {
   ]
 }
 
+PROMPT_MODEL = "o4-mini"
+
 def improve_prompt(prompt: str, history: List[str] = None) -> Dict[str, Any]:
 
-    model = ChatOpenAI(model="o4-mini")
+    model = ChatOpenAI(model=PROMPT_MODEL)
 
-    if history is None:
-        history = []
+    # Older rounds are folded into a summary so the history stays within budget
+    history = compact_history(history or [])
 
     formatted_history = "\n".join(history) if history else "No previous conversation"
 
@@ -273,11 +280,15 @@ def improve_prompt(prompt: str, history: List[str] = None) -> Dict[str, Any]:
         ("human", "{input}")
     ])
     
-    formatted_prompt = prompt_template.format(input=prompt, HISTORY=formatted_history, TOKENS=TOKENS)
+    with span("prompt_render", endpoint="prompt"):
+        formatted_prompt = prompt_template.format(input=prompt, HISTORY=formatted_history, TOKENS=TOKENS)
     
-    response = model.invoke(formatted_prompt).content
+    with span("llm_score", model=PROMPT_MODEL, endpoint="prompt"):
+        message = model.invoke(formatted_prompt)
+    record_message_tokens(PROMPT_MODEL, message)
+    response = message.content
 
-    print(response)
+    logger.info("Prompt model response", extra={"payload": response})
     
     # Handle JSON response wrapped in markdown code blocks
     if response.startswith('```json'):
@@ -285,12 +296,11 @@ def improve_prompt(prompt: str, history: List[str] = None) -> Dict[str, Any]:
     elif response.startswith('```'):
         response = response.replace('```', '').strip()
     
-    result = json.loads(response)
+    with span("json_parse", endpoint="prompt"):
+        result = json.loads(response)
     
-    history.extend([
-        "Human: "+formatted_prompt,
-        "AI: "+str(result)
-    ])
+    # Record only the user's draft and the structured result, never the rendered prompt
+    history = record_turn(history, prompt, result)
 
     return {
         "response": result,
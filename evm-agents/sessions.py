@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+# "memory" or a redis:// URL shared by all workers
+SESSION_STORE_URL = os.getenv("SESSION_STORE_URL", "memory")
+# Idle time before a session expires
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+# In-memory store size before LRU eviction
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore(ABC):
+    """
+    Server-side conversation history keyed by session id. Subclasses decide where
+    the history lives; all of them expire sessions after `ttl` seconds of inactivity.
+    """
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[List[str]]:
+        ...
+
+    @abstractmethod
+    async def set(self, session_id: str, history: List[str]) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> None:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Bounded LRU of sessions for a single worker process. The least recently used
+    session is evicted once `max_entries` is reached.
+    """
+
+    def __init__(self, max_entries: int = SESSION_MAX_ENTRIES, ttl: float = SESSION_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+
+    async def get(self, session_id: str) -> Optional[List[str]]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        expires_at, history = entry
+        if expires_at < time.monotonic():
+            del self._sessions[session_id]
+            return None
+        self._sessions.move_to_end(session_id)
+        return list(history)
+
+    async def set(self, session_id: str, history: List[str]) -> None:
+        self._sessions[session_id] = (time.monotonic() + self.ttl, list(history))
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_entries:
+            self._sessions.popitem(last=False)
+
+    async def delete(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Sessions in a Redis-compatible server, shared by every worker. Expiry is left
+    to the server via SET ... EX.
+    """
+
+    def __init__(self, url: str, ttl: float = SESSION_TTL_SECONDS, prefix: str = "evm-agents:session:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ImportError("SESSION_STORE_URL points at Redis but the redis package is not installed") from e
+        self.ttl = int(ttl)
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+
+    async def get(self, session_id: str) -> Optional[List[str]]:
+        raw = await self._client.get(self.prefix + session_id)
+        if raw is None:
+            return None
+        # Sliding expiry, same as the in-memory store
+        await self._client.expire(self.prefix + session_id, self.ttl)
+        return json.loads(raw)
+
+    async def set(self, session_id: str, history: List[str]) -> None:
+        await self._client.set(self.prefix + session_id, json.dumps(history), ex=self.ttl)
+
+    async def delete(self, session_id: str) -> None:
+        await self._client.delete(self.prefix + session_id)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def create_session_store(url: str = SESSION_STORE_URL) -> SessionStore:
+    """
+    Build the store named by SESSION_STORE_URL: "memory" (default) or a redis:// URL.
+    """
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        logger.info("Using Redis session store")
+        return RedisSessionStore(url)
+    logger.info(f"Using in-memory session store (max {SESSION_MAX_ENTRIES} sessions)")
+    return InMemorySessionStore()
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
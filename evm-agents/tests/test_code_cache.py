@@ -0,0 +1,21 @@
+import os
+
+from code_cache import CodeCache
+
+OUTPUT = {"code": "async function baselineFunction() {}", "interval": "setInterval(baselineFunction, 1000);"}
+
+
+def test_file_is_created_on_first_use(tmp_path):
+    path = os.path.join(tmp_path, "code_cache.sqlite3")
+    cache = CodeCache("v1", path=path)
+    assert not os.path.exists(path)
+    assert cache.get("Buy KDX") is None
+    assert os.path.exists(path)
+
+
+def test_hit_after_put_with_normalized_prompt(tmp_path):
+    cache = CodeCache("v1", path=os.path.join(tmp_path, "code_cache.sqlite3"))
+    cache.put("Buy  KDX\nevery hour", OUTPUT)
+    assert cache.get("Buy KDX every hour") == OUTPUT
+    assert CodeCache("v2", path=cache.path).get("Buy KDX every hour") is None
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 0)
@@ -0,0 +1,97 @@
+import asyncio
+
+from jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, InMemoryJobStore, JobQueue
+
+
+class FlakyStore(InMemoryJobStore):
+    """
+    In-memory store whose next `fail_gets` gets and `fail_sets` sets raise, as
+    a Redis store does when the connection drops. Sets of jobs matching
+    `fail_when` raise too.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.fail_gets = 0
+        self.fail_sets = 0
+        self.fail_when = lambda job: False
+
+    async def get(self, job_id):
+        if self.fail_gets:
+            self.fail_gets -= 1
+            raise ConnectionError("store down")
+        return await super().get(job_id)
+
+    async def set(self, job):
+        if self.fail_sets or self.fail_when(job):
+            self.fail_sets = max(0, self.fail_sets - 1)
+            raise ConnectionError("store down")
+        await super().set(job)
+
+
+def _handler(payload, on_stage):
+    on_stage("generate", {"ms": 1})
+    return {"code": payload["prompt"]}
+
+
+async def _finished(store, job_id):
+    for _ in range(200):
+        job = await store.get(job_id)
+        if job["status"] in (SUCCEEDED, FAILED):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} never finished")
+
+
+def test_worker_survives_a_store_error_on_get():
+    async def run():
+        store = FlakyStore()
+        queue = JobQueue(_handler, store, workers=1)
+        await queue.start()
+        first = await queue.submit({"prompt": "first"})
+        # The worker's get for the first job fails
+        store.fail_gets = 1
+        await asyncio.sleep(0.05)
+        second = await queue.submit({"prompt": "second"})
+        job = await _finished(store, second["id"])
+        await queue.close()
+        return await store.get(first["id"]), job
+
+    skipped, job = asyncio.run(run())
+    assert skipped["status"] == QUEUED
+    assert job["status"] == SUCCEEDED and job["result"] == {"code": "second"}
+
+
+def test_store_error_when_starting_marks_the_job_failed():
+    async def run():
+        store = FlakyStore()
+        queue = JobQueue(_handler, store, workers=1)
+        await queue.start()
+        first = await queue.submit({"prompt": "first"})
+        # The RUNNING update fails; the failed record is saved on the next set
+        store.fail_sets = 1
+        failed = await _finished(store, first["id"])
+        second = await queue.submit({"prompt": "second"})
+        done = await _finished(store, second["id"])
+        await queue.close()
+        return failed, done
+
+    failed, done = asyncio.run(run())
+    assert failed["status"] == FAILED and failed["error"] == "Job store unavailable"
+    assert done["status"] == SUCCEEDED
+
+
+def test_stage_save_error_does_not_fail_the_job():
+    async def run():
+        store = FlakyStore()
+        store.fail_when = lambda job: job["status"] == RUNNING and job["stages"]
+        queue = JobQueue(_handler, store, workers=1)
+        await queue.start()
+        job = await queue.submit({"prompt": "only"})
+        done = await _finished(store, job["id"])
+        await queue.close()
+        return done
+
+    done = asyncio.run(run())
+    assert done["status"] == SUCCEEDED
+    assert [stage["stage"] for stage in done["stages"]] == ["generate"]
@@ -0,0 +1,169 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import ttl_cache
+from ttl_cache import TTLCache
+
+TTL = 10
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Fetch:
+    """
+    Fake upstream: each call returns the next value, or raises `error` if set.
+    `delay` keeps the call in flight so concurrent callers overlap.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.delay = delay
+        self.error = None
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return f"v{self.calls}"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Only the cache sees the fake clock; the event loop keeps the real one
+    clock = Clock()
+    monkeypatch.setattr(ttl_cache, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+async def _settle():
+    # Let background refreshes finish
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_fresh_entry_is_served_without_fetching(clock):
+    async def main():
+        cache, fetch = TTLCache(stale=60), Fetch()
+        assert await cache.get("chains", fetch, TTL) == "v1"
+        clock.now += TTL - 1
+        assert await cache.get("chains", fetch, TTL) == "v1"
+        return cache, fetch
+
+    cache, fetch = asyncio.run(main())
+    assert fetch.calls == 1
+    assert (cache.metrics["hits"], cache.metrics["misses"]) == (1, 1)
+
+
+def test_stale_entry_is_served_while_it_refreshes(clock):
+    async def main():
+        cache, fetch = TTLCache(stale=60), Fetch()
+        await cache.get("chains", fetch, TTL)
+        clock.now += TTL + 1
+        # The stale value comes back at once; one refresh runs in the background
+        assert await cache.get("chains", fetch, TTL) == "v1"
+        assert await cache.get("chains", fetch, TTL) == "v1"
+        await _settle()
+        assert await cache.get("chains", fetch, TTL) == "v2"
+        return cache, fetch
+
+    cache, fetch = asyncio.run(main())
+    assert fetch.calls == 2
+    assert (cache.metrics["stale_hits"], cache.metrics["refreshes"], cache.metrics["hits"]) == (2, 1, 1)
+
+
+def test_concurrent_misses_share_one_fetch(clock):
+    async def main():
+        cache, fetch = TTLCache(stale=60), Fetch(delay=0.01)
+        values = await asyncio.gather(*(cache.get("tokens", fetch, TTL) for _ in range(10)))
+        return cache, fetch, values
+
+    cache, fetch, values = asyncio.run(main())
+    assert values == ["v1"] * 10
+    assert fetch.calls == 1
+    assert (cache.metrics["misses"], cache.metrics["coalesced"]) == (1, 9)
+    assert cache.stats()["inflight"] == 0
+
+
+def test_failed_miss_raises_to_every_waiter_and_is_not_cached(clock):
+    async def main():
+        cache, fetch = TTLCache(stale=60), Fetch(delay=0.01)
+        fetch.error = ConnectionError("upstream down")
+        results = await asyncio.gather(*(cache.get("tokens", fetch, TTL) for _ in range(3)), return_exceptions=True)
+        fetch.error = None
+        return cache, fetch, results, await cache.get("tokens", fetch, TTL)
+
+    cache, fetch, results, retried = asyncio.run(main())
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert retried == "v2"
+    assert fetch.calls == 2
+
+
+def test_failed_refresh_keeps_serving_the_stale_value(clock):
+    async def main():
+        cache, fetch = TTLCache(stale=60), Fetch()
+        await cache.get("chains", fetch, TTL)
+        clock.now += TTL + 1
+        fetch.error = ConnectionError("upstream down")
+        assert await cache.get("chains", fetch, TTL) == "v1"
+        await _settle()
+        # Still stale, so the next request retries the refresh
+        fetch.error = None
+        assert await cache.get("chains", fetch, TTL) == "v1"
+        await _settle()
+        assert await cache.get("chains", fetch, TTL) == "v3"
+        return cache
+
+    cache = asyncio.run(main())
+    assert (cache.metrics["refresh_errors"], cache.metrics["refreshes"]) == (1, 1)
+
+
+def test_entry_past_the_stale_window_is_dropped(clock):
+    async def main():
+        cache, fetch = TTLCache(stale=60), Fetch()
+        await cache.get("chains", fetch, TTL)
+        clock.now += TTL + 60
+        # Too old to serve: a blocking miss, not a stale hit
+        assert await cache.get("chains", fetch, TTL) == "v2"
+        return cache
+
+    cache = asyncio.run(main())
+    assert (cache.metrics["stale_hits"], cache.metrics["misses"]) == (0, 2)
+
+
+def test_least_recently_used_key_is_evicted(clock):
+    async def main():
+        cache = TTLCache(stale=60, max_entries=2)
+        fetches = {chain: Fetch() for chain in ("1", "2", "3")}
+        for chain in ("1", "2", "1", "3"):
+            await cache.get(chain, fetches[chain], TTL)
+        # "2" was used least recently, so it was evicted when "3" arrived
+        await cache.get("1", fetches["1"], TTL)
+        await cache.get("2", fetches["2"], TTL)
+        return cache, fetches
+
+    cache, fetches = asyncio.run(main())
+    assert (fetches["1"].calls, fetches["2"].calls, fetches["3"].calls) == (1, 2, 1)
+    assert cache.metrics["evictions"] == 2
+    assert cache.stats()["entries"] == 2
+
+
+def test_invalidate(clock):
+    async def main():
+        cache, fetch = TTLCache(stale=60), Fetch()
+        await cache.get("a", fetch, TTL)
+        await cache.get("b", fetch, TTL)
+        cache.invalidate("a")
+        assert cache.stats()["entries"] == 1
+        cache.invalidate()
+        return cache
+
+    assert asyncio.run(main()).stats()["entries"] == 0
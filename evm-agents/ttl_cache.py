@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds a chains list is served without refetching
+CHAINS_CACHE_TTL = float(os.getenv("CHAINS_CACHE_TTL", "3600"))
+# Seconds a token list is served without refetching
+TOKENS_CACHE_TTL = float(os.getenv("TOKENS_CACHE_TTL", "600"))
+# Seconds past the TTL during which the old value is still served while it is refreshed
+CACHE_STALE_SECONDS = float(os.getenv("CACHE_STALE_SECONDS", "3600"))
+# Keys kept before the least recently used is evicted; /tokens/{chain_id} keys come from clients
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "256"))
+
+
+@dataclass
+class _Entry:
+    value: Any
+    fresh_until: float
+    stale_until: float
+
+
+class TTLCache:
+    """
+    In-process async cache with a TTL per key.
+
+    - Fresh entries are returned directly.
+    - Entries past their TTL but within `stale` seconds are returned immediately while
+      one background task refreshes them (stale-while-revalidate).
+    - Misses are single-flight: concurrent callers for the same key share one fetch.
+    - Entries past the stale window are dropped, and at most `max_entries` are kept,
+      least recently used evicted first.
+    """
+
+    def __init__(self, stale: float = CACHE_STALE_SECONDS, max_entries: int = CACHE_MAX_ENTRIES):
+        self.stale = stale
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.metrics = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "evictions": 0
+        }
+
+    async def get(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], ttl: float) -> Any:
+        """
+        Return the cached value for `key`, calling `fetch` to load or refresh it.
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and now >= entry.stale_until:
+            del self._entries[key]
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+        if entry is not None and now < entry.fresh_until:
+            self.metrics["hits"] += 1
+            return entry.value
+        if entry is not None and now < entry.stale_until:
+            self.metrics["stale_hits"] += 1
+            if key not in self._inflight:
+                self._start_fetch(key, fetch, ttl, refresh=True)
+            return entry.value
+
+        if key in self._inflight:
+            self.metrics["coalesced"] += 1
+        else:
+            self.metrics["misses"] += 1
+            self._start_fetch(key, fetch, ttl, refresh=False)
+        # shield() so one cancelled caller does not cancel the fetch the others wait on
+        return await asyncio.shield(self._inflight[key])
+
+    def _start_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], ttl: float, refresh: bool) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+
+        async def run():
+            try:
+                value = await fetch()
+            except Exception as e:
+                stale = self._entries.get(key)
+                if refresh and stale is not None:
+                    # Keep serving the stale value; the next request retries
+                    self.metrics["refresh_errors"] += 1
+                    logger.warning(f"Background refresh of {key!r} failed: {e}")
+                    future.set_result(stale.value)
+                else:
+                    future.set_exception(e)
+                    # Mark the exception retrieved in case every waiter was cancelled
+                    future.exception()
+            else:
+                now = time.monotonic()
+                self._entries[key] = _Entry(value, now + ttl, now + ttl + self.stale)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.metrics["evictions"] += 1
+                if refresh:
+                    self.metrics["refreshes"] += 1
+                future.set_result(value)
+            finally:
+                self._inflight.pop(key, None)
+
+        asyncio.create_task(run())
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """
+        Drop one key, or everything when no key is given.
+        """
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.metrics["hits"] + self.metrics["stale_hits"] + self.metrics["misses"] + self.metrics["coalesced"]
+        served = self.metrics["hits"] + self.metrics["stale_hits"]
+        return {
+            **self.metrics,
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hit_ratio": round(served / lookups, 4) if lookups else None
+        }
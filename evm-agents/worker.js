@@ -0,0 +1,69 @@
+/**
+ * @description Long-lived worker that serves transactions.js over stdin/stdout
+ *
+ * Speaks line-delimited JSON-RPC: each input line is a request
+ *   {"id": 1, "method": "getTokens", "params": {"chainId": 1}}
+ * and each output line is the matching response
+ *   {"id": 1, "result": ...} or {"id": 1, "error": "message"}
+ * Requests are handled concurrently, so responses may arrive out of order.
+ */
+
+const readline = require("readline");
+const transactions = require("./transactions");
+
+// Only these functions can be called through the worker
+const METHODS = {
+  ping: async () => "pong",
+  getChains: () => transactions.getChains(),
+  getTokens: (params) => transactions.getTokens(params),
+  getQuote: (params) => transactions.getQuote(params),
+};
+
+// stdout carries the protocol, so route any library logging to stderr
+console.log = (...args) => console.error(...args);
+console.info = (...args) => console.error(...args);
+
+/**
+ * Writes one response line to stdout
+ * @param {Object} message - Response object with id and result or error
+ */
+function send(message) {
+  process.stdout.write(JSON.stringify(message) + "\n");
+}
+
+/**
+ * Handles one request line
+ * @param {string} line - Raw JSON request
+ */
+async function handle(line) {
+  let request;
+  try {
+    request = JSON.parse(line);
+  } catch (error) {
+    send({ id: null, error: `Invalid JSON: ${error.message}` });
+    return;
+  }
+
+  const method = METHODS[request.method];
+  if (!method) {
+    send({ id: request.id, error: `Unknown method: ${request.method}` });
+    return;
+  }
+
+  try {
+    const result = await method(request.params || {});
+    send({ id: request.id, result });
+  } catch (error) {
+    const detail = error.response ? JSON.stringify(error.response.data) : "";
+    send({ id: request.id, error: `${error.message} ${detail}`.trim() });
+  }
+}
+
+const input = readline.createInterface({ input: process.stdin });
+input.on("line", (line) => {
+  if (line.trim()) {
+    handle(line);
+  }
+});
+// Exit when the parent closes stdin
+input.on("close", () => process.exit(0));
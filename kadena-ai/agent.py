@@ -1,5 +1,7 @@
+import httpx
+import logging
 import requests
-from typing import Dict, List, Any, Optional, Literal
+from typing import AsyncIterator, Dict, List, Any, Optional, Literal
 from langchain.agents import Tool, AgentExecutor, create_openai_functions_agent
 from langchain.schema import SystemMessage, HumanMessage
 from langchain_openai import ChatOpenAI
@@ -8,9 +10,63 @@ from langchain_core.agents import AgentFinish, AgentActionMessageLog
 from langchain.tools import BaseTool
 
 from config import (
-    API_KEY, MODEL_NAME, GPT4_MODEL, API_DOCS, TOKENS, ECOSYSTEM_PROJECTS,
-    KADENA_API_BASE_URL, ANALYSIS_API_URL, MAX_HISTORY_LENGTH
+    KADENA_API_HEADERS, MODEL_NAME, GPT4_MODEL, API_DOCS, ECOSYSTEM_PROJECTS,
+    KADENA_API_BASE_URL, ANALYSIS_API_URL, UPSTREAM_RETRIES
 )
+from errors import ErrorCode, explain_error, tool_error, upstream_error
+from hedging import ANALYSIS_HEDGER, hedge_trace
+from http_client import HTTP_TIMEOUT, get_async_client, get_session
+from memory import LLMInputLogger, compact_history, record_turn
+from metrics import TOOL_ERRORS, span
+from quote_cache import QUOTE_CACHE
+from resilience import (
+    ANALYSIS_API_BREAKER, KADENA_API_BREAKER, RETRY_STATUSES, CircuitOpenError, acall_with_retry, call_with_retry
+)
+from router import INTENT_ROUTER
+from tokens import TOKEN_REGISTRY
+from validation import TRANSACTION_VALIDATOR, validation_error
+
+logger = logging.getLogger(__name__)
+
+# Kadena API endpoints that can be retried safely
+IDEMPOTENT_ENDPOINTS = {'quote'}
+
+def _handle_api_response(response) -> Dict[str, Any]:
+    """
+    Turn a requests/httpx response into the tool's result dict.
+    """
+    # Handle specific error cases
+    if response.status_code == 400:
+        return upstream_error("Bad Request", response.json())
+    elif response.status_code == 500:
+        return upstream_error("Server Error", response.json())
+        
+    response.raise_for_status()
+    return response.json()
+
+def _handle_request_error(e: Exception) -> Dict[str, Any]:
+    """
+    Turn a failed requests/httpx call into the tool's error dict.
+    """
+    response = getattr(e, 'response', None)
+    if response is not None:
+        try:
+            return upstream_error("API Error", response.json(), default=str(e))
+        except ValueError:
+            if response.status_code not in RETRY_STATUSES:
+                return {"error": f"API request failed: {str(e)}"}
+    # Unreachable, or a gateway error page while the service cold-starts
+    return tool_error(ErrorCode.UPSTREAM_UNAVAILABLE, f"API request failed: {str(e)}")
+
+def _circuit_open_error(e: CircuitOpenError) -> Dict[str, Any]:
+    return tool_error(ErrorCode.UPSTREAM_UNAVAILABLE, f"API request failed: {str(e)}", retry_after=e.retry_after)
+
+def _retries(endpoint: str) -> int:
+    """
+    Retries for a Kadena API call. Quotes are read-only; the other endpoints
+    build a new transaction on every call, so they are sent once.
+    """
+    return UPSTREAM_RETRIES if endpoint in IDEMPOTENT_ENDPOINTS else 0
 
 class KadenaTransactionTool(BaseTool):
     name: str = "kadena_transaction"
@@ -65,79 +121,77 @@ class KadenaTransactionTool(BaseTool):
     - Optional: description, totalSupply
     """
     
+    def _validate_request(self, endpoint: str, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Validate the endpoint and body locally, before any network I/O. Returns an
+        error dict, or None if valid.
+        """
+        return validation_error(TRANSACTION_VALIDATOR.validate(endpoint, body))
+
     def _run(self, endpoint: Literal["quote", "transfer", "swap", "nft/launch", "nft/collection"], body: Dict[str, Any]) -> Dict[str, Any]:
         """
         Generate an unsigned transaction by calling the Kadena API.
         """
-        # Validate endpoint
-        valid_endpoints = {'quote', 'transfer', 'swap', 'nft/launch', 'nft/collection'}
-        if endpoint not in valid_endpoints:
-            return {"error": f"Invalid endpoint. Must be one of: {valid_endpoints}"}
-        
-        # Validate required parameters based on endpoint
-        required_params = {
-            'quote': ['tokenInAddress', 'tokenOutAddress', 'chainId'],
-            'transfer': ['tokenAddress', 'sender', 'receiver', 'amount', 'chainId'],
-            'swap': ['tokenInAddress', 'tokenOutAddress', 'account', 'chainId'],
-            'nft/launch': ['account', 'guard', 'mintTo', 'uri', 'collectionId', 'chainId'],
-            'nft/collection': ['account', 'name', 'chainId']
-        }
+        error = self._validate_request(endpoint, body)
+        if error:
+            return error
         
-        # Special validation for swap endpoint
-        if endpoint == 'swap':
-            if 'amountIn' in body and 'amountOut' in body:
-                return {"error": "Cannot specify both amountIn and amountOut for swap"}
-            if 'amountIn' not in body and 'amountOut' not in body:
-                return {"error": "Must specify either amountIn or amountOut for swap"}
-            
-        # Special validation for quote endpoint
         if endpoint == 'quote':
-            if 'amountIn' in body and 'amountOut' in body:
-                return {"error": "Cannot specify both amountIn and amountOut for quote"}
-            if 'amountIn' not in body and 'amountOut' not in body:
-                return {"error": "Must specify either amountIn or amountOut for quote"}
-        
-        # Check required parameters
-        missing_params = [param for param in required_params[endpoint] 
-                         if param not in body]
-        if missing_params:
-            return {"error": f"Missing required parameters: {missing_params}"}
-        
-        # Validate chainId
-        if int(body.get('chainId')) > 19 or int(body.get('chainId')) < 0:
-            return {"error": "Invalid chainId. Must be between 0 and 19"}
-        
-        # Make API request
+            # Identical quotes within QUOTE_CACHE_TTL share one API call
+            return QUOTE_CACHE.get(body, lambda: self._post(endpoint, body))
+        return self._post(endpoint, body)
+
+    def _post(self, endpoint: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        def send():
+            with span("tool_http", endpoint=endpoint) as attrs:
+                response = get_session().post(
+                    f"{KADENA_API_BASE_URL}/{endpoint}",
+                    json=body,
+                    headers=KADENA_API_HEADERS,
+                    timeout=HTTP_TIMEOUT
+                )
+                attrs["status"] = response.status_code
+            return response
+
+        # Make API request, retrying only calls that are safe to repeat
         try:
-            response = requests.post(
-                f"{KADENA_API_BASE_URL}/{endpoint}",
-                json=body,
-                headers={'Content-Type': 'application/json', 'x-api-key': API_KEY}
-            )
-            
-            # Handle specific error cases
-            if response.status_code == 400:
-                error_data = response.json()
-                return {"error": f"Bad Request: {error_data.get('error', 'Unknown error')}"}
-            elif response.status_code == 500:
-                error_data = response.json()
-                return {"error": f"Server Error: {error_data.get('error', 'Unknown error')}"}
-                
-            response.raise_for_status()
-            return response.json()
-            
+            response = call_with_retry(KADENA_API_BREAKER, send, retries=_retries(endpoint))
+            with span("json_parse", endpoint=endpoint):
+                return _handle_api_response(response)
+        except CircuitOpenError as e:
+            return _circuit_open_error(e)
         except requests.exceptions.RequestException as e:
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_data = e.response.json()
-                    return {"error": f"API Error: {error_data.get('error', str(e))}"}
-                except ValueError:
-                    return {"error": f"API request failed: {str(e)}"}
-            return {"error": f"API request failed: {str(e)}"}
+            return _handle_request_error(e)
     
     async def _arun(self, endpoint: Literal["transfer", "swap", "nft/launch", "nft/collection", "quote"], body: Dict[str, Any]) -> Dict[str, Any]:
-        """Async version of the tool."""
-        return self._run(endpoint, body)
+        """Async version of the tool, using the shared async HTTP client."""
+        error = self._validate_request(endpoint, body)
+        if error:
+            return error
+
+        if endpoint == 'quote':
+            return await QUOTE_CACHE.aget(body, lambda: self._apost(endpoint, body))
+        return await self._apost(endpoint, body)
+
+    async def _apost(self, endpoint: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        async def send():
+            with span("tool_http", endpoint=endpoint) as attrs:
+                response = await get_async_client().post(
+                    f"{KADENA_API_BASE_URL}/{endpoint}",
+                    json=body,
+                    headers=KADENA_API_HEADERS
+                )
+                attrs["status"] = response.status_code
+            return response
+
+        try:
+            response = await acall_with_retry(KADENA_API_BREAKER, send, retries=_retries(endpoint))
+            with span("json_parse", endpoint=endpoint):
+                return _handle_api_response(response)
+        except CircuitOpenError as e:
+            return _circuit_open_error(e)
+        except (httpx.HTTPError, ValueError) as e:
+            return _handle_request_error(e)
 
 class KadenaAnalysisTool(BaseTool):
     name: str = "kadena_analysis"
@@ -153,60 +207,107 @@ class KadenaAnalysisTool(BaseTool):
         """
         Send a query to the analysis endpoint and get K-Agent's response.
         """
+        def send():
+            with span("tool_http", endpoint="analysis") as attrs:
+                response = get_session().post(
+                    ANALYSIS_API_URL,
+                    json={
+                        'query': query
+                    },
+                    headers={'Content-Type': 'application/json'},
+                    timeout=HTTP_TIMEOUT
+                )
+                attrs["status"] = response.status_code
+            return response
+
         try:
-            response = requests.post(
-                ANALYSIS_API_URL,
-                json={
-                    'query': query
-                },
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            # Handle specific error cases
-            if response.status_code == 400:
-                error_data = response.json()
-                return {"error": f"Bad Request: {error_data.get('error', 'Unknown error')}"}
-            elif response.status_code == 500:
-                error_data = response.json()
-                return {"error": f"Server Error: {error_data.get('error', 'Unknown error')}"}
-                
-            response.raise_for_status()
-            return response.json()
-            
+            response = call_with_retry(ANALYSIS_API_BREAKER, send)
+            with span("json_parse", endpoint="analysis"):
+                return _handle_api_response(response)
+        except CircuitOpenError as e:
+            return _circuit_open_error(e)
         except requests.exceptions.RequestException as e:
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_data = e.response.json()
-                    return {"error": f"API Error: {error_data.get('error', str(e))}"}
-                except ValueError:
-                    return {"error": f"API request failed: {str(e)}"}
-            return {"error": f"API request failed: {str(e)}"}
+            return _handle_request_error(e)
     
     async def _arun(self, query: str, systemPrompt: str) -> Dict[str, Any]:
-        """Async version of the tool."""
-        return self._run(query, systemPrompt)
+        """Async version of the tool, using the shared async HTTP client."""
+        async def send():
+            with span("tool_http", endpoint="analysis") as attrs:
+                response = await get_async_client().post(
+                    ANALYSIS_API_URL,
+                    json={
+                        'query': query
+                    },
+                    headers={'Content-Type': 'application/json'},
+                    # Tells ANALYSIS_HEDGER when a hedged request has actually gone out
+                    extensions={'trace': hedge_trace}
+                )
+                attrs["status"] = response.status_code
+            return response
 
-def run_kadena_agent_with_context(query: str, history: List[str] = None) -> Dict[str, Any]:
+        try:
+            # A slow RAG answer can be hedged with a second identical request
+            response = await ANALYSIS_HEDGER.run(lambda: acall_with_retry(ANALYSIS_API_BREAKER, send))
+            with span("json_parse", endpoint="analysis"):
+                return _handle_api_response(response)
+        except CircuitOpenError as e:
+            return _circuit_open_error(e)
+        except (httpx.HTTPError, ValueError) as e:
+            return _handle_request_error(e)
+
+PROCESSING_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+    Given raw data from the Kadena API, process it and return a response to show to the user.
+     
+    If there is an error, do your best to answer the user's query. If you cannot answer the user's query, then ask them to try again later.
+    """),
+    ("human", "{raw_data}")
+])
+
+ERROR_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+    You are a helpful assistant explaining Kadena transaction errors to users.
+    Your task is to:
+    1. Explain the error in simple, user-friendly terms
+    2. Suggest possible solutions or workarounds
+    3. Provide context about why this error might have occurred
+    4. If applicable, mention any specific requirements or constraints
+    
+    Be empathetic and helpful while maintaining technical accuracy.
+    Also, return the original error, with all the details.
+    """),
+    ("human", """
+    Transaction Error Details:
+    Error: {error}
+    Details: {details}
+    Original Query: {query}
+    """)
+])
+
+def _prepare_history(history: Optional[List[str]]) -> List[str]:
     """
-    Run the Kadena agent with history and tool calling.
+    Fit the incoming conversation history into the token budget.
+    """
+    return compact_history(history or [])
+
+# Per-request context, sent after the static system prompt. Everything before it is
+# identical for every request, so the provider can serve it from its prompt cache.
+REQUEST_CONTEXT = """
+TOKENS:
+{TOKENS}
+
+Previous conversation(s):
+{formatted_history}
+"""
+
+def _build_prompt() -> ChatPromptTemplate:
+    """
+    Build the Agent K prompt. The static resources are bound as partials, so each
+    request only supplies formatted_history, TOKENS, input and the agent scratchpad.
+
+    Message order matters for prompt caching: the static system prompt comes first,
+    then REQUEST_CONTEXT, the query, and the scratchpad that grows between tool calls.
     """
-    # Initialize history if not provided
-    if history is None:
-        history = []
-    
-    # Limit history to last 5 conversations (10 messages - 5 pairs of Q&A)
-    if len(history) > MAX_HISTORY_LENGTH:
-        history = history[-MAX_HISTORY_LENGTH:]
-    
-    # Create tools
-    tools = [
-        KadenaTransactionTool(),
-        KadenaAnalysisTool()
-    ]
-    
-    # Format history for the prompt
-    formatted_history = "\n".join(history) if history else "No previous conversation"
-    
     prompt = ChatPromptTemplate.from_messages([
         ("system", """
         You are <Agent K>, a helpful and knowledgeable Kadena blockchain assistant created by Xade.
@@ -225,9 +326,6 @@ def run_kadena_agent_with_context(query: str, history: List[str] = None) -> Dict
         - User's token balances
         - Previous conversation history
 
-        Previous conversation(s):
-        {formatted_history}
-
         ═══════════════════════════════════════════════════════════════════════════════
         🛠️ YOUR TOOLS & RESOURCES 🛠️
         ═══════════════════════════════════════════════════════════════════════════════
@@ -241,14 +339,14 @@ def run_kadena_agent_with_context(query: str, history: List[str] = None) -> Dict
             {API_DOCS}
            (Use this to generate proper transaction parameters. Default chainId is 2 if not specified)
         
-        2. Token Information:
-            {TOKENS}
-           (Complete list of tokens on Kadena blockchain with addresses and details)
-        
-        3. Ecosystem Projects:
+        2. Ecosystem Projects:
            {ECOSYSTEM_PROJECTS}
            (Complete list of Kadena ecosystem projects. ONLY mention projects listed here.)
 
+        3. Token Information:
+           Given at the end, with the previous conversation, as TOKENS
+           (Kadena tokens relevant to this query with addresses and details, or the complete list if none were mentioned)
+
         ═══════════════════════════════════════════════════════════════════════════════
         🔒 CRITICAL SAFETY & SECURITY GUARDRAILS 🔒
         ═══════════════════════════════════════════════════════════════════════════════
@@ -542,30 +640,146 @@ def run_kadena_agent_with_context(query: str, history: List[str] = None) -> Dict
 
         Now, process the user's query following this comprehensive framework. Always think step-by-step internally, then respond with clarity, accuracy, and user safety as top priorities.
         """),
-        MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ("human", "{input}")
+        ("system", REQUEST_CONTEXT),
+        ("human", "{input}"),
+        MessagesPlaceholder(variable_name="agent_scratchpad")
     ])
     
-    # Create the agent
-    agent = create_openai_functions_agent(
-        llm=ChatOpenAI(model=MODEL_NAME),
-        tools=tools,
-        prompt=prompt
+    return prompt.partial(
+        API_DOCS=str(API_DOCS),
+        ECOSYSTEM_PROJECTS=ECOSYSTEM_PROJECTS
     )
-    
-    # Initialize agent input with required fields
-    agent_input = {
+
+class AgentRegistry:
+    """
+    Long-lived agent, tools and chat models shared by all requests. Built once at
+    startup; per-request state is passed only as agent input.
+    """
+
+    def __init__(self):
+        self.models: Dict[str, ChatOpenAI] = {}
+        self.transaction_tool = KadenaTransactionTool()
+        self.analysis_tool = KadenaAnalysisTool()
+        self.tools = [self.transaction_tool, self.analysis_tool]
+        # Create the agent
+        self.agent = create_openai_functions_agent(
+            llm=self.model(MODEL_NAME),
+            tools=self.tools,
+            prompt=_build_prompt()
+        )
+        # Post-processing and error-explanation model
+        self.model(GPT4_MODEL)
+
+    def model(self, name: str) -> ChatOpenAI:
+        """
+        Return the shared chat model for a model name, creating it on first use.
+        """
+        if name not in self.models:
+            # stream_usage so streamed calls also report (cached) prompt tokens
+            self.models[name] = ChatOpenAI(model=name, stream_usage=True, callbacks=[LLMInputLogger(name)])
+        return self.models[name]
+
+_registry: Optional[AgentRegistry] = None
+
+def init_registry() -> AgentRegistry:
+    """
+    Build (or rebuild) the shared agent registry. Called at application startup.
+    """
+    global _registry
+    _registry = AgentRegistry()
+    return _registry
+
+def get_registry() -> AgentRegistry:
+    """
+    Return the shared agent registry, building it on first use.
+    """
+    if _registry is None:
+        return init_registry()
+    return _registry
+
+def _agent_input(query: str, history: List[str]) -> Dict[str, Any]:
+    """
+    Build the agent input for a query.
+    """
+    # Format history for the prompt
+    formatted_history = "\n".join(history) if history else "No previous conversation"
+
+    # Only the tokens mentioned in the query or the last exchange go into the prompt
+    token_context = TOKEN_REGISTRY.context_for(" ".join([query] + history[-2:]))
+
+    # Initialize agent input with the per-request fields only
+    return {
         "input": query,
         "intermediate_steps": [],  # Initialize empty intermediate steps
-        "API_DOCS": API_DOCS,
-        "TOKENS": TOKENS,
-        "ECOSYSTEM_PROJECTS": ECOSYSTEM_PROJECTS,
-        "history": history,  # Pass history directly
-        "formatted_history": formatted_history  # Add formatted history
+        "formatted_history": formatted_history,  # Add formatted history
+        "TOKENS": token_context.prompt
     }
+
+def _routed_action(query: str) -> Optional[AgentActionMessageLog]:
+    """
+    The kadena_transaction call for a formulaic quote or transfer query, decided
+    without the agent's LLM call. None sends the query to the agent.
+    """
+    with span("intent_route") as attrs:
+        tool_input = INTENT_ROUTER.route(query)
+        attrs["hit"] = tool_input is not None
+    if tool_input is None:
+        return None
+    return AgentActionMessageLog(tool="kadena_transaction", tool_input=tool_input, log="Routed without the agent", message_log=[])
+
+def _transaction_body(tool_input: Dict[str, Any]) -> Dict[str, Any]:
+    return {k:v for k,v in tool_input.items() if k != 'endpoint'}
+
+def _error_prompt(tool_output: Dict[str, Any], query: str):
+    return ERROR_PROMPT.format(
+        error=tool_output.get('error', 'Unknown error'),
+        details=tool_output.get('details', 'No additional details available'),
+        query=query
+    )
+
+def _explain(tool_input: Dict[str, Any], tool_output: Dict[str, Any]) -> Optional[str]:
+    with span("error_template") as attrs:
+        explanation = explain_error(tool_input, tool_output)
+        attrs["code"] = tool_output.get("code", "unknown")
+    TOOL_ERRORS.inc(code=attrs["code"], explained_by="llm" if explanation is None else "template")
+    return explanation
+
+def _transaction_result(tool_input: Dict[str, Any], tool_output: Any) -> Any:
+    if tool_input['endpoint'] == 'quote':
+        text = "Quote in terms of " + tool_input['tokenOutAddress']
+        if tool_output.get('cacheAgeSeconds'):
+            text += f" (price from {tool_output['cacheAgeSeconds']}s ago)"
+        return { **tool_output , 
+                 "text": text}
+    return tool_output
+
+def _finish(query: str, history: List[str], response: Any, result: Any) -> Dict[str, Any]:
+    """
+    Record the turn in history and build the API response.
+    """
+    # Add new conversation to history, within the token budget
+    history = record_turn(history, query, result)
+    
+    return {
+        "response": result,
+        "intermediate_steps": response.intermediate_steps if hasattr(response, 'intermediate_steps') else [],
+        "history": history
+    }
+
+def run_kadena_agent_with_context(query: str, history: List[str] = None) -> Dict[str, Any]:
+    """
+    Run the Kadena agent with history and tool calling.
+    """
+    history = _prepare_history(history)
+    registry = get_registry()
     
-    # Process the query with the agent
-    response = agent.invoke(agent_input)
+    # Formulaic quotes and transfers go straight to the tool; everything else to the agent
+    response = _routed_action(query)
+    if response is None:
+        with span("prompt_render"):
+            agent_input = _agent_input(query, history)
+        with span("llm_agent", model=MODEL_NAME), INTENT_ROUTER.timing_agent():
+            response = registry.agent.invoke(agent_input)
 
     result = response
 
@@ -574,77 +788,119 @@ def run_kadena_agent_with_context(query: str, history: List[str] = None) -> Dict
     elif isinstance(response, AgentActionMessageLog):
         tool_input = response.tool_input
         tool = response.tool
-        print("Using " + tool)
+        logger.info(f"Using {tool}")
         if tool == 'kadena_analysis':
-            tool_output = KadenaAnalysisTool()._run(query=tool_input['query'], systemPrompt=tool_input['systemPrompt'])
+            tool_output = registry.analysis_tool._run(query=tool_input['query'], systemPrompt=tool_input['systemPrompt'])
             
-            gpt4_model = ChatOpenAI(model=GPT4_MODEL)
-            processing_prompt = ChatPromptTemplate.from_messages([
-                ("system", """
-                Given raw data from the Kadena API, process it and return a response to show to the user.
-                 
-                If there is an error, do your best to answer the user's query. If you cannot answer the user's query, then ask them to try again later.
-                """),
-                ("human", "{raw_data}")
-            ])
-            
-            processed_output = gpt4_model.invoke(
-                processing_prompt.format(raw_data=tool_output)
-            )
+            gpt4_model = registry.model(GPT4_MODEL)
+            with span("prompt_render", endpoint="analysis"):
+                processing_prompt = PROCESSING_PROMPT.format(raw_data=tool_output)
+            with span("llm_answer", model=GPT4_MODEL):
+                processed_output = gpt4_model.invoke(processing_prompt)
             result = processed_output.content
         elif tool == 'kadena_transaction':
-            tool_output = KadenaTransactionTool()._run(endpoint=tool_input['endpoint'], body={k:v for k,v in tool_input.items() if k != 'endpoint'})
+            tool_output = registry.transaction_tool._run(endpoint=tool_input['endpoint'], body=_transaction_body(tool_input))
 
             # Check for error in transaction output
             if isinstance(tool_output, dict) and 'error' in tool_output:
-                gpt4_model = ChatOpenAI(model=GPT4_MODEL)
-                error_prompt = ChatPromptTemplate.from_messages([
-                    ("system", """
-                    You are a helpful assistant explaining Kadena transaction errors to users.
-                    Your task is to:
-                    1. Explain the error in simple, user-friendly terms
-                    2. Suggest possible solutions or workarounds
-                    3. Provide context about why this error might have occurred
-                    4. If applicable, mention any specific requirements or constraints
-                    
-                    Be empathetic and helpful while maintaining technical accuracy.
-                    Also, return the original error, with all the details.
-                    """),
-                    ("human", """
-                    Transaction Error Details:
-                    Error: {error}
-                    Details: {details}
-                    Original Query: {query}
-                    """)
-                ])
-                
-                error_explanation = gpt4_model.invoke(
-                    error_prompt.format(
-                        error=tool_output.get('error', 'Unknown error'),
-                        details=tool_output.get('details', 'No additional details available'),
-                        query=query
-                    )
-                )
-                result = error_explanation.content
+                # Known errors have a written explanation; only unknown ones need the model
+                result = _explain(tool_input, tool_output)
+                if result is None:
+                    gpt4_model = registry.model(GPT4_MODEL)
+                    with span("llm_answer", model=GPT4_MODEL):
+                        error_explanation = gpt4_model.invoke(_error_prompt(tool_output, query))
+                    result = error_explanation.content
             else:
-                if tool_input['endpoint'] == 'quote':
-                    result ={ **tool_output , 
-                             "text": "Quote in terms of " + tool_input['tokenOutAddress']}
+                result = _transaction_result(tool_input, tool_output)
+
+    return _finish(query, history, response, result)
+
+async def _answer(registry: AgentRegistry, prompt: Any, stream: bool) -> AsyncIterator[str]:
+    """
+    Text of the final answer model, token by token when `stream` is set.
+    """
+    model = registry.model(GPT4_MODEL)
+    if stream:
+        with span("llm_answer", model=GPT4_MODEL):
+            async for chunk in model.astream(prompt):
+                if chunk.content:
+                    yield chunk.content
+    else:
+        with span("llm_answer", model=GPT4_MODEL):
+            content = (await model.ainvoke(prompt)).content
+        yield content
+
+async def astream_kadena_agent_with_context(query: str, history: List[str] = None, stream_tokens: bool = True) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run the agent pipeline and yield an event as each stage completes:
+
+        {"event": "thinking"}                                   agent is choosing a tool
+        {"event": "tool_called", "tool": ..., "input": {...}}
+        {"event": "tool_result", "tool": ..., "output": ...}
+        {"event": "token", "text": "..."}                       final answer text, streamed
+        {"event": "done", "response": ..., "intermediate_steps": [...], "history": [...]}
+
+    "done" carries the same fields as arun_kadena_agent_with_context returns.
+    """
+    history = _prepare_history(history)
+    registry = get_registry()
+
+    yield {"event": "thinking"}
+    # Formulaic quotes and transfers go straight to the tool; everything else to the agent
+    response = _routed_action(query)
+    if response is None:
+        with span("prompt_render"):
+            agent_input = _agent_input(query, history)
+        with span("llm_agent", model=MODEL_NAME), INTENT_ROUTER.timing_agent():
+            response = await registry.agent.ainvoke(agent_input)
+
+    result = response
+
+    if isinstance(response, AgentFinish):
+        result = response.return_values['output']
+        yield {"event": "token", "text": result}
+    elif isinstance(response, AgentActionMessageLog):
+        tool_input = response.tool_input
+        tool = response.tool
+        logger.info(f"Using {tool}")
+        yield {"event": "tool_called", "tool": tool, "input": tool_input}
+        if tool == 'kadena_analysis':
+            tool_output = await registry.analysis_tool._arun(query=tool_input['query'], systemPrompt=tool_input['systemPrompt'])
+            yield {"event": "tool_result", "tool": tool, "output": tool_output}
+
+            with span("prompt_render", endpoint="analysis"):
+                processing_prompt = PROCESSING_PROMPT.format(raw_data=tool_output)
+            result = ""
+            async for text in _answer(registry, processing_prompt, stream_tokens):
+                result += text
+                yield {"event": "token", "text": text}
+        elif tool == 'kadena_transaction':
+            tool_output = await registry.transaction_tool._arun(endpoint=tool_input['endpoint'], body=_transaction_body(tool_input))
+            yield {"event": "tool_result", "tool": tool, "output": tool_output}
+
+            # Check for error in transaction output
+            if isinstance(tool_output, dict) and 'error' in tool_output:
+                # Known errors have a written explanation; only unknown ones need the model
+                result = _explain(tool_input, tool_output)
+                if result is not None:
+                    yield {"event": "token", "text": result}
                 else:
-                    result = tool_output
+                    result = ""
+                    async for text in _answer(registry, _error_prompt(tool_output, query), stream_tokens):
+                        result += text
+                        yield {"event": "token", "text": text}
+            else:
+                result = _transaction_result(tool_input, tool_output)
 
-    # Add new conversation to history
-    history.extend([
-        "Human: "+query,
-        "AI: "+str(result)
-    ])
-    
-    # Ensure history stays within limit
-    if len(history) > MAX_HISTORY_LENGTH:
-        history = history[-MAX_HISTORY_LENGTH:]
-    
-    return {
-        "response": result,
-        "intermediate_steps": response.intermediate_steps if hasattr(response, 'intermediate_steps') else [],
-        "history": history
-    } 
\ No newline at end of file
+    yield {"event": "done", **_finish(query, history, response, result)}
+
+async def arun_kadena_agent_with_context(query: str, history: List[str] = None) -> Dict[str, Any]:
+    """
+    Async version of run_kadena_agent_with_context. LLM calls use ainvoke and tool
+    calls go through the shared async HTTP client, so the event loop is never blocked.
+    """
+    async for event in astream_kadena_agent_with_context(query, history, stream_tokens=False):
+        if event["event"] == "done":
+            done = event
+    del done["event"]
+    return done
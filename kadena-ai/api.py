@@ -1,35 +1,37 @@
 import os
 import json
-import requests
 import datetime
 import logging
+import time
+import uuid
 from typing import Dict, List, Any, Optional, Union, Tuple, Literal
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('kadena_api.log')
-    ]
-)
+from log_setup import configure_logging, request_id_var
+
+# Configure logging: JSON lines written by a background thread, rotated by size
+configure_logging('kadena_api.log')
 logger = logging.getLogger(__name__)
 
 # LangChain imports
 from langchain.agents import Tool, AgentExecutor, create_openai_functions_agent
 from langchain.schema import SystemMessage, HumanMessage
-from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.agents import AgentFinish, AgentActionMessageLog
 from langchain.tools import BaseTool
 
-from config import API_KEY, MODEL_NAME
-from agent import run_kadena_agent_with_context
+from config import KADENA_API_HEADERS, MODEL_NAME, KADENA_API_BASE_URL
+from agent import arun_kadena_agent_with_context, astream_kadena_agent_with_context, init_registry
+from http_client import close_http_clients, get_async_client
+from metrics import REQUEST_SECONDS, collect_spans, render_metrics
+from hedging import ANALYSIS_HEDGER
+from resilience import BREAKERS
+from router import INTENT_ROUTER
+from sessions import create_session_store, new_session_id
 
 # Load environment variables from .env file
 load_dotenv()
@@ -38,6 +40,9 @@ load_dotenv()
 os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
 os.environ["API_KEY"] = os.getenv("API_KEY")
 
+# Server-side conversation history for clients that opt into sessions
+session_store = create_session_store()
+
 # Initialize FastAPI
 app = FastAPI(
     title="Kadena AI Agent API",
@@ -54,6 +59,47 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    """
+    Tag the request's log records with a request id (X-Request-ID, or a new one),
+    log its duration and observe it in the HTTP latency histogram, by route template.
+    """
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:16]
+    token = request_id_var.set(request_id)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, method=request.method, status=status)
+        logger.info("Request finished", extra={
+            "method": request.method, "endpoint": endpoint, "status": status, "duration_ms": round(elapsed * 1000, 1)
+        })
+        request_id_var.reset(token)
+
+@app.on_event("startup")
+async def startup():
+    """
+    Build the shared agent and model registry once, before serving requests.
+    """
+    logger.info("Building agent registry")
+    init_registry()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """
+    Release the shared HTTP clients and the session store.
+    """
+    await close_http_clients()
+    await session_store.close()
+
 @app.get("/", summary="Health check endpoint")
 async def health_check():
     """
@@ -70,9 +116,9 @@ async def health_check():
     try:
         # Check Kadena API connection
         logger.info("Checking Kadena API connection")
-        response = requests.get(
-            "https://kadena-agents.onrender.com/",
-            headers={'Content-Type': 'application/json', 'x-api-key': API_KEY}
+        response = await get_async_client().get(
+            f"{KADENA_API_BASE_URL}/",
+            headers=KADENA_API_HEADERS
         )
         response.raise_for_status()
         kadena_status = "healthy"
@@ -89,28 +135,116 @@ async def health_check():
             "openai": openai_status,
             "kadena_api": kadena_status
         },
+        # Tool calls fail fast while an upstream's circuit is open
+        "circuit_breakers": {breaker.name: breaker.stats() for breaker in BREAKERS},
+        "analysis_hedging": ANALYSIS_HEDGER.stats(),
         "timestamp": datetime.datetime.utcnow().isoformat()
     }
 
-# Initialize OpenAI model
-model = ChatOpenAI(model="o4-mini")
-    
 class QueryRequest(BaseModel):
     query: str = Field(..., description="The user's query about Kadena blockchain")
     history: Optional[List[str]] = Field(None, description="Previous conversation history")
+    session_id: Optional[str] = Field(None, description="Server-side session to continue; history is then kept on the server and not returned")
+    use_session: bool = Field(False, description="Start a new server-side session when no session_id is given")
+    trace: bool = Field(False, description="Include per-stage timings (spans) in the response")
+
+async def _load_history(request: QueryRequest) -> Tuple[Optional[str], List[str]]:
+    """
+    Resolve the session (if any) and the history to run the query with.
+    """
+    session_id = request.session_id or (new_session_id() if request.use_session else None)
+    history = request.history
+    if session_id:
+        history = await session_store.get(session_id) or []
+    return session_id, history
+
+async def _save_session(session_id: Optional[str], result: Dict[str, Any]) -> None:
+    """
+    Store the updated history server-side and return the session id instead.
+    """
+    if session_id:
+        await session_store.set(session_id, result.pop("history"))
+        result["session_id"] = session_id
 
 @app.post("/query", summary="Process a natural language query about Kadena blockchain")
 async def process_query(request: QueryRequest):
     logger.info("Received query request")
     try:
+        session_id, history = await _load_history(request)
+
         logger.info("Processing query with agent")
-        result = run_kadena_agent_with_context(request.query, request.history)
-        logger.info("Successfully processed query")
+        with collect_spans() as spans:
+            result = await arun_kadena_agent_with_context(request.query, history)
+        logger.info(f"Successfully processed query: {_stage_summary(spans)}")
+        if request.trace:
+            result["spans"] = spans
+
+        await _save_session(session_id, result)
         return result
     except Exception as e:
         logger.error(f"Error processing query: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _stage_summary(spans: List[Dict[str, Any]]) -> str:
+    return ", ".join(f"{s['stage']}={s['ms']}ms" for s in spans if "ms" in s) or "no stages"
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/query/stream", summary="Process a query, streaming progress and the answer as server-sent events")
+async def process_query_stream(request: QueryRequest):
+    """
+    Same request as /query. Responds with text/event-stream: `thinking`, `tool_called`
+    and `tool_result` events as each stage finishes, `token` events carrying the
+    answer text as the model produces it, then `done` with the /query response body
+    (or `error` if the pipeline fails).
+    """
+    logger.info("Received streaming query request")
+    session_id, history = await _load_history(request)
+
+    async def events():
+        try:
+            with collect_spans() as spans:
+                async for event in astream_kadena_agent_with_context(request.query, history):
+                    name = event.pop("event")
+                    if name == "done":
+                        await _save_session(session_id, event)
+                        if request.trace:
+                            event["spans"] = spans
+                    yield _sse(name, event)
+            logger.info(f"Successfully streamed query: {_stage_summary(spans)}")
+        except Exception as e:
+            logger.error(f"Error streaming query: {str(e)}")
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Stop proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/metrics", summary="Prometheus metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Stage and request latency histograms and token counters, in the Prometheus
+    text format.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/router/stats", summary="Intent router hit rate and estimated latency saved")
+async def router_stats():
+    """
+    How many queries skipped the agent, the average agent call time for the rest,
+    and the latency the skipped calls are estimated to have saved.
+    """
+    return INTENT_ROUTER.stats()
+
+@app.delete("/session/{session_id}", summary="End a server-side conversation session")
+async def end_session(session_id: str):
+    await session_store.delete(session_id)
+    return {"status": "deleted", "session_id": session_id}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
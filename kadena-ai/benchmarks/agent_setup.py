@@ -0,0 +1,50 @@
+"""
+Per-request setup overhead: rebuilding the agent per query vs the shared registry.
+
+"Per request" constructs what run_kadena_agent_with_context used to build on every
+query: tools, the Agent K prompt, the o4-mini and gpt-5 clients and the functions
+agent. "Registry" is what a request does now: fetch the shared registry and build
+its input dict. No network calls are made.
+
+Usage (from kadena-ai/):
+    python -m benchmarks.agent_setup --iterations 200
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import agent
+
+
+def _time(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def _per_request():
+    agent.AgentRegistry()
+    agent._agent_input("quote 10 KDA to zUSD", [])
+
+
+def _registry():
+    agent.get_registry()
+    agent._agent_input("quote 10 KDA to zUSD", [])
+
+
+def main(args) -> None:
+    agent.init_registry()
+    before = _time(_per_request, args.iterations)
+    after = _time(_registry, args.iterations)
+    print(f"per-request build: {before * 1000:8.3f} ms/request")
+    print(f"shared registry:   {after * 1000:8.3f} ms/request")
+    print(f"saved:             {(before - after) * 1000:8.3f} ms/request ({before / after:.0f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    main(parser.parse_args())
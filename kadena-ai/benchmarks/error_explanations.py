@@ -0,0 +1,88 @@
+"""
+Latency and answer-model calls for failed transactions: written explanations
+from errors.py vs asking gpt-5 to explain every error.
+
+Each case makes the fake agent call kadena_transaction with input that fails,
+either in local validation or with a 4xx from the Kadena API stub. "llm" is the
+previous behaviour (every error explained by the answer model, --llm-latency per
+call); "template" is the current one. Every case has a known error code, so the
+template run must make no answer-model calls.
+
+Usage (from kadena-ai/):
+    python -m benchmarks.error_explanations --rounds 10 --llm-latency 2
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import agent
+from benchmarks.fakes import FakeChatModel, StubServer
+from errors import TEMPLATES, ErrorCode
+from http_client import close_http_clients
+from metrics import collect_spans
+from quote_cache import QuoteCache
+from router import IntentRouter
+
+ZUSD = "n_b742b4e9c600892af545afb408326e82a6c0c6ed.zUSD"
+QUOTE = {"endpoint": "quote", "tokenInAddress": "coin", "tokenOutAddress": ZUSD, "amountIn": "10", "chainId": "2"}
+TRANSFER = {"endpoint": "transfer", "tokenAddress": "coin", "sender": "k:" + "a" * 64, "receiver": "k:" + "b" * 64, "amount": "5", "chainId": "2"}
+
+# name: (tool input, (status, body) from the Kadena API or None)
+CASES: Dict[str, Tuple[Dict[str, Any], Optional[Tuple[int, Dict[str, Any]]]]] = {
+    "both amounts": ({**QUOTE, "amountOut": "3"}, None),
+    "missing params": ({"endpoint": "transfer", "tokenAddress": "coin", "amount": "5", "chainId": "2"}, None),
+    "bad chain": ({**QUOTE, "chainId": "25"}, None),
+    "no pool": (QUOTE, (404, {"error": "Liquidity pool not found", "details": "Could not find a valid trading pair for the provided tokens"})),
+    "bad receiver": (TRANSFER, (400, {"error": "Invalid receiver format", "details": "Receiver account appears to be invalid"})),
+}
+
+
+async def _run(rounds: int, stub: StubServer, llm_latency: float) -> Tuple[List[float], int]:
+    latencies, answer_calls = [], 0
+    for _ in range(rounds):
+        for name, (tool_input, upstream) in CASES.items():
+            stub.errors = {f"/{tool_input['endpoint']}": upstream} if upstream else {}
+            agent.ChatOpenAI = lambda model, **kwargs: FakeChatModel(
+                model=model, latency=llm_latency, content="explanation",
+                function_call={"name": "kadena_transaction", "arguments": tool_input}, **kwargs
+            )
+            agent.init_registry()
+            with collect_spans() as spans:
+                start = time.perf_counter()
+                result = await agent.arun_kadena_agent_with_context(f"{name} please", [])
+                latencies.append(time.perf_counter() - start)
+            answer_calls += sum(1 for s in spans if s["stage"] == "llm_answer")
+            assert result["response"], name
+    return latencies, answer_calls
+
+
+async def main(args) -> None:
+    assert set(TEMPLATES) == set(ErrorCode), "every error code needs a template"
+    with StubServer(latency=args.api_latency) as stub:
+        agent.KADENA_API_BASE_URL = stub.url
+        agent.QUOTE_CACHE = QuoteCache(ttl=0)
+        agent.INTENT_ROUTER = IntentRouter(enabled=False)
+
+        explain_error = agent.explain_error
+        agent.explain_error = lambda tool_input, tool_output: None
+        llm, llm_calls = await _run(args.rounds, stub, args.llm_latency)
+        agent.explain_error = explain_error
+        template, template_calls = await _run(args.rounds, stub, args.llm_latency)
+        await close_http_clients()
+
+    requests = len(CASES) * args.rounds
+    print(f"llm       mean = {statistics.mean(llm) * 1000:8.1f}ms, {llm_calls} answer-model calls for {requests} failed requests")
+    print(f"template  mean = {statistics.mean(template) * 1000:8.1f}ms, {template_calls} answer-model calls for {requests} failed requests")
+    print(f"latency saved  = {1 - statistics.mean(template) / statistics.mean(llm):8.1%}")
+    assert llm_calls == requests
+    assert template_calls == 0, "a known error went to the answer model"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=2.0, help="Seconds per fake model call")
+    parser.add_argument("--api-latency", type=float, default=0.02)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for ChatOpenAI. Sleeps for `latency` seconds per call and
+    answers with `function_call` when the agent binds functions, otherwise `content`.
+    When streamed, waits `latency` for the first token and `token_latency` between
+    the words of `content`.
+    """
+    model: str = "fake"
+    latency: float = 0.2
+    token_latency: float = 0.0
+    content: str = "ok"
+    function_call: Optional[Dict[str, Any]] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _message(self, kwargs: Dict[str, Any]) -> AIMessage:
+        if self.function_call and kwargs.get("functions"):
+            return AIMessage(
+                content="",
+                additional_kwargs={"function_call": {
+                    "name": self.function_call["name"],
+                    "arguments": json.dumps(self.function_call["arguments"]),
+                }},
+            )
+        return AIMessage(content=self.content)
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._message(kwargs))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        await asyncio.sleep(self.token_latency * len(self.content.split()))
+        return ChatResult(generations=[ChatGeneration(message=self._message(kwargs))])
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for i, word in enumerate(self.content.split(" ")):
+            if i:
+                await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+
+
+QUOTE_CALL = {
+    "name": "kadena_transaction",
+    "arguments": {
+        "endpoint": "quote",
+        "tokenInAddress": "coin",
+        "tokenOutAddress": "n_b742b4e9c600892af545afb408326e82a6c0c6ed.zUSD",
+        "amountIn": "10",
+        "chainId": "2",
+    },
+}
+
+TRANSFER_CALL = {
+    "name": "kadena_transaction",
+    "arguments": {
+        "endpoint": "transfer",
+        "tokenAddress": "coin",
+        "sender": "k:sender",
+        "receiver": "k:receiver",
+        "amount": "5",
+        "chainId": "2",
+    },
+}
+
+ANALYSIS_CALL = {
+    "name": "kadena_analysis",
+    "arguments": {"query": "What is Kadena's consensus mechanism?", "systemPrompt": "You are K-Agent."},
+}
+
+
+class StubServer:
+    """
+    Local stand-in for KADENA_API_BASE_URL and ANALYSIS_API_URL. Every POST sleeps
+    for `latency` seconds and returns a canned JSON body for its path, or the
+    (status, body) set for it in `errors`. While `failures` is above zero, each
+    POST instead gets a 503 HTML page, as from a cold-starting render.com service,
+    and decrements it. A `tail_rate` share of POSTs sleeps `tail_latency` instead
+    of `latency`, for a long latency tail.
+    """
+
+    RESPONSES = {
+        "/quote": {"amountOut": "12.34", "priceImpact": "0.01"},
+        "/transfer": {"transaction": {"cmd": "{}", "hash": "stub-hash", "sigs": [None]}},
+        "/swap": {"transaction": {"cmd": "{}", "hash": "stub-hash", "sigs": [None]}},
+        "/query": {"response": "Kadena is a proof-of-work blockchain."},
+    }
+
+    def __init__(self, latency: float = 0.05, tail_latency: float = 0.0, tail_rate: float = 0.0):
+        self.latency = latency
+        self.tail_latency = tail_latency
+        self.tail_rate = tail_rate
+        self.requests = 0
+        self.errors: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        self.failures = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as two small writes. With Nagle on, the body
+            # waits for the client's delayed ACK of the headers, adding ~40ms to
+            # every call on a reused keep-alive connection.
+            disable_nagle_algorithm = True
+
+            def _reply(self, status: int, body: Dict[str, Any]) -> None:
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _reply_html(self, status: int, body: str) -> None:
+                payload = body.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._reply(200, {"status": "ok"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                stub.requests += 1
+                time.sleep(stub.tail_latency if random.random() < stub.tail_rate else stub.latency)
+                if stub.failures > 0:
+                    stub.failures -= 1
+                    self._reply_html(503, "<html><body>Service waking up</body></html>")
+                elif self.path in stub.errors:
+                    self._reply(*stub.errors[self.path])
+                else:
+                    self._reply(200, stub.RESPONSES.get(self.path, {"status": "ok"}))
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        # Cancelled (hedged) requests close their connection mid-reply
+        self._server.handle_error = lambda request, client_address: None
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,88 @@
+"""
+Hedged kadena_analysis calls against a local stand-in for the RAG service with
+a long latency tail: --tail-rate of requests take --tail-latency seconds, the
+rest --api-latency.
+
+Runs --calls sequential analysis calls with hedging off, then on, and prints
+p50/p95/p99 latency for each, with the hedge rate, the hedge win rate and the
+extra requests sent. Asserts that the hedges counted match the extra requests
+the stub saw, that hedging cuts p99 and that the extra load stays within
+--budget (plus the allowance of MAX_HEDGE_TOKENS).
+
+Usage (from kadena-ai/):
+    python -m benchmarks.hedging --calls 400 --budget 0.1
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import agent
+from benchmarks.fakes import StubServer
+from hedging import MAX_HEDGE_TOKENS, Hedger
+from http_client import close_http_clients
+
+
+def _percentile(timings: List[float], percentile: float) -> float:
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(percentile / 100 * len(ordered)))]
+
+
+async def _run(stub: StubServer, hedger: Hedger, calls: int) -> List[float]:
+    agent.ANALYSIS_HEDGER = hedger
+    tool = agent.KadenaAnalysisTool()
+    stub.requests = 0
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        result = await tool._arun(query="What is Kadena?", systemPrompt="")
+        timings.append(time.perf_counter() - start)
+        assert "error" not in result, result
+    return timings
+
+
+def _report(label: str, timings: List[float], requests: int) -> None:
+    print(
+        f"{label:9} p50 {statistics.median(timings) * 1000:7.1f}ms  p95 {_percentile(timings, 95) * 1000:7.1f}ms  "
+        f"p99 {_percentile(timings, 99) * 1000:7.1f}ms  requests {requests}"
+    )
+
+
+async def main(args) -> None:
+    with StubServer(latency=args.api_latency, tail_latency=args.tail_latency, tail_rate=args.tail_rate) as stub:
+        agent.ANALYSIS_API_URL = f"{stub.url}/query"
+
+        plain = await _run(stub, Hedger("analysis_api", enabled=False), args.calls)
+        _report("unhedged", plain, stub.requests)
+
+        hedger = Hedger(
+            "analysis_api", enabled=True, percentile=args.percentile, min_delay=args.min_delay,
+            budget=args.budget, min_samples=args.min_samples
+        )
+        hedged = await _run(stub, hedger, args.calls)
+        _report("hedged", hedged, stub.requests)
+        stats = hedger.stats()
+        print(f"hedging   {stats}")
+
+        # A hedge cancelled after sending is still answered by the stub; let it count the request
+        await asyncio.sleep(0.1)
+        extra = stub.requests - args.calls
+        assert extra == stats["hedges"], f"{extra} extra requests for {stats['hedges']} hedges"
+        assert stats["hedges"] <= args.budget * args.calls + MAX_HEDGE_TOKENS, f"{stats['hedges']} hedges over budget"
+        assert _percentile(hedged, 99) < _percentile(plain, 99), "hedging should cut the p99"
+
+        await close_http_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--api-latency", type=float, default=0.01)
+    parser.add_argument("--tail-latency", type=float, default=0.5)
+    parser.add_argument("--tail-rate", type=float, default=0.03, help="Share of requests that take --tail-latency")
+    parser.add_argument("--percentile", type=float, default=95, help="Latency percentile to hedge after")
+    parser.add_argument("--min-delay", type=float, default=0.02)
+    parser.add_argument("--budget", type=float, default=0.1, help="Hedges allowed per call")
+    parser.add_argument("--min-samples", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
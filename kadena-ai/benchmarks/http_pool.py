@@ -0,0 +1,80 @@
+"""
+Per-call latency of tool HTTP requests: bare requests.post vs the pooled clients.
+
+Sends sequential POSTs to a local stand-in for the Kadena API. Bare requests.post
+opens a new connection per call; the shared session and async client reuse
+keep-alive connections. Locally that only saves the TCP handshake (about 0.5ms);
+against the onrender.com services a new connection also pays DNS and a TLS
+handshake, which this benchmark does not measure.
+
+A pooled call slower than a bare one means a reused connection is stalling,
+e.g. Nagle's algorithm waiting on a delayed ACK (~40ms per call), and fails the run.
+
+Usage (from kadena-ai/):
+    python -m benchmarks.http_pool --calls 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import requests
+
+from benchmarks.fakes import StubServer
+from http_client import HTTP_TIMEOUT, close_http_clients, get_async_client, get_session
+
+BODY = {"tokenInAddress": "coin", "tokenOutAddress": "kaddex.kdx", "amountIn": "1", "chainId": "2"}
+
+
+def _report(label: str, samples) -> float:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    mean = statistics.mean(samples)
+    print(f"{label:<22} mean={mean * 1000:7.2f}ms  p95={p95 * 1000:7.2f}ms")
+    return mean
+
+
+def _bare(url: str, calls: int):
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        requests.post(url, json=BODY).json()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _pooled(url: str, calls: int):
+    session = get_session()
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        session.post(url, json=BODY, timeout=HTTP_TIMEOUT).json()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def _async_pooled(url: str, calls: int):
+    client = get_async_client()
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        (await client.post(url, json=BODY)).json()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def main(args) -> None:
+    with StubServer(latency=0) as stub:
+        url = f"{stub.url}/quote"
+        bare = _report("requests.post", _bare(url, args.calls))
+        pooled = _report("pooled session", _pooled(url, args.calls))
+        async_pooled = _report("pooled async client", await _async_pooled(url, args.calls))
+        await close_http_clients()
+    # Allow for noise; a stalled keep-alive connection is an order of magnitude slower
+    assert pooled < bare * 1.5 and async_pooled < bare * 1.5, "pooled connections are slower than new ones"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,93 @@
+"""
+Intent router: what it parses, how often it hits on a traffic mix, and the
+latency it saves against the full agent pipeline.
+
+Runs MIX through the async /query pipeline with the router off and on, against
+fake chat models (--llm-latency per call) and a local Kadena API stub, and times
+router.parse_intent over the query table in tests/test_router.py.
+
+Usage (from kadena-ai/):
+    python -m benchmarks.intent_router --rounds 20 --llm-latency 0.5
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+import agent
+from benchmarks.fakes import QUOTE_CALL, FakeChatModel, StubServer
+from http_client import close_http_clients
+from quote_cache import QuoteCache
+from router import IntentRouter, parse_intent
+from tests.test_router import PARSE_CASES
+
+SENDER = "k:" + "a" * 64
+RECEIVER = "k:" + "b" * 64
+
+# One round of traffic: half formulaic, half for the agent
+MIX = [
+    "How much zUSD do I get for 10 KDA?",
+    "quote 25 KDX to KDA",
+    f"transfer 5 KDA from {SENDER} to {RECEIVER}",
+    "What's the best DEX on Kadena?",
+    "Swap 10 KDA for zUSD",
+    "Can you tell me the price of KDA?",
+]
+
+
+def _time_parser(repeat: int = 100) -> None:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query, _ in PARSE_CASES:
+            parse_intent(query)
+    per_query = (time.perf_counter() - start) / (repeat * len(PARSE_CASES))
+    print(f"parser: {per_query * 1e6:.1f}us per query over {len(PARSE_CASES)} cases")
+
+
+async def _run(rounds: int) -> List[float]:
+    latencies = []
+    for _ in range(rounds):
+        for query in MIX:
+            start = time.perf_counter()
+            result = await agent.arun_kadena_agent_with_context(query, [])
+            latencies.append(time.perf_counter() - start)
+            assert "error" not in str(result["response"]), result
+    return latencies
+
+
+async def main(args) -> Dict[str, float]:
+    _time_parser()
+    with StubServer(latency=args.api_latency) as stub:
+        agent.KADENA_API_BASE_URL = stub.url
+        agent.QUOTE_CACHE = QuoteCache(ttl=0)
+        agent.ChatOpenAI = lambda model, **kwargs: FakeChatModel(
+            model=model, latency=args.llm_latency, content="ok", function_call=QUOTE_CALL, **kwargs
+        )
+        agent.init_registry()
+        await agent.arun_kadena_agent_with_context(MIX[0], [])  # warm up
+
+        agent.INTENT_ROUTER = IntentRouter(enabled=False)
+        off = await _run(args.rounds)
+        agent.INTENT_ROUTER = IntentRouter(enabled=True)
+        on = await _run(args.rounds)
+        await close_http_clients()
+
+    stats = agent.INTENT_ROUTER.stats()
+    saved_ms = (statistics.mean(off) - statistics.mean(on)) * 1000
+    print(f"router off  mean = {statistics.mean(off) * 1000:8.1f}ms")
+    print(f"router on   mean = {statistics.mean(on) * 1000:8.1f}ms")
+    print(f"hit rate         = {stats['hit_rate']:8.1%} ({stats['hits']} of {stats['hits'] + stats['misses']})")
+    print(f"saved per query  = {saved_ms:8.1f}ms measured, {stats['est_saved_ms'] / len(on):.1f}ms estimated by the router")
+    print(f"parse time       = {stats['avg_route_ms']:8.3f}ms per query")
+    assert stats["hit_rate"] == 0.5, stats
+    assert saved_ms > 0, "the fast path was not faster"
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds per fake model call")
+    parser.add_argument("--api-latency", type=float, default=0.02)
+    asyncio.run(main(parser.parse_args()))
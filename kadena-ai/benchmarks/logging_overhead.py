@@ -0,0 +1,90 @@
+"""
+Logging cost on the request path: the old synchronous handlers vs the queue-based
+JSON pipeline in log_setup.py.
+
+Simulates --concurrency requests in flight on one event loop. Each request logs
+the lines a /query does, plus one full LLM response as a payload, with a short
+await between them. "sync" is the previous setup: logging.basicConfig with a
+StreamHandler and a FileHandler, both written on the caller's thread. "queue" is
+configure_logging, where callers only enqueue. The time spent inside logger
+calls is what each request pays on the event loop.
+
+Usage (from kadena-ai/):
+    python -m benchmarks.logging_overhead --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+import log_setup
+
+PAYLOAD = "Kadena runs Chainweb, a braided proof-of-work chain. " * 200
+logger = logging.getLogger("benchmarks.logging_overhead")
+
+
+def _sync_logging(log_file: str, stream) -> None:
+    root = logging.getLogger()
+    root.handlers = []
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(stream), logging.FileHandler(log_file)],
+        force=True
+    )
+
+
+async def _run(requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    in_logger = 0.0
+
+    async def one(i: int) -> None:
+        nonlocal in_logger
+        async with semaphore:
+            token = log_setup.request_id_var.set(f"req-{i}")
+            for line in ("Received query request", "Processing query with agent", "Using kadena_analysis"):
+                start = time.perf_counter()
+                logger.info(line)
+                in_logger += time.perf_counter() - start
+                await asyncio.sleep(0)
+            start = time.perf_counter()
+            logger.info("LLM response", extra={"payload": PAYLOAD})
+            logger.info("Successfully processed query", extra={"duration_ms": 12.5})
+            in_logger += time.perf_counter() - start
+            log_setup.request_id_var.reset(token)
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return in_logger
+
+
+def main(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        _sync_logging(os.path.join(tmp, "sync.log"), devnull)
+        sync_seconds = asyncio.run(_run(args.requests, args.concurrency))
+
+        handler = log_setup.configure_logging(os.path.join(tmp, "queue.log"), stream=devnull)
+        queue_seconds = asyncio.run(_run(args.requests, args.concurrency))
+        start = time.perf_counter()
+        log_setup.stop_logging()
+        drain = time.perf_counter() - start
+
+        with open(os.path.join(tmp, "queue.log")) as f:
+            written = sum(1 for _ in f)
+        logging.getLogger().handlers = []
+
+    per_request = lambda seconds: seconds / args.requests * 1e6
+    print(f"sync   logging on request path = {per_request(sync_seconds):8.1f}µs/request ({sync_seconds * 1000:.1f}ms total)")
+    print(f"queue  logging on request path = {per_request(queue_seconds):8.1f}µs/request ({queue_seconds * 1000:.1f}ms total)")
+    print(f"removed from the request path  = {1 - queue_seconds / sync_seconds:8.1%}")
+    print(f"queue  writer drain after run  = {drain * 1000:8.1f}ms, {written} lines written, {handler.dropped} dropped")
+    # Every record but the sampled payloads reaches the file
+    assert written + handler.dropped >= args.requests * 4, "records went missing"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    main(parser.parse_args())
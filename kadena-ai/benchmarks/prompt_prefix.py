@@ -0,0 +1,34 @@
+"""
+Prompt prefix stability: how much of the rendered Agent K prompt is shared by
+different requests, and so can be served from the provider's prompt cache.
+
+Renders the agent prompt for the requests in tests/test_prompt_prefix.py, with
+different queries, histories and token mentions, with and without a scratchpad,
+and prints the shared prefix and the cacheable share of each request. That the
+static system prompt is byte-identical and long enough to be cached (OpenAI
+caches prompts from 1024 tokens) is checked by the tests.
+
+Usage (from kadena-ai/):
+    python -m benchmarks.prompt_prefix
+"""
+import argparse
+import os
+
+from agent import _build_prompt
+from memory import estimate_tokens
+from tests.test_prompt_prefix import render_all
+
+
+def main(args) -> None:
+    rendered = render_all(_build_prompt())
+    shared = os.path.commonprefix(rendered)
+
+    print(f"requests rendered     = {len(rendered)}")
+    print(f"shared prefix         = {len(shared)} chars (~{estimate_tokens(shared)} tokens)")
+    for text in rendered:
+        print(f"  cacheable share     = {len(shared) / len(text):6.1%} of {len(text)} chars")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    main(parser.parse_args())
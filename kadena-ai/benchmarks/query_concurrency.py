@@ -0,0 +1,66 @@
+"""
+Concurrent /query throughput: blocking pipeline vs async pipeline.
+
+Runs the agent pipeline against a fake chat model and a local Kadena API stub, with
+N queries in flight on a single event loop (the same situation as one uvicorn
+worker). The blocking pipeline stays flat as N grows; the async one scales.
+
+Usage (from kadena-ai/):
+    python -m benchmarks.query_concurrency --llm-latency 0.2 --api-latency 0.05
+"""
+import argparse
+import asyncio
+import time
+
+import agent
+from benchmarks.fakes import FakeChatModel, StubServer, QUOTE_CALL
+from http_client import close_http_clients
+
+
+async def _blocking_handler(query: str):
+    # What /query did before: a sync pipeline called from inside an async handler.
+    return agent.run_kadena_agent_with_context(query, [])
+
+
+async def _async_handler(query: str):
+    return await agent.arun_kadena_agent_with_context(query, [])
+
+
+async def _measure(handler, in_flight: int, total: int) -> float:
+    semaphore = asyncio.Semaphore(in_flight)
+
+    async def one(i: int):
+        async with semaphore:
+            await handler(f"quote 10 KDA to zUSD #{i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+async def main(args) -> None:
+    with StubServer(latency=args.api_latency) as stub:
+        agent.KADENA_API_BASE_URL = stub.url
+        agent.ANALYSIS_API_URL = f"{stub.url}/query"
+        agent.ChatOpenAI = lambda model, **kwargs: FakeChatModel(
+            model=model, latency=args.llm_latency, function_call=QUOTE_CALL, **kwargs
+        )
+        agent.init_registry()
+
+        print(f"{'in-flight':>10} {'blocking req/s':>16} {'async req/s':>14}")
+        for in_flight in args.in_flight:
+            total = in_flight * args.rounds
+            blocking = await _measure(_blocking_handler, in_flight, total)
+            concurrent = await _measure(_async_handler, in_flight, total)
+            print(f"{in_flight:>10} {blocking:>16.2f} {concurrent:>14.2f}")
+
+        await close_http_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--api-latency", type=float, default=0.05)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    asyncio.run(main(parser.parse_args()))
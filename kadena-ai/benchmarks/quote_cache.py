@@ -0,0 +1,67 @@
+"""
+Upstream quote calls with and without the quote cache.
+
+Fires bursts of identical quote requests (KDA -> zUSD with varied spellings of the
+same amount) at KadenaTransactionTool against a local stand-in for the Kadena API
+and counts how many reach it. Without the cache every request is a POST; with it a
+burst coalesces into one call and repeats within QUOTE_CACHE_TTL are served from
+memory, carrying cacheAgeSeconds.
+
+Usage (from kadena-ai/):
+    python -m benchmarks.quote_cache --bursts 5 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+
+import agent
+from benchmarks.fakes import StubServer
+from http_client import close_http_clients
+from quote_cache import QUOTE_CACHE
+
+AMOUNTS = ["10", "10.0", 10, "10.00"]
+
+
+def _body(i: int):
+    return {"tokenInAddress": "coin", "tokenOutAddress": "n_b742b4e9c600892af545afb408326e82a6c0c6ed.zUSD",
+            "amountIn": AMOUNTS[i % len(AMOUNTS)], "chainId": "2"}
+
+
+async def _run(tool, bursts: int, concurrency: int, cached: bool):
+    call = tool._arun if cached else tool._apost
+    outputs = []
+    start = time.perf_counter()
+    for _ in range(bursts):
+        outputs += await asyncio.gather(*(
+            call(endpoint="quote", body=_body(i)) if cached else call("quote", _body(i))
+            for i in range(concurrency)
+        ))
+    return time.perf_counter() - start, outputs
+
+
+async def main(bursts: int, concurrency: int, latency: float) -> None:
+    tool = agent.KadenaTransactionTool()
+    with StubServer(latency=latency) as stub:
+        agent.KADENA_API_BASE_URL = stub.url
+        try:
+            elapsed, _ = await _run(tool, bursts, concurrency, cached=False)
+            print(f"uncached: {stub.requests:4d} upstream calls for {bursts * concurrency} quotes, {elapsed * 1000:.0f}ms")
+
+            stub.requests = 0
+            elapsed, outputs = await _run(tool, bursts, concurrency, cached=True)
+            ages = sorted({output.get("cacheAgeSeconds") for output in outputs})
+            print(f"cached:   {stub.requests:4d} upstream calls for {bursts * concurrency} quotes, {elapsed * 1000:.0f}ms")
+            print(f"cacheAgeSeconds seen: {ages}")
+            print(QUOTE_CACHE.stats())
+            assert stub.requests == 1, "identical quotes within the TTL should reach the API once"
+        finally:
+            await close_http_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.1)
+    args = parser.parse_args()
+    asyncio.run(main(args.bursts, args.concurrency, args.latency))
@@ -0,0 +1,92 @@
+"""
+Retries and circuit breaking for tool HTTP calls, against a flaky local stand-in
+for the Kadena API and the RAG service.
+
+    cold start   two 503s, then success: a quote is retried and succeeds
+    no retry     a transfer builds a new transaction, so one 503 is returned as is
+    outage       the upstream stays down: the circuit opens after
+                 --threshold failures and later calls fail fast without a request
+    recovery     the upstream is back: after --reset seconds one trial call goes
+                 through and closes the circuit
+    analysis     the RAG call is retried like a quote
+
+Backoff is shortened to --backoff seconds so the run takes a few seconds. The
+breaker transitions, retry rules and backoff bounds are covered case by case in
+tests/test_resilience.py; this walks the tools through them end to end.
+
+Usage (from kadena-ai/):
+    python -m benchmarks.resilience --threshold 3 --reset 0.5
+"""
+import argparse
+import asyncio
+import functools
+import time
+
+import agent
+import resilience
+from benchmarks.fakes import StubServer
+from http_client import close_http_clients
+from quote_cache import QuoteCache
+from resilience import CLOSED, OPEN, CircuitBreaker
+
+ZUSD = "n_b742b4e9c600892af545afb408326e82a6c0c6ed.zUSD"
+QUOTE = {"tokenInAddress": "coin", "tokenOutAddress": ZUSD, "amountIn": "10", "chainId": "2"}
+TRANSFER = {"tokenAddress": "coin", "sender": "k:" + "a" * 64, "receiver": "k:" + "b" * 64, "amount": "5", "chainId": "2"}
+
+
+async def main(args) -> None:
+    resilience.backoff_delay = functools.partial(resilience.backoff_delay, base=args.backoff, cap=args.backoff * 4)
+    transactions, analysis = agent.KadenaTransactionTool(), agent.KadenaAnalysisTool()
+
+    with StubServer(latency=args.api_latency) as stub:
+        agent.KADENA_API_BASE_URL = stub.url
+        agent.ANALYSIS_API_URL = f"{stub.url}/query"
+        agent.QUOTE_CACHE = QuoteCache(ttl=0)
+        breaker = agent.KADENA_API_BREAKER = CircuitBreaker("kadena_api", failure_threshold=args.threshold, reset_seconds=args.reset)
+        agent.ANALYSIS_API_BREAKER = CircuitBreaker("analysis_api", failure_threshold=args.threshold, reset_seconds=args.reset)
+
+        stub.requests, stub.failures = 0, 2
+        result = await transactions._arun("quote", QUOTE)
+        assert "error" not in result and stub.requests == 3, (result, stub.requests)
+        print(f"cold start  quote succeeded after {stub.requests - 1} retries")
+
+        stub.requests, stub.failures = 0, 1
+        result = await transactions._arun("transfer", TRANSFER)
+        assert result.get("code") == "upstream_unavailable" and stub.requests == 1, (result, stub.requests)
+        print("no retry    transfer sent once, failed with upstream_unavailable")
+        breaker.record_success()
+
+        stub.requests, stub.failures = 0, 10 ** 6
+        timings = []
+        for _ in range(args.calls):
+            start = time.perf_counter()
+            result = await transactions._arun("quote", QUOTE)
+            timings.append(time.perf_counter() - start)
+            assert result.get("code") == "upstream_unavailable", result
+        assert breaker.stats()["state"] == OPEN
+        assert stub.requests == args.threshold, f"{stub.requests} requests reached a down upstream"
+        fast = timings[-1] * 1000
+        print(f"outage      {args.calls} quotes, {stub.requests} reached the upstream, then failing fast in {fast:.2f}ms: {breaker.stats()}")
+
+        stub.requests, stub.failures = 0, 0
+        await asyncio.sleep(args.reset)
+        result = await transactions._arun("quote", QUOTE)
+        assert "error" not in result and breaker.stats()["state"] == CLOSED, (result, breaker.stats())
+        print(f"recovery    trial call succeeded, circuit {breaker.stats()['state']}")
+
+        stub.requests, stub.failures = 0, 1
+        result = await analysis._arun(query="What is Kadena?", systemPrompt="")
+        assert "error" not in result and stub.requests == 2, (result, stub.requests)
+        print("analysis    RAG call succeeded after 1 retry")
+
+        await close_http_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=int, default=3, help="Failures before the circuit opens")
+    parser.add_argument("--reset", type=float, default=0.5, help="Seconds the circuit stays open")
+    parser.add_argument("--backoff", type=float, default=0.01, help="Backoff base in seconds")
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--api-latency", type=float, default=0.01)
+    asyncio.run(main(parser.parse_args()))
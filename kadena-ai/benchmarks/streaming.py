@@ -0,0 +1,63 @@
+"""
+Time to first byte for /query vs /query/stream.
+
+Runs an analysis question through the full pipeline (agent call, RAG tool call,
+gpt-5 answer) against fake models and a local stand-in for the RAG service. The
+answer model takes --llm-latency to its first token and --token-latency between
+words. /query returns nothing until the whole answer exists; /query/stream sends
+the first event immediately and the first answer token as soon as the model emits it.
+
+Usage (from kadena-ai/):
+    python -m benchmarks.streaming --llm-latency 0.5 --token-latency 0.02
+"""
+import argparse
+import asyncio
+import time
+
+import agent
+from benchmarks.fakes import ANALYSIS_CALL, FakeChatModel, StubServer
+from http_client import close_http_clients
+
+ANSWER = " ".join(["Kadena runs Chainweb, a braided proof-of-work chain."] * 20)
+
+
+async def main(args) -> None:
+    with StubServer(latency=args.api_latency) as stub:
+        agent.ANALYSIS_API_URL = f"{stub.url}/query"
+        agent.ChatOpenAI = lambda model, **kwargs: FakeChatModel(
+            model=model, latency=args.llm_latency, token_latency=args.token_latency,
+            content=ANSWER, function_call=ANALYSIS_CALL, **kwargs
+        )
+        agent.init_registry()
+        query = ANALYSIS_CALL["arguments"]["query"]
+
+        start = time.perf_counter()
+        result = await agent.arun_kadena_agent_with_context(query, [])
+        blocking_total = time.perf_counter() - start
+
+        start = time.perf_counter()
+        first_event = first_token = None
+        text = ""
+        async for event in agent.astream_kadena_agent_with_context(query, []):
+            now = time.perf_counter() - start
+            first_event = first_event if first_event is not None else now
+            if event["event"] == "token":
+                first_token = first_token if first_token is not None else now
+                text += event["text"]
+        stream_total = time.perf_counter() - start
+
+        assert text == result["response"], "streamed text should match the /query response"
+        print(f"/query         first byte = total = {blocking_total * 1000:7.1f}ms")
+        print(f"/query/stream  first event        = {first_event * 1000:7.1f}ms")
+        print(f"/query/stream  first answer token = {first_token * 1000:7.1f}ms")
+        print(f"/query/stream  total              = {stream_total * 1000:7.1f}ms")
+
+        await close_http_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    parser.add_argument("--api-latency", type=float, default=0.1)
+    asyncio.run(main(parser.parse_args()))
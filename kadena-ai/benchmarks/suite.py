@@ -0,0 +1,141 @@
+"""
+Offline /query benchmark suite: latency percentiles, throughput and allocations
+for each kind of query, with no OpenAI or onrender.com calls.
+
+Every scenario runs the async /query pipeline (agent call, tool call, answer
+model) against fake chat models and a local stand-in for KADENA_API_BASE_URL and
+ANALYSIS_API_URL:
+
+    quote      agent picks kadena_transaction/quote, Kadena API /quote
+    transfer   agent picks kadena_transaction/transfer, Kadena API /transfer
+    analysis   agent picks kadena_analysis, RAG /query, then the answer model
+
+Each scenario is timed with --requests queries, --concurrency in flight, then run
+again under tracemalloc to measure allocations per request (timed separately,
+since tracing slows everything down). The quote cache is disabled so every quote
+reaches the stub, and the intent router is off so every query reaches the agent. Pass --output to save the results as a JSON baseline.
+
+Usage (from kadena-ai/):
+    python -m benchmarks.suite --requests 200 --concurrency 8 --llm-latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+import agent
+from benchmarks.fakes import ANALYSIS_CALL, QUOTE_CALL, TRANSFER_CALL, FakeChatModel, StubServer
+from http_client import close_http_clients
+from quote_cache import QuoteCache
+from router import IntentRouter
+
+SCENARIOS = {
+    "quote": (QUOTE_CALL, "How much zUSD do I get for 10 KDA?"),
+    "transfer": (TRANSFER_CALL, "Send 5 KDA to k:receiver"),
+    "analysis": (ANALYSIS_CALL, "What is Kadena's consensus mechanism?"),
+}
+ANSWER = " ".join(["Kadena runs Chainweb, a braided proof-of-work chain."] * 5)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of `samples`.
+    """
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+async def _run(query: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await agent.arun_kadena_agent_with_context(f"{query} #{i}", [])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+        "throughput_rps": round(requests / elapsed, 2),
+    }
+
+
+async def _allocations(query: str, requests: int) -> Dict[str, Any]:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        for i in range(requests):
+            await agent.arun_kadena_agent_with_context(f"{query} #{i}", [])
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    return {
+        "alloc_blocks_per_request": blocks // requests,
+        "peak_kib": round((peak - base) / 1024, 1),
+        "retained_kib_per_request": round((current - base) / 1024 / requests, 2),
+    }
+
+
+async def main(args) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    with StubServer(latency=args.api_latency) as stub:
+        agent.KADENA_API_BASE_URL = stub.url
+        agent.ANALYSIS_API_URL = f"{stub.url}/query"
+        agent.QUOTE_CACHE = QuoteCache(ttl=0)
+        # Measure the agent path; benchmarks.intent_router covers the fast path
+        agent.INTENT_ROUTER = IntentRouter(enabled=False)
+
+        for name in args.scenarios:
+            function_call, query = SCENARIOS[name]
+            agent.ChatOpenAI = lambda model, **kwargs: FakeChatModel(
+                model=model, latency=args.llm_latency, token_latency=args.token_latency,
+                content=ANSWER, function_call=function_call, **kwargs
+            )
+            agent.init_registry()
+            # Warm up clients and lazily built state before measuring
+            await agent.arun_kadena_agent_with_context(query, [])
+
+            results[name] = await _run(query, args.requests, args.concurrency)
+            results[name].update(await _allocations(query, args.alloc_requests))
+
+        await close_http_clients()
+
+    print(f"{'scenario':<10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'blocks/req':>11} {'peak KiB':>9}")
+    for name, r in results.items():
+        print(
+            f"{name:<10} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} "
+            f"{r['throughput_rps']:>9.1f} {r['alloc_blocks_per_request']:>11} {r['peak_kib']:>9.1f}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        print(f"saved {args.output}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--alloc-requests", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds to first token per fake model call")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds per generated word")
+    parser.add_argument("--api-latency", type=float, default=0.02)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    asyncio.run(main(parser.parse_args()))
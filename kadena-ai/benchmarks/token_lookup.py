@@ -0,0 +1,67 @@
+"""
+Token lookup cost: TokenRegistry indexes vs scanning the TOKENS YAML text.
+
+"Text scan" is what code had to do before the registry existed: walk the YAML
+lines to find an entry by symbol or address and read its precision.
+
+Usage (from kadena-ai/):
+    python -m benchmarks.token_lookup --iterations 20000
+"""
+import argparse
+import time
+from typing import Optional
+
+from config import TOKENS
+from tokens import TOKEN_REGISTRY
+
+QUERIES = ["KDA", "zusd", "kaddex.kdx", "runonflux.flux", "PP", "free.elon", "NOPE"]
+
+
+def _scan_text(key: str) -> Optional[int]:
+    in_mainnet = False
+    current = matched = None
+    for line in TOKENS.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if not line.startswith(" "):
+            in_mainnet = line.startswith("mainnet:")
+        elif not in_mainnet:
+            continue
+        elif not line.startswith("   ") and stripped.endswith(":"):
+            current = stripped[:-1]
+            if current == key:
+                matched = current
+        elif stripped.startswith("symbol:") and stripped[7:].strip().lower() == key.lower():
+            matched = current
+        elif stripped.startswith("precision:") and matched is not None and current == matched:
+            return int(stripped[10:])
+    return None
+
+
+def _registry(key: str) -> Optional[int]:
+    token = TOKEN_REGISTRY.resolve(key)
+    return token.precision if token else None
+
+
+def _time(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for key in QUERIES:
+            fn(key)
+    return (time.perf_counter() - start) / (iterations * len(QUERIES))
+
+
+def main(args) -> None:
+    for key in QUERIES:
+        assert _scan_text(key) == _registry(key), key
+    scan = _time(_scan_text, args.iterations)
+    indexed = _time(_registry, args.iterations)
+    print(f"text scan: {scan * 1e6:9.2f} us/lookup")
+    print(f"registry:  {indexed * 1e6:9.2f} us/lookup ({scan / indexed:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    main(parser.parse_args())
@@ -0,0 +1,32 @@
+"""
+Local transaction validation: validations per second on the mix of valid and
+invalid requests in tests/test_validation.py, whose diagnostics the tests check.
+
+Every request there is one the Kadena API would reject (or accept), so each
+rejection here saves a round trip to onrender.com. Runs without network access.
+
+Usage (from kadena-ai/):
+    python -m benchmarks.validation --iterations 20000
+"""
+import argparse
+import time
+
+from tests.test_validation import CASES
+from validation import TRANSACTION_VALIDATOR
+
+
+def main(args) -> None:
+    requests = [(endpoint, body) for endpoint, body, _ in CASES]
+    start = time.perf_counter()
+    for i in range(args.iterations):
+        endpoint, body = requests[i % len(requests)]
+        TRANSACTION_VALIDATOR.validate(endpoint, body)
+    elapsed = time.perf_counter() - start
+    per_call = elapsed / args.iterations * 1e6
+    print(f"validate  = {per_call:8.2f}µs per request, {args.iterations / elapsed:,.0f} requests/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    main(parser.parse_args())
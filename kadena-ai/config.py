@@ -7,6 +7,9 @@ load_dotenv()
 # API Keys
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 API_KEY = os.getenv("API_KEY")
+# Headers for Kadena API calls. Without API_KEY the x-api-key header is left out:
+# requests drops a None header, but httpx rejects it with a TypeError
+KADENA_API_HEADERS = {'Content-Type': 'application/json', **({'x-api-key': API_KEY} if API_KEY else {})}
 
 # OpenAI Model Configuration
 MODEL_NAME = "o4-mini"
@@ -513,8 +516,64 @@ blacklist:
 KADENA_API_BASE_URL = "https://kadena-agents.onrender.com"
 ANALYSIS_API_URL = "https://kadena-rag.onrender.com/query"
 
+# HTTP Connection Pool Configuration
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))  # Async client: total connections across hosts
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "4"))  # Sync session: hosts kept in its pool cache, one pool each
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "10"))  # Concurrent connections per host
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))  # Seconds
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))  # Seconds
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))  # Idle seconds before a pooled connection is dropped
+
+# Upstream Resilience Configuration (Kadena API and RAG service tool calls)
+UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", "2"))  # Extra attempts for idempotent calls (quote, analysis) after a 5xx or connection error
+UPSTREAM_BACKOFF_BASE = float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.25"))  # Seconds; retry n waits a random time up to base * 2**n
+UPSTREAM_BACKOFF_MAX = float(os.getenv("UPSTREAM_BACKOFF_MAX", "4"))  # Longest wait between retries, in seconds
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))  # Consecutive failed calls before an upstream's circuit opens
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))  # Time calls fail fast before one trial call is let through
+
+# Hedged Requests Configuration (kadena_analysis RAG calls, async pipeline)
+ANALYSIS_HEDGING = os.getenv("ANALYSIS_HEDGING", "false").lower() == "true"  # Send a second RAG request when the first is slow
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))  # Hedge after this percentile of recent RAG latencies
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.05"))  # Never hedge sooner than this, in seconds
+HEDGE_BUDGET = float(os.getenv("HEDGE_BUDGET", "0.1"))  # Hedges allowed per request, on average (0.1 = at most ~10% extra load)
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))  # Latencies observed before the first hedge
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", "500"))  # Recent latencies the percentile is taken over
+
 # History Configuration
-MAX_HISTORY_LENGTH = 10  # Maximum number of conversation pairs to keep
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))  # Estimated tokens of history sent to the agent
+HISTORY_SUMMARY_SHARE = 0.25  # Share of the budget used by the rolling summary of older turns
+HISTORY_ENTRY_MAX_CHARS = 2000  # Longest single history entry kept verbatim
+
+# Session Store Configuration (opt-in server-side history)
+SESSION_STORE_URL = os.getenv("SESSION_STORE_URL", "memory")  # "memory" or a redis:// URL shared by all workers
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))  # Idle time before a session expires
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))  # In-memory store size before LRU eviction
+
+# Quote Cache Configuration
+QUOTE_CACHE_TTL = float(os.getenv("QUOTE_CACHE_TTL", "15"))  # Seconds an identical quote is served from cache
+QUOTE_CACHE_MAX_ENTRIES = int(os.getenv("QUOTE_CACHE_MAX_ENTRIES", "1000"))  # Distinct quotes kept before LRU eviction
+
+# Logging Configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FILE_MAX_BYTES = int(os.getenv("LOG_FILE_MAX_BYTES", str(10 * 1024 * 1024)))  # Log file size before it is rotated
+LOG_FILE_BACKUPS = int(os.getenv("LOG_FILE_BACKUPS", "5"))  # Rotated log files kept
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # Records waiting for the writer thread before new ones are dropped
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "2000"))  # Longest message or field written before truncation
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.1"))  # Share of INFO/DEBUG payload records (full LLM responses) kept
+
+# Intent Router Configuration (formulaic quotes and transfers skip the agent)
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+DEFAULT_CHAIN_ID = "2"  # Chain used when a routed query names none, as the agent prompt does
+
+# Transaction Validation Configuration (checked locally before calling the Kadena API)
+ENDPOINT_CHAIN_IDS = {  # Chains an endpoint's contracts are used on; endpoints not listed accept chains 0-19
+    "quote": ("2",),           # Kaddex/eckoDEX pools
+    "swap": ("2",),
+    "nft/launch": ("2",),      # Marmalade v2, as the tool description requires
+    "nft/collection": ("2",),
+}
+DEFAULT_TOKEN_PRECISION = 12  # Decimal places for tokens listed without a precision, as the Kadena API assumes
+MAX_SLIPPAGE = 0.5  # Highest slippage the Kadena API accepts (50%)
 
 # Ecosystem Projects Data
 ECOSYSTEM_PROJECTS = """
@@ -0,0 +1,173 @@
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from tokens import TOKEN_REGISTRY
+
+
+class ErrorCode(str, Enum):
+    """
+    Kinds of kadena_transaction failure that have a written explanation. The
+    first group is only detected locally, before any API call (see validation.py);
+    the second is read from the Kadena API's 4xx responses (see kadena-api/routes)
+    and most of it is also caught locally. The last is a Kadena API that could
+    not be reached, after retries or because its circuit is open (see resilience.py).
+    """
+    INVALID_ENDPOINT = "invalid_endpoint"
+    AMOUNT_CONFLICT = "amount_conflict"
+    AMOUNT_MISSING = "amount_missing"
+    MISSING_PARAMS = "missing_params"
+    BLACKLISTED_TOKEN = "blacklisted_token"
+    INVALID_CHAIN = "invalid_chain"
+    WRONG_CHAIN = "wrong_chain"
+    UNKNOWN_TOKEN = "unknown_token"
+    AMOUNT_PRECISION = "amount_precision"
+
+    INVALID_ACCOUNT = "invalid_account"
+    INVALID_AMOUNT = "invalid_amount"
+    INVALID_SLIPPAGE = "invalid_slippage"
+    POOL_NOT_FOUND = "pool_not_found"
+    INSUFFICIENT_LIQUIDITY = "insufficient_liquidity"
+    ACCOUNT_NOT_FOUND = "account_not_found"
+    COLLECTION_EXISTS = "collection_exists"
+    INVALID_GUARD = "invalid_guard"
+    INVALID_ROYALTY = "invalid_royalty"
+
+    UPSTREAM_UNAVAILABLE = "upstream_unavailable"
+
+
+# `error` field of the Kadena API's 4xx responses -> code
+UPSTREAM_ERRORS = {
+    "Invalid chainId": ErrorCode.INVALID_CHAIN,
+    "Missing required parameters": ErrorCode.MISSING_PARAMS,
+    "Missing required fields": ErrorCode.MISSING_PARAMS,
+    "Invalid amount parameters": ErrorCode.AMOUNT_CONFLICT,
+    "Invalid amount": ErrorCode.INVALID_AMOUNT,
+    "Invalid amount format": ErrorCode.INVALID_AMOUNT,
+    "Invalid account format": ErrorCode.INVALID_ACCOUNT,
+    "Invalid sender format": ErrorCode.INVALID_ACCOUNT,
+    "Invalid receiver format": ErrorCode.INVALID_ACCOUNT,
+    "Invalid receiver account": ErrorCode.INVALID_ACCOUNT,
+    "Invalid mintTo account": ErrorCode.INVALID_ACCOUNT,
+    "Invalid slippage value": ErrorCode.INVALID_SLIPPAGE,
+    "Invalid slippage format": ErrorCode.INVALID_SLIPPAGE,
+    "Liquidity pool not found": ErrorCode.POOL_NOT_FOUND,
+    "Insufficient liquidity": ErrorCode.INSUFFICIENT_LIQUIDITY,
+    "Account not found": ErrorCode.ACCOUNT_NOT_FOUND,
+    "Collection already exists": ErrorCode.COLLECTION_EXISTS,
+    "Missing required guard parameters": ErrorCode.INVALID_GUARD,
+    "Invalid guard keys": ErrorCode.INVALID_GUARD,
+    "Invalid royalty": ErrorCode.INVALID_ROYALTY,
+    "Missing/Invalid royalty recipient": ErrorCode.INVALID_ROYALTY,
+}
+
+# How a parameter is named to the user
+PARAM_NAMES = {
+    "tokenAddress": "the token to send",
+    "tokenInAddress": "the token you are selling",
+    "tokenOutAddress": "the token you are buying",
+    "amount": "the amount",
+    "amountIn": "the amount to sell",
+    "amountOut": "the amount to buy",
+    "sender": "the sender's account (k:...)",
+    "receiver": "the receiver's account (k:...)",
+    "account": "your account (k:...)",
+    "mintTo": "the account to mint to (k:...)",
+    "guard": "the guard (keys and pred)",
+    "uri": "the metadata URI",
+    "collectionId": "the collection ID (collection:...)",
+    "name": "the name",
+    "chainId": "the chain",
+}
+
+TEMPLATES = {
+    ErrorCode.INVALID_ENDPOINT: "I can't build a `{endpoint}` transaction. I can create quotes, transfers, swaps, NFT mints and NFT collections.",
+    ErrorCode.AMOUNT_CONFLICT: "A {endpoint} takes either the amount you sell (amountIn, {amountIn}) or the amount you buy (amountOut, {amountOut}), not both. Tell me which side should be exact and I'll try again.",
+    ErrorCode.AMOUNT_MISSING: "I need an amount for this {endpoint}: either how much {token_in} you want to sell or how much {token_out} you want to buy.",
+    ErrorCode.MISSING_PARAMS: "To build this {endpoint} I still need {missing}.",
+    ErrorCode.BLACKLISTED_TOKEN: "{token} is blacklisted: it is deprecated or unsafe, and I won't build transactions for it. Please choose another token.",
+    ErrorCode.INVALID_CHAIN: "Chain {chainId} doesn't exist. Kadena mainnet has chains 0 to 19, and trading happens on chain 2.",
+    ErrorCode.WRONG_CHAIN: "{endpoint} transactions are only available on chain {chains}, not chain {chainId}.",
+    ErrorCode.UNKNOWN_TOKEN: "{token} is not a token I know on Kadena mainnet{suggestion}. Please check the token's contract address.",
+    ErrorCode.AMOUNT_PRECISION: "{amount} has more decimal places than {token} supports ({precision}). Please round it to at most {precision} decimals.",
+    ErrorCode.INVALID_ACCOUNT: "The account is not valid ({details}). Kadena accounts here are `k:` followed by a 64-character public key.",
+    ErrorCode.INVALID_AMOUNT: "{amount} is not a valid amount. Amounts must be numbers greater than 0.",
+    ErrorCode.INVALID_SLIPPAGE: "A slippage of {slippage} is out of range. It must be between 0 and 0.5 (50%); the default is 0.005 (0.5%).",
+    ErrorCode.POOL_NOT_FOUND: "There is no liquidity pool between {token_in} and {token_out} on chain {chainId}. Try going through KDA, for example {token_in} to KDA and then KDA to {token_out}.",
+    ErrorCode.INSUFFICIENT_LIQUIDITY: "The {token_in}/{token_out} pool on chain {chainId} doesn't have enough liquidity for this amount. Try a smaller amount.",
+    ErrorCode.ACCOUNT_NOT_FOUND: "The account {account} doesn't exist on chain {chainId}. It has to be created, usually by funding it, on that chain first.",
+    ErrorCode.COLLECTION_EXISTS: "A collection named \"{name}\" already exists. Please choose a different name.",
+    ErrorCode.INVALID_GUARD: "The guard is not valid: {details}. It needs a `keys` list of 64-character hex public keys and a `pred` such as keys-all.",
+    ErrorCode.INVALID_ROYALTY: "The royalty settings are not valid: {details}. Royalties must be above 0 and need a k: recipient account.",
+    ErrorCode.UPSTREAM_UNAVAILABLE: "The Kadena API isn't responding right now (it may be starting up), so I couldn't build this {endpoint}. Please try again in {retry_after} seconds.",
+}
+
+
+def tool_error(code: ErrorCode, message: str, **params: Any) -> Dict[str, Any]:
+    """
+    The tool's error dict for a failure of kind `code`. `params` fill in its
+    explanation template.
+    """
+    return {"error": message, "code": code.value, **({"params": params} if params else {})}
+
+
+def upstream_error(prefix: str, error_data: Dict[str, Any], default: str = "Unknown error") -> Dict[str, Any]:
+    """
+    The tool's error dict for a Kadena API error body, with its code if the
+    error is a known one.
+    """
+    error = error_data.get("error", default)
+    result: Dict[str, Any] = {"error": f"{prefix}: {error}"}
+    if error_data.get("details"):
+        result["details"] = error_data["details"]
+    if error in UPSTREAM_ERRORS:
+        result["code"] = UPSTREAM_ERRORS[error].value
+    return result
+
+
+def _token_name(address: Any) -> str:
+    token = TOKEN_REGISTRY.get(str(address)) if address else None
+    return token.symbol if token else str(address or "the token")
+
+
+def explain_error(tool_input: Dict[str, Any], tool_output: Dict[str, Any]) -> Optional[str]:
+    """
+    Written explanation of a kadena_transaction error, with the original error
+    appended, or None if the error has no known code and needs the LLM.
+    """
+    try:
+        template = TEMPLATES[ErrorCode(tool_output.get("code"))]
+    except ValueError:
+        return None
+
+    params: Dict[str, Any] = {
+        "details": "no details given",
+        "amount": tool_input.get("amount") or tool_input.get("amountIn") or tool_input.get("amountOut"),
+        "account": tool_input.get("sender") or tool_input.get("account") or "the account",
+        "token": _token_name(tool_input.get("tokenAddress") or tool_input.get("tokenInAddress")),
+        "token_in": _token_name(tool_input.get("tokenInAddress")),
+        "token_out": _token_name(tool_input.get("tokenOutAddress")),
+        "slippage": "this",
+        "suggestion": "",
+        "chains": "2",
+        "retry_after": "a few",
+        "name": "",
+        "amountIn": None,
+        "amountOut": None,
+        "chainId": "?",
+        **tool_input,
+        **({"details": str(tool_output["details"]).rstrip(".")} if tool_output.get("details") else {}),
+        **tool_output.get("params", {}),
+    }
+    if "missing" in params:
+        params["missing"] = " and ".join(PARAM_NAMES.get(name, name) for name in params["missing"])
+    elif "missing" in template:
+        # Upstream only says something is missing
+        params["missing"] = "some required details"
+    if "token" in tool_output.get("params", {}):
+        params["token"] = _token_name(params["token"])
+
+    explanation = template.format_map(params)
+    original = tool_output["error"]
+    if tool_output.get("details"):
+        original += f" ({tool_output['details']})"
+    return f"{explanation}\n\nError: {original}"
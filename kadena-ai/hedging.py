@@ -0,0 +1,202 @@
+import asyncio
+import collections
+import contextvars
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from config import (
+    ANALYSIS_HEDGING, HEDGE_PERCENTILE, HEDGE_MIN_DELAY, HEDGE_BUDGET, HEDGE_MIN_SAMPLES, HEDGE_WINDOW
+)
+from metrics import HEDGES
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Most hedge tokens saved up, so an idle period can't fund a burst of hedges
+MAX_HEDGE_TOKENS = 10.0
+
+
+class _Attempt:
+    """
+    One request made under a Hedger: whether its body has been sent upstream.
+    """
+
+    def __init__(self):
+        self.sent = False
+
+
+# The attempt the current task is making, set by Hedger._timed
+_attempt: contextvars.ContextVar[Optional[_Attempt]] = contextvars.ContextVar("hedge_attempt", default=None)
+
+
+async def hedge_trace(event: str, info: Dict[str, Any]) -> None:
+    """
+    httpx `trace` extension for hedged calls. Marks the current attempt as sent
+    once the request body is written, so a hedge cancelled before then is not
+    counted as extra load.
+    """
+    if event.endswith("send_request_body.complete"):
+        attempt = _attempt.get()
+        if attempt is not None:
+            attempt.sent = True
+
+
+class Hedger:
+    """
+    Hedged requests for one upstream. When a call has not answered within the
+    HEDGE_PERCENTILE of recent latencies, an identical second call is sent and
+    whichever answers first wins; the other is cancelled. Each call earns
+    `budget` hedge tokens and each hedge spends one, so hedges stay within
+    `budget` extra requests per call on average.
+
+    A hedge only counts once its request has gone out: calls pass `hedge_trace`
+    to httpx so the Hedger can tell. A hedge cancelled before then gets its
+    token back and is counted under `unsent`.
+    """
+
+    def __init__(
+        self, name: str, enabled: bool = ANALYSIS_HEDGING, percentile: float = HEDGE_PERCENTILE,
+        min_delay: float = HEDGE_MIN_DELAY, budget: float = HEDGE_BUDGET, min_samples: int = HEDGE_MIN_SAMPLES,
+        window: int = HEDGE_WINDOW
+    ):
+        self.name = name
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.budget = budget
+        self.min_samples = min_samples
+        self.latencies: Deque[float] = collections.deque(maxlen=window)
+        self.tokens = 0.0
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.unsent = 0
+        self.over_budget = 0
+        self._lock = threading.Lock()
+
+    def delay(self) -> Optional[float]:
+        """
+        Seconds to wait before hedging, or None until enough latencies are known.
+        """
+        with self._lock:
+            if len(self.latencies) < max(1, self.min_samples):
+                return None
+            ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, round(self.percentile / 100 * len(ordered)) - 1))
+        return max(self.min_delay, ordered[index])
+
+    def _observe(self, seconds: float) -> None:
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def _take_token(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                self.over_budget += 1
+                return False
+            self.tokens -= 1
+            return True
+
+    def _settle(self, hedge: _Attempt, hedge_won: bool) -> str:
+        """
+        Count a finished hedge and return its result label. A hedge that never
+        went out refunds its token.
+        """
+        with self._lock:
+            if not hedge.sent:
+                self.unsent += 1
+                self.tokens = min(MAX_HEDGE_TOKENS, self.tokens + 1)
+                return "unsent"
+            self.hedges += 1
+            if hedge_won:
+                self.hedge_wins += 1
+        return "hedge_won" if hedge_won else "primary_won"
+
+    async def _timed(self, call: Callable[[], Awaitable[T]], attempt: _Attempt, observe: bool) -> T:
+        token = _attempt.set(attempt)
+        start = time.perf_counter()
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            # The call took at least this long: a censored sample, so losing to
+            # a hedge doesn't bias the window towards fast calls
+            if observe:
+                self._observe(time.perf_counter() - start)
+            raise
+        finally:
+            _attempt.reset(token)
+        # A call that finished without reaching the trace hook still went out
+        attempt.sent = True
+        if observe:
+            self._observe(time.perf_counter() - start)
+        return result
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await `call()`, hedging it with a second `call()` if it is slow. Only the
+        first call's latency is recorded: every call has one, whereas hedges are
+        only sent for slow calls and usually cancelled early.
+        """
+        with self._lock:
+            self.calls += 1
+            self.tokens = min(MAX_HEDGE_TOKENS, self.tokens + self.budget)
+        delay = self.delay() if self.enabled else None
+        if delay is None:
+            return await self._timed(call, _Attempt(), observe=True)
+
+        primary = asyncio.ensure_future(self._timed(call, _Attempt(), observe=True))
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self._take_token():
+                if not done:
+                    HEDGES.inc(upstream=self.name, result="over_budget")
+                return await primary
+        except BaseException:
+            primary.cancel()
+            raise
+
+        attempt = _Attempt()
+        hedge = asyncio.ensure_future(self._timed(call, attempt, observe=False))
+        pending = {primary, hedge}
+        winner = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        return task.result()
+            # Both failed: report the first request's error
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                # Let the losing call see its cancellation, so it is recorded and
+                # a hedge that had not gone out yet counts as unsent
+                await asyncio.wait(pending)
+            result = self._settle(attempt, winner is hedge)
+            if winner is None and result != "unsent":
+                result = "both_failed"
+            HEDGES.inc(upstream=self.name, result=result)
+
+    def stats(self) -> Dict[str, Any]:
+        delay = self.delay()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "calls": self.calls,
+                "hedges": self.hedges,
+                "hedge_rate": round(self.hedges / self.calls, 4) if self.calls else None,
+                "hedge_win_rate": round(self.hedge_wins / self.hedges, 4) if self.hedges else None,
+                "unsent": self.unsent,
+                "over_budget": self.over_budget,
+                "delay_ms": round(delay * 1000, 1) if delay is not None else None,
+            }
+
+
+# Hedges kadena_analysis calls to the RAG service
+ANALYSIS_HEDGER = Hedger("analysis_api")
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    HTTP_POOL_SIZE, HTTP_POOL_HOSTS, HTTP_MAX_PER_HOST, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT,
+    HTTP_KEEPALIVE_EXPIRY
+)
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeout passed to every call made through the sync session
+HTTP_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+# Process-wide clients. Both keep connections alive between calls so tool calls to
+# the Kadena API and the RAG service reuse TCP/TLS sessions instead of handshaking
+# on every request.
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+class _PerHostLimitTransport(httpx.AsyncHTTPTransport):
+    """
+    httpx transport that caps the number of concurrent requests to any single host.
+    httpx only limits connections globally, so this adds the per-host limit on top.
+    """
+
+    def __init__(self, max_per_host: int, **kwargs):
+        super().__init__(**kwargs)
+        self._max_per_host = max_per_host
+        self._semaphores: Dict[Tuple[bytes, bytes, Optional[int]], asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = (request.url.raw_scheme, request.url.raw_host, request.url.port)
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = self._semaphores[key] = asyncio.Semaphore(self._max_per_host)
+        async with semaphore:
+            return await super().handle_async_request(request)
+
+
+def get_session() -> requests.Session:
+    """
+    Return the process-wide pooled requests session, creating it if necessary.
+    Callers should pass timeout=HTTP_TIMEOUT on every request.
+
+    requests keeps one pool per host, up to HTTP_POOL_HOSTS of them, each holding
+    at most HTTP_MAX_PER_HOST connections. It has no total limit like the async
+    client's HTTP_POOL_SIZE.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                logger.info(
+                    f"Creating shared HTTP session (host_pools={HTTP_POOL_HOSTS}, per_host={HTTP_MAX_PER_HOST})"
+                )
+                session = requests.Session()
+                # pool_block makes callers wait for a free connection instead of
+                # opening (and then discarding) connections beyond the per-host limit.
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_HOSTS,
+                    pool_maxsize=HTTP_MAX_PER_HOST,
+                    pool_block=True
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide async HTTP client, creating it if necessary.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        logger.info(
+            f"Creating shared async HTTP client (max_connections={HTTP_POOL_SIZE}, per_host={HTTP_MAX_PER_HOST})"
+        )
+        transport = _PerHostLimitTransport(
+            max_per_host=HTTP_MAX_PER_HOST,
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_SIZE,
+                max_keepalive_connections=HTTP_POOL_SIZE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            )
+        )
+        _async_client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+        )
+    return _async_client
+
+
+async def close_http_clients() -> None:
+    """
+    Close the shared HTTP clients, if they were created.
+    """
+    global _async_client, _session
+    if _async_client is not None and not _async_client.is_closed:
+        logger.info("Closing shared async HTTP client")
+        await _async_client.aclose()
+    _async_client = None
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
@@ -0,0 +1,136 @@
+import atexit
+import contextvars
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from typing import Any, Dict, Optional, TextIO
+
+from config import (
+    LOG_LEVEL, LOG_FILE_MAX_BYTES, LOG_FILE_BACKUPS, LOG_QUEUE_SIZE, LOG_MAX_FIELD_CHARS,
+    LOG_PAYLOAD_SAMPLE_RATE
+)
+
+# Id of the HTTP request being handled, added to every record logged while serving it
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def truncate(value: str, limit: int = LOG_MAX_FIELD_CHARS) -> str:
+    """
+    Cut `value` to `limit` characters, noting how much was dropped.
+    """
+    if len(value) <= limit:
+        return value
+    return f"{value[:limit]}…[+{len(value) - limit} chars]"
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: ts, level, logger, msg, request_id, any `extra`
+    fields (such as duration_ms) and the traceback if there is one. Long strings
+    are truncated to LOG_MAX_FIELD_CHARS.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": truncate(record.getMessage()),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and value is not None:
+                entry[key] = truncate(value) if isinstance(value, str) else value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = truncate(record.exc_text, LOG_MAX_FIELD_CHARS * 4)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _PayloadSampler(logging.Filter):
+    """
+    Keeps LOG_PAYLOAD_SAMPLE_RATE of the INFO/DEBUG records that carry a `payload`
+    (logger.info("...", extra={"payload": text})). Warnings and errors are always kept.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "payload", None) is None or record.levelno >= logging.WARNING:
+            return True
+        return random.random() < LOG_PAYLOAD_SAMPLE_RATE
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves only message formatting on the caller's thread.
+    Records are stamped with the current request id. When the writer thread falls
+    behind and the queue is full, records are dropped and counted, not blocked on.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.addFilter(_PayloadSampler())
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The queue handler is the root's only handler, so the record is not copied.
+        # Args are resolved now, since they may change before the writer gets to them.
+        record.request_id = request_id_var.get()
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(log_file: str, stream: TextIO = sys.stderr) -> AsyncQueueHandler:
+    """
+    Route all logging through a bounded queue to a writer thread, which writes JSON
+    lines to `stream` and to `log_file`, rotated at LOG_FILE_MAX_BYTES. Log calls
+    on the request path only format the message and enqueue it.
+    """
+    global _listener
+    stop_logging()
+
+    formatter = JsonFormatter()
+    file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding="utf-8")
+    stream_handler = logging.StreamHandler(stream)
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = AsyncQueueHandler(log_queue)
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _listener.start()
+    return queue_handler
+
+
+def stop_logging() -> None:
+    """
+    Flush queued records and stop the writer thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
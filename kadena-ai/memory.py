@@ -0,0 +1,177 @@
+import json
+import logging
+import re
+from typing import Any, Dict, List
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from config import HISTORY_TOKEN_BUDGET, HISTORY_SUMMARY_SHARE, HISTORY_ENTRY_MAX_CHARS
+from metrics import record_tokens
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English prompts
+CHARS_PER_TOKEN = 4
+# Characters of an evicted entry kept in the rolling summary
+SUMMARY_SNIPPET_CHARS = 100
+SUMMARY_PREFIX = "Summary: "
+
+# Transaction fields that are only needed for signing, never for the conversation
+BULKY_KEYS = ("cmd", "sigs")
+# Matches a quoted bulky value in the str() of a result dict, e.g. 'cmd': '{"payload": ...}'
+_BULKY_VALUE = re.compile(r"""(['"](?:cmd|sigs)['"]\s*:\s*)(?:'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|\[[^\]]*\])""")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate, good enough for budgeting.
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def strip_payloads(value: Any) -> Any:
+    """
+    Replace signing payloads (Pact cmd JSON, sigs) in a tool result with their size,
+    keeping the hash and the rest of the metadata.
+    """
+    if isinstance(value, dict):
+        stripped = {}
+        for key, item in value.items():
+            if key in BULKY_KEYS:
+                stripped[key] = f"<{len(str(item))} chars omitted>"
+            else:
+                stripped[key] = strip_payloads(item)
+        return stripped
+    if isinstance(value, list):
+        return [strip_payloads(item) for item in value]
+    return value
+
+
+def _omit_value(match: "re.Match") -> str:
+    value = match.group(0)[len(match.group(1)):]
+    if "omitted>" in value:
+        return match.group(0)
+    quote = '"' if value.startswith('"') else "'"
+    return f"{match.group(1)}{quote}<{len(value)} chars omitted>{quote}"
+
+
+def _compact_entry(entry: str) -> str:
+    """
+    Strip payloads that were already stringified (e.g. history resent by a client)
+    and cap the entry length.
+    """
+    if entry.startswith(SUMMARY_PREFIX):
+        return entry
+    entry = _BULKY_VALUE.sub(_omit_value, entry)
+    if len(entry) > HISTORY_ENTRY_MAX_CHARS:
+        entry = entry[:HISTORY_ENTRY_MAX_CHARS] + "…"
+    return entry
+
+
+def _condense(entry: str) -> str:
+    """
+    One-line digest of a history entry that is being evicted.
+    """
+    if entry.startswith(SUMMARY_PREFIX):
+        return entry[len(SUMMARY_PREFIX):]
+    if entry.startswith("Human: "):
+        entry = "user asked: " + entry[7:]
+    elif entry.startswith("AI: "):
+        entry = "agent replied: " + entry[4:]
+    return entry[:SUMMARY_SNIPPET_CHARS].replace("\n", " ")
+
+
+def compact_history(history: List[str], budget: int = HISTORY_TOKEN_BUDGET) -> List[str]:
+    """
+    Fit history into `budget` estimated tokens. Recent entries are kept verbatim
+    (minus signing payloads); older ones are folded into a single leading
+    "Summary:" entry whose size is capped.
+    """
+    history = [_compact_entry(entry) for entry in history]
+    if sum(estimate_tokens(entry) for entry in history) <= budget:
+        return history
+
+    recent_budget = int(budget * (1 - HISTORY_SUMMARY_SHARE))
+    kept: List[str] = []
+    used = 0
+    for entry in reversed(history):
+        cost = estimate_tokens(entry)
+        if used + cost > recent_budget:
+            break
+        kept.append(entry)
+        used += cost
+    kept.reverse()
+
+    evicted = history[:len(history) - len(kept)]
+    summary = "; ".join(_condense(entry) for entry in evicted)
+    summary_chars = int(budget * HISTORY_SUMMARY_SHARE) * CHARS_PER_TOKEN
+    if len(summary) > summary_chars:
+        # Keep the most recent part of the summary
+        summary = "…" + summary[-(summary_chars - 1):]
+    return [SUMMARY_PREFIX + summary] + kept
+
+
+def record_turn(history: List[str], query: str, result: Any) -> List[str]:
+    """
+    Append one exchange to history and enforce the budget.
+    """
+    if isinstance(result, (dict, list)):
+        reply = json.dumps(strip_payloads(result), ensure_ascii=False, default=str)
+    else:
+        reply = str(result)
+    return compact_history(history + [
+        "Human: " + query,
+        "AI: " + reply
+    ])
+
+
+class LLMInputLogger(BaseCallbackHandler):
+    """
+    Logs the input size of every call made through a chat model: an estimate from
+    the rendered messages when the call starts, and the provider-reported prompt
+    tokens when it ends, including how many of them were served from the
+    provider's prompt cache.
+    """
+    run_inline = True
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], **kwargs: Any) -> None:
+        chars = sum(len(str(message.content)) for batch in messages for message in batch)
+        logger.info(f"LLM input: model={self.model_name} chars={chars} est_tokens={chars // CHARS_PER_TOKEN}")
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        usage = _token_usage(response)
+        if usage:
+            prompt_tokens = usage.get("prompt_tokens")
+            cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+            cached_share = f"{cached_tokens / prompt_tokens:.0%}" if prompt_tokens else "n/a"
+            record_tokens(self.model_name, prompt_tokens, usage.get("completion_tokens"), cached_tokens)
+            logger.info(
+                f"LLM usage: model={self.model_name} prompt_tokens={prompt_tokens} "
+                f"cached_tokens={cached_tokens} ({cached_share}) "
+                f"completion_tokens={usage.get('completion_tokens')}"
+            )
+
+
+def _token_usage(response: Any) -> Dict[str, Any]:
+    """
+    Provider token usage in the OpenAI shape. Non-streaming calls report it in
+    llm_output; streamed calls only on the message's usage_metadata.
+    """
+    usage = (response.llm_output or {}).get("token_usage")
+    if usage:
+        return usage
+    for batch in response.generations:
+        for generation in batch:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                return {
+                    "prompt_tokens": metadata.get("input_tokens"),
+                    "completion_tokens": metadata.get("output_tokens"),
+                    "prompt_tokens_details": {
+                        "cached_tokens": (metadata.get("input_token_details") or {}).get("cache_read")
+                    }
+                }
+    return {}
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from config import QUOTE_CACHE_TTL, QUOTE_CACHE_MAX_ENTRIES
+from tokens import TOKEN_REGISTRY
+
+logger = logging.getLogger(__name__)
+
+QuoteKey = Tuple[str, str, str, str, str]
+
+
+class _PendingFetch:
+    """
+    A sync fetch in flight: waiters block on `done`, then take its result or error.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+
+
+def _normalize_amount(amount: Any) -> str:
+    """
+    Canonical form of an amount, so "1", "1.0" and 1 share a cache entry.
+    """
+    try:
+        return format(Decimal(str(amount)).normalize(), "f")
+    except InvalidOperation:
+        return str(amount).strip()
+
+
+def _normalize_token(address: Any) -> str:
+    """
+    Contract address for a token given by address or symbol ("KDA" -> "coin").
+    """
+    token = TOKEN_REGISTRY.resolve(str(address).strip())
+    return token.address if token is not None else str(address).strip()
+
+
+def quote_key(body: Dict[str, Any]) -> QuoteKey:
+    """
+    Cache key for a quote request: (tokenIn, tokenOut, amount, direction, chainId).
+    """
+    direction = "in" if "amountIn" in body else "out"
+    amount = body.get("amountIn") if direction == "in" else body.get("amountOut")
+    return (
+        _normalize_token(body.get("tokenInAddress")),
+        _normalize_token(body.get("tokenOutAddress")),
+        _normalize_amount(amount),
+        direction,
+        str(body.get("chainId")).strip()
+    )
+
+
+class QuoteCache:
+    """
+    Short-lived cache of Kadena API quotes. Identical requests made while a quote is
+    being fetched wait for that fetch instead of sending their own, in both the
+    threaded (sync tool) and asyncio (async tool) paths. Only successful quotes are
+    cached; errors are returned to every waiter and then forgotten.
+
+    Results carry `cacheAgeSeconds`: 0 for a quote fetched for this call, otherwise
+    how long ago the cached quote was fetched.
+    """
+
+    def __init__(self, ttl: float = QUOTE_CACHE_TTL, max_entries: int = QUOTE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[QuoteKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sync_inflight: Dict[QuoteKey, _PendingFetch] = {}
+        self._async_inflight: Dict[QuoteKey, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _lookup(self, key: QuoteKey) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        fetched_at, quote = entry
+        age = time.monotonic() - fetched_at
+        if age >= self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return {**quote, "cacheAgeSeconds": round(age, 1)}
+
+    def _store(self, key: QuoteKey, quote: Dict[str, Any]) -> Dict[str, Any]:
+        if isinstance(quote, dict) and "error" not in quote:
+            self._entries[key] = (time.monotonic(), quote)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return {**quote, "cacheAgeSeconds": 0}
+        return quote
+
+    def get(self, body: Dict[str, Any], fetch: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Return a quote for `body`, calling `fetch` (blocking) at most once per key
+        across threads.
+        """
+        key = quote_key(body)
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            pending = self._sync_inflight.get(key)
+            leader = pending is None
+            if leader:
+                self.misses += 1
+                pending = self._sync_inflight[key] = _PendingFetch()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            if pending.result is None:
+                # The fetching thread was interrupted; fetch for this caller instead
+                return fetch()
+            with self._lock:
+                cached = self._lookup(key)
+            return cached or pending.result
+
+        try:
+            quote = fetch()
+            with self._lock:
+                pending.result = self._store(key, quote)
+            return pending.result
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._sync_inflight[key]
+            pending.done.set()
+
+    async def aget(self, body: Dict[str, Any], fetch: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Async version of get: concurrent callers for the same key share one fetch.
+        """
+        key = quote_key(body)
+        with self._lock:
+            cached = self._lookup(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        pending = self._async_inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            try:
+                quote = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The caller doing the fetch was cancelled; fetch for this caller instead
+                return await fetch()
+            with self._lock:
+                cached = self._lookup(key)
+            return cached or quote
+
+        self.misses += 1
+        pending = self._async_inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            quote = await fetch()
+            with self._lock:
+                result = self._store(key, quote)
+            pending.set_result(quote)
+            return result
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            pending.exception()  # Waiters re-raise it; don't warn if there are none
+            raise
+        finally:
+            self._async_inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced
+        }
+
+
+# Shared by the sync and async transaction tools
+QUOTE_CACHE = QuoteCache()
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import math
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple, Type
+
+import httpx
+import requests
+
+from config import (
+    UPSTREAM_RETRIES, UPSTREAM_BACKOFF_BASE, UPSTREAM_BACKOFF_MAX, BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_SECONDS
+)
+from metrics import UPSTREAM_CALLS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Responses that mean the upstream is unhealthy (render.com answers 502/503 while a service cold-starts)
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Failures before or while talking to the upstream; a response with an error status is not one of these
+SYNC_ERRORS: Tuple[Type[BaseException], ...] = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+ASYNC_ERRORS: Tuple[Type[BaseException], ...] = (httpx.TransportError,)
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an upstream whose circuit is open.
+    """
+
+    def __init__(self, upstream: str, retry_after: float):
+        # Whole seconds, at least 1, for messages
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"{upstream} is unavailable, retry in {self.retry_after}s")
+        self.upstream = upstream
+
+
+class CircuitBreaker:
+    """
+    Per-upstream circuit breaker. After `failure_threshold` consecutive failures
+    the circuit opens and calls fail fast for `reset_seconds`. Then one trial call
+    is let through (half open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> None:
+        """
+        Raise CircuitOpenError unless a call may go through now.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            waited = time.monotonic() - self.opened_at
+            if self.state == OPEN and waited >= self.reset_seconds:
+                self.state = HALF_OPEN
+                self.trial_in_flight = False
+            if self.state == HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return
+            UPSTREAM_CALLS.inc(upstream=self.name, outcome="rejected")
+            raise CircuitOpenError(self.name, max(0.0, self.reset_seconds - waited))
+
+    def release(self) -> None:
+        """
+        End a call that says nothing about the upstream's health (cancelled, or
+        failed before reaching it), so a half-open circuit can try again.
+        """
+        with self._lock:
+            self.trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = CLOSED
+            self.failures = 0
+            self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                logger.warning(f"Circuit for {self.name} opened after {self.failures} consecutive failures")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {"state": self.state, "consecutive_failures": self.failures}
+            if self.state == OPEN:
+                stats["retry_after_seconds"] = round(max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at)), 1)
+            return stats
+
+
+def backoff_delay(attempt: int, base: float = UPSTREAM_BACKOFF_BASE, cap: float = UPSTREAM_BACKOFF_MAX) -> float:
+    """
+    Seconds to wait before retry number `attempt` (0-based): full jitter, a
+    random time up to base * 2**attempt, capped at `cap`.
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _record(breaker: CircuitBreaker, failed: bool, attempt: int, retries: int) -> bool:
+    """
+    Record one attempt's outcome. True if the call is finished, False to retry.
+    """
+    if not failed:
+        breaker.record_success()
+        UPSTREAM_CALLS.inc(upstream=breaker.name, outcome="retried" if attempt else "ok")
+        return True
+    breaker.record_failure()
+    if attempt == retries:
+        UPSTREAM_CALLS.inc(upstream=breaker.name, outcome="failed")
+        return True
+    return False
+
+
+def call_with_retry(breaker: CircuitBreaker, send: Callable[[], Any], retries: int = UPSTREAM_RETRIES) -> Any:
+    """
+    Call `send` (a blocking HTTP request returning a response) through `breaker`,
+    retrying up to `retries` times with jittered backoff after a 5xx/429 or a
+    connection error. Returns the last response or raises the last error;
+    raises CircuitOpenError without calling when the circuit is open.
+    """
+    for attempt in range(retries + 1):
+        breaker.allow()
+        try:
+            response = send()
+        except SYNC_ERRORS:
+            if _record(breaker, True, attempt, retries):
+                raise
+        except BaseException:
+            breaker.release()
+            raise
+        else:
+            if _record(breaker, response.status_code in RETRY_STATUSES, attempt, retries):
+                return response
+        time.sleep(backoff_delay(attempt))
+
+
+async def acall_with_retry(breaker: CircuitBreaker, send: Callable[[], Awaitable[Any]], retries: int = UPSTREAM_RETRIES) -> Any:
+    """
+    Async version of call_with_retry, for the shared httpx client. A cancelled
+    call counts as neither success nor failure.
+    """
+    for attempt in range(retries + 1):
+        breaker.allow()
+        try:
+            response = await send()
+        except ASYNC_ERRORS:
+            if _record(breaker, True, attempt, retries):
+                raise
+        except BaseException:
+            breaker.release()
+            raise
+        else:
+            if _record(breaker, response.status_code in RETRY_STATUSES, attempt, retries):
+                return response
+        await asyncio.sleep(backoff_delay(attempt))
+
+
+# One breaker per upstream, shared by the sync and async tools
+KADENA_API_BREAKER = CircuitBreaker("kadena_api")
+ANALYSIS_API_BREAKER = CircuitBreaker("analysis_api")
+BREAKERS = (KADENA_API_BREAKER, ANALYSIS_API_BREAKER)
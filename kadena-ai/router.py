@@ -0,0 +1,175 @@
+import contextlib
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from config import INTENT_ROUTER_ENABLED, DEFAULT_CHAIN_ID
+from metrics import INTENT_ROUTES
+from tokens import TOKEN_REGISTRY, Token
+
+logger = logging.getLogger(__name__)
+
+_AMOUNT = r"(?P<amount>\d+(?:\.\d+)?|\.\d+)"
+_TOKEN = r"(?P<{name}>[\w$.\-]+)"
+_ACCOUNT = r"(?P<{name}>[kwr]:[\w.\-]+)"
+_CHAIN = r"(?:\s+on\s+chain(?:\s*id)?\s*(?P<chain>\d{1,2}))?"
+
+# Whole-query grammars. Anything that does not match one of them exactly goes to the agent.
+_QUOTE_PATTERNS = [
+    re.compile(
+        r"(?:(?:get|give\s+me|show\s+me)\s+(?:a\s+)?)?(?:quote|price)(?:\s+(?:for|of))?\s+"
+        + _AMOUNT + r"\s+" + _TOKEN.format(name="token_in")
+        + r"\s+(?:to|for|in|into|->)\s+" + _TOKEN.format(name="token_out") + _CHAIN,
+        re.IGNORECASE
+    ),
+    re.compile(
+        r"how\s+much\s+" + _TOKEN.format(name="token_out")
+        + r"\s+(?:(?:do|will|would|can)\s+i\s+get\s+)?for\s+"
+        + _AMOUNT + r"\s+" + _TOKEN.format(name="token_in") + _CHAIN,
+        re.IGNORECASE
+    ),
+]
+_TRANSFER_PATTERNS = [
+    re.compile(
+        r"(?:transfer|send)\s+" + _AMOUNT + r"\s+" + _TOKEN.format(name="token")
+        + r"\s+from\s+" + _ACCOUNT.format(name="sender") + r"\s+to\s+" + _ACCOUNT.format(name="receiver") + _CHAIN,
+        re.IGNORECASE
+    ),
+    re.compile(
+        r"(?:transfer|send)\s+" + _AMOUNT + r"\s+" + _TOKEN.format(name="token")
+        + r"\s+to\s+" + _ACCOUNT.format(name="receiver") + r"\s+from\s+" + _ACCOUNT.format(name="sender") + _CHAIN,
+        re.IGNORECASE
+    ),
+]
+
+
+def _token(word: str) -> Optional[Token]:
+    """
+    Token named by contract address or symbol. Symbols of two characters or fewer
+    must match case, as in TokenRegistry.match; blacklisted tokens never resolve.
+    """
+    token = TOKEN_REGISTRY.get(word)
+    if token is None:
+        token = TOKEN_REGISTRY.by_symbol(word)
+        if token is not None and len(word) <= 2 and token.symbol != word:
+            return None
+    if token is None or token.blacklisted:
+        return None
+    return token
+
+
+def _chain(match: "re.Match[str]") -> Optional[str]:
+    chain = match.group("chain")
+    if chain is None:
+        return DEFAULT_CHAIN_ID
+    return chain if 0 <= int(chain) <= 19 else None
+
+
+def parse_intent(query: str) -> Optional[Dict[str, Any]]:
+    """
+    kadena_transaction tool input (endpoint plus body) for a formulaic quote or
+    transfer query, or None if the query is anything else or is ambiguous.
+    """
+    text = re.sub(r"\s+", " ", query).strip().rstrip("?.! ")
+
+    for pattern in _QUOTE_PATTERNS:
+        match = pattern.fullmatch(text)
+        if match:
+            token_in, token_out, chain = _token(match.group("token_in")), _token(match.group("token_out")), _chain(match)
+            if token_in is None or token_out is None or token_in == token_out or chain is None:
+                return None
+            return {
+                "endpoint": "quote",
+                "tokenInAddress": token_in.address,
+                "tokenOutAddress": token_out.address,
+                "amountIn": match.group("amount"),
+                "chainId": chain
+            }
+
+    for pattern in _TRANSFER_PATTERNS:
+        match = pattern.fullmatch(text)
+        if match:
+            token, chain = _token(match.group("token")), _chain(match)
+            if token is None or chain is None or match.group("sender") == match.group("receiver"):
+                return None
+            return {
+                "endpoint": "transfer",
+                "tokenAddress": token.address,
+                "sender": match.group("sender"),
+                "receiver": match.group("receiver"),
+                "amount": match.group("amount"),
+                "chainId": chain
+            }
+    return None
+
+
+class IntentRouter:
+    """
+    Fast path in front of the agent: formulaic quote and transfer queries are
+    parsed locally and sent straight to the Kadena API, skipping the agent's LLM
+    call. Keeps hit/miss counts and the average agent call time, to estimate the
+    latency the hits saved.
+    """
+
+    def __init__(self, enabled: bool = INTENT_ROUTER_ENABLED):
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.route_seconds = 0.0
+        self.agent_calls = 0
+        self.agent_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def route(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Tool input for `query` if it can skip the agent, otherwise None.
+        """
+        if not self.enabled:
+            return None
+        start = time.perf_counter()
+        intent = parse_intent(query)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.route_seconds += elapsed
+            if intent is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        INTENT_ROUTES.inc(result="miss" if intent is None else "hit")
+        if intent is not None:
+            logger.info(f"Routed {intent['endpoint']} query without the agent")
+        return intent
+
+    @contextlib.contextmanager
+    def timing_agent(self) -> Iterator[None]:
+        """
+        Time an agent call made for a query the router passed on.
+        """
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.agent_calls += 1
+            self.agent_seconds += elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            routed = self.hits + self.misses
+            avg_agent_ms = self.agent_seconds / self.agent_calls * 1000 if self.agent_calls else None
+            avg_route_ms = self.route_seconds / routed * 1000 if routed else None
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / routed, 4) if routed else None,
+                "avg_route_ms": round(avg_route_ms, 3) if avg_route_ms is not None else None,
+                "avg_agent_ms": round(avg_agent_ms, 1) if avg_agent_ms is not None else None,
+                # Each hit skipped one agent call; every query paid for the parse
+                "est_saved_ms": round(self.hits * avg_agent_ms - self.route_seconds * 1000, 1) if avg_agent_ms is not None else None
+            }
+
+
+# Shared by the sync and async pipelines
+INTENT_ROUTER = IntentRouter()
@@ -0,0 +1,106 @@
+import pytest
+
+from errors import UPSTREAM_ERRORS, ErrorCode, explain_error, tool_error, upstream_error
+
+ZUSD = "n_b742b4e9c600892af545afb408326e82a6c0c6ed.zUSD"
+SENDER = "k:" + "a" * 64
+RECEIVER = "k:" + "b" * 64
+QUOTE = {"endpoint": "quote", "tokenInAddress": "coin", "tokenOutAddress": ZUSD, "amountIn": "10", "chainId": "2"}
+TRANSFER = {"endpoint": "transfer", "tokenAddress": "coin", "sender": SENDER, "receiver": RECEIVER, "amount": "5", "chainId": "2"}
+SWAP = {**QUOTE, "endpoint": "swap", "account": SENDER, "slippage": "0.9"}
+COLLECTION = {"endpoint": "nft/collection", "account": SENDER, "name": "Heron Heroes", "chainId": "2"}
+PREFIX = "Kadena API error"
+
+# Kadena API `error` -> (tool input, code, explanation written for it)
+UPSTREAM_CASES = {
+    "Invalid chainId": (
+        {**QUOTE, "chainId": "25"}, ErrorCode.INVALID_CHAIN,
+        "Chain 25 doesn't exist. Kadena mainnet has chains 0 to 19, and trading happens on chain 2.",
+    ),
+    "Missing required parameters": (
+        TRANSFER, ErrorCode.MISSING_PARAMS, "To build this transfer I still need some required details.",
+    ),
+    "Missing required fields": (
+        COLLECTION, ErrorCode.MISSING_PARAMS, "To build this nft/collection I still need some required details.",
+    ),
+    "Invalid amount parameters": (
+        {**QUOTE, "amountOut": "3"}, ErrorCode.AMOUNT_CONFLICT,
+        "A quote takes either the amount you sell (amountIn, 10) or the amount you buy (amountOut, 3), not both.",
+    ),
+    "Invalid amount": (
+        {**TRANSFER, "amount": "-1"}, ErrorCode.INVALID_AMOUNT, "-1 is not a valid amount. Amounts must be numbers greater than 0.",
+    ),
+    "Invalid amount format": (
+        {**QUOTE, "amountIn": "ten"}, ErrorCode.INVALID_AMOUNT, "ten is not a valid amount.",
+    ),
+    "Invalid account format": (SWAP, ErrorCode.INVALID_ACCOUNT, "The account is not valid (The detail)."),
+    "Invalid sender format": (TRANSFER, ErrorCode.INVALID_ACCOUNT, "The account is not valid (The detail)."),
+    "Invalid receiver format": (TRANSFER, ErrorCode.INVALID_ACCOUNT, "The account is not valid (The detail)."),
+    "Invalid receiver account": (TRANSFER, ErrorCode.INVALID_ACCOUNT, "The account is not valid (The detail)."),
+    "Invalid mintTo account": (COLLECTION, ErrorCode.INVALID_ACCOUNT, "The account is not valid (The detail)."),
+    "Invalid slippage value": (SWAP, ErrorCode.INVALID_SLIPPAGE, "A slippage of 0.9 is out of range."),
+    "Invalid slippage format": ({**SWAP, "slippage": "lots"}, ErrorCode.INVALID_SLIPPAGE, "A slippage of lots is out of range."),
+    "Liquidity pool not found": (
+        {**QUOTE, "tokenInAddress": "kaddex.kdx"}, ErrorCode.POOL_NOT_FOUND,
+        "There is no liquidity pool between KDX and zUSD on chain 2. Try going through KDA, for example KDX to KDA and then KDA to zUSD.",
+    ),
+    "Insufficient liquidity": (
+        SWAP, ErrorCode.INSUFFICIENT_LIQUIDITY,
+        "The KDA/zUSD pool on chain 2 doesn't have enough liquidity for this amount. Try a smaller amount.",
+    ),
+    "Account not found": (TRANSFER, ErrorCode.ACCOUNT_NOT_FOUND, f"The account {SENDER} doesn't exist on chain 2."),
+    "Collection already exists": (
+        COLLECTION, ErrorCode.COLLECTION_EXISTS, "A collection named \"Heron Heroes\" already exists. Please choose a different name.",
+    ),
+    "Missing required guard parameters": (COLLECTION, ErrorCode.INVALID_GUARD, "The guard is not valid: The detail."),
+    "Invalid guard keys": (COLLECTION, ErrorCode.INVALID_GUARD, "The guard is not valid: The detail."),
+    "Invalid royalty": (COLLECTION, ErrorCode.INVALID_ROYALTY, "The royalty settings are not valid: The detail."),
+    "Missing/Invalid royalty recipient": (COLLECTION, ErrorCode.INVALID_ROYALTY, "The royalty settings are not valid: The detail."),
+}
+
+
+def test_every_upstream_error_has_a_case():
+    assert set(UPSTREAM_CASES) == set(UPSTREAM_ERRORS)
+
+
+@pytest.mark.parametrize("error", sorted(UPSTREAM_CASES))
+def test_upstream_error_maps_to_its_code_and_message(error):
+    tool_input, code, expected = UPSTREAM_CASES[error]
+    output = upstream_error(PREFIX, {"error": error, "details": "The detail."})
+    assert output == {"error": f"{PREFIX}: {error}", "details": "The detail.", "code": code.value}
+
+    explanation = explain_error(tool_input, output)
+    assert explanation.startswith(expected)
+    # The original error follows the explanation
+    assert explanation.endswith(f"\n\nError: {PREFIX}: {error} (The detail.)")
+
+
+def test_upstream_error_without_details():
+    output = upstream_error(PREFIX, {"error": "Invalid receiver format"})
+    assert "details" not in output
+    assert "(no details given)" in explain_error(TRANSFER, output)
+    assert explain_error(TRANSFER, output).endswith(f"Error: {PREFIX}: Invalid receiver format")
+
+
+@pytest.mark.parametrize("body", [{"error": "Gas limit exceeded", "details": "Out of gas"}, {}])
+def test_unknown_upstream_error_falls_through(body):
+    output = upstream_error(PREFIX, body)
+    assert "code" not in output
+    assert output["error"] == f"{PREFIX}: {body.get('error', 'Unknown error')}"
+    assert explain_error(QUOTE, output) is None
+
+
+def test_tool_error_params_fill_the_template():
+    output = tool_error(ErrorCode.UPSTREAM_UNAVAILABLE, "kadena_api is unavailable, retry in 7s", retry_after=7)
+    assert output == {"error": "kadena_api is unavailable, retry in 7s", "code": "upstream_unavailable", "params": {"retry_after": 7}}
+    assert explain_error(QUOTE, output).startswith(
+        "The Kadena API isn't responding right now (it may be starting up), so I couldn't build this quote. "
+        "Please try again in 7 seconds."
+    )
+
+
+def test_missing_params_are_named_for_the_user():
+    output = tool_error(ErrorCode.MISSING_PARAMS, "Missing sender", missing=["sender", "receiver"])
+    assert explain_error(TRANSFER, output).startswith(
+        "To build this transfer I still need the sender's account (k:...) and the receiver's account (k:...)."
+    )
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from hedging import Hedger, hedge_trace
+
+SENT = "http11.send_request_body.complete"
+
+
+def _hedger(**kwargs) -> Hedger:
+    hedger = Hedger("test", enabled=True, min_delay=0.01, budget=1.0, min_samples=1, **kwargs)
+    hedger.latencies.append(0.01)
+    return hedger
+
+
+def _calls(*plans):
+    """
+    A call whose n-th invocation follows plans[n]: (seconds before the request
+    is sent, seconds after, result or exception).
+    """
+    count = 0
+
+    async def call():
+        nonlocal count
+        before, after, outcome = plans[count]
+        count += 1
+        await asyncio.sleep(before)
+        await hedge_trace(SENT, {})
+        await asyncio.sleep(after)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return call
+
+
+def test_slow_call_is_hedged_and_hedge_wins():
+    hedger = _hedger()
+    result = asyncio.run(hedger.run(_calls((0, 0.5, "primary"), (0, 0.01, "hedge"))))
+    assert result == "hedge"
+    stats = hedger.stats()
+    assert (stats["hedges"], stats["hedge_win_rate"], stats["unsent"]) == (1, 1.0, 0)
+
+
+def test_hedge_cancelled_before_sending_is_not_counted():
+    hedger = _hedger()
+    result = asyncio.run(hedger.run(_calls((0, 0.03, "primary"), (0.5, 0, "hedge"))))
+    assert result == "primary"
+    stats = hedger.stats()
+    assert (stats["hedges"], stats["unsent"]) == (0, 1)
+    # The unsent hedge's token is refunded
+    assert hedger.tokens == 1.0
+
+
+def test_hedge_sent_then_cancelled_is_counted():
+    hedger = _hedger()
+    result = asyncio.run(hedger.run(_calls((0, 0.03, "primary"), (0, 0.5, "hedge"))))
+    assert result == "primary"
+    stats = hedger.stats()
+    assert (stats["hedges"], stats["hedge_win_rate"], stats["unsent"]) == (1, 0.0, 0)
+
+
+def test_both_failing_raises_the_first_error():
+    hedger = _hedger()
+    with pytest.raises(ValueError, match="primary"):
+        asyncio.run(hedger.run(_calls((0, 0.05, ValueError("primary")), (0, 0.01, ValueError("hedge")))))
+    assert hedger.stats()["hedges"] == 1
+
+
+def test_no_hedge_without_budget():
+    hedger = _hedger()
+    hedger.budget = 0.0
+    result = asyncio.run(hedger.run(_calls((0, 0.05, "primary"))))
+    assert result == "primary"
+    stats = hedger.stats()
+    assert (stats["hedges"], stats["over_budget"]) == (0, 1)
+
+
+def test_cancelled_primary_records_a_censored_sample():
+    hedger = _hedger()
+    asyncio.run(hedger.run(_calls((0, 0.5, "primary"), (0, 0.01, "hedge"))))
+    # The losing primary ran for at least the hedge delay; the hedge itself is not recorded
+    assert len(hedger.latencies) == 2
+    assert hedger.latencies[-1] >= 0.01
+
+
+def test_disabled_hedger_makes_one_call():
+    hedger = _hedger()
+    hedger.enabled = False
+    assert asyncio.run(hedger.run(_calls((0, 0.05, "primary")))) == "primary"
+    assert hedger.stats()["hedges"] == 0
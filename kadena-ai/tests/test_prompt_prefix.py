@@ -0,0 +1,64 @@
+import os
+
+import pytest
+from langchain_core.messages import AIMessage, FunctionMessage
+
+from agent import _agent_input, _build_prompt
+from memory import estimate_tokens
+
+# Providers only cache prompts whose shared prefix is at least this long
+MIN_CACHEABLE_TOKENS = 1024
+
+REQUESTS = [
+    ("What is Kadena?", []),
+    ("Swap 10 KDA for zUSD on chain 2", []),
+    ("Transfer 5 KDX to k:abc", ["User: What is KDX?", "Agent K: KDX is the Kaddex token."]),
+    ("How much FLUX do I get for 1 KDA?", ["User: hi", "Agent K: Hello!"] * 10),
+]
+
+SCRATCHPAD = [
+    AIMessage(content="", additional_kwargs={"function_call": {"name": "kadena_transaction", "arguments": "{}"}}),
+    FunctionMessage(name="kadena_transaction", content='{"amountOut": "12.34"}'),
+]
+
+
+def render(prompt, query, history, scratchpad) -> str:
+    messages = prompt.format_messages(**_agent_input(query, history), agent_scratchpad=scratchpad)
+    return "".join(f"<{message.type}>{message.content}" for message in messages)
+
+
+def render_all(prompt):
+    return [
+        render(prompt, query, history, scratchpad)
+        for query, history in REQUESTS
+        for scratchpad in ([], SCRATCHPAD)
+    ]
+
+
+@pytest.fixture(scope="module")
+def prompt():
+    return _build_prompt()
+
+
+def _static(prompt) -> str:
+    return prompt.format_messages(**_agent_input(*REQUESTS[0]), agent_scratchpad=[])[0].content
+
+
+def test_static_system_prompt_opens_every_request(prompt):
+    static = _static(prompt)
+    for text in render_all(prompt):
+        assert text.startswith(f"<system>{static}")
+
+
+def test_requests_only_diverge_after_the_static_prompt(prompt):
+    shared = os.path.commonprefix(render_all(prompt))
+    assert len(shared) >= len(_static(prompt))
+
+
+def test_shared_prefix_is_long_enough_to_cache(prompt):
+    shared = os.path.commonprefix(render_all(prompt))
+    assert estimate_tokens(shared) >= MIN_CACHEABLE_TOKENS
+
+
+def test_prompt_is_byte_stable_across_builds(prompt):
+    assert render_all(_build_prompt()) == render_all(prompt)
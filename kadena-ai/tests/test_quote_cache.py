@@ -0,0 +1,215 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import quote_cache
+from quote_cache import QuoteCache, quote_key
+
+ZUSD = "n_b742b4e9c600892af545afb408326e82a6c0c6ed.zUSD"
+QUOTE = {"tokenInAddress": "coin", "tokenOutAddress": ZUSD, "amountIn": "10", "chainId": "2"}
+RESULT = {"amountOut": "12.34"}
+WAITERS = 5
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(quote_cache.time, "monotonic", clock)
+    return clock
+
+
+def _counting(result=RESULT):
+    def fetch():
+        fetch.calls += 1
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    fetch.calls = 0
+    return fetch
+
+
+def _wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+# Keys
+
+@pytest.mark.parametrize("body", [
+    {**QUOTE, "amountIn": "10.0"},
+    {**QUOTE, "amountIn": 10},
+    {**QUOTE, "amountIn": "10.00"},
+    {**QUOTE, "amountIn": "1E+1"},
+    {**QUOTE, "tokenInAddress": "KDA"},
+    {**QUOTE, "tokenInAddress": " coin ", "tokenOutAddress": "zUSD"},
+    {**QUOTE, "chainId": 2},
+])
+def test_equivalent_requests_share_a_key(body):
+    assert quote_key(body) == quote_key(QUOTE)
+
+
+@pytest.mark.parametrize("body", [
+    {**QUOTE, "amountIn": "10.5"},
+    {**QUOTE, "chainId": "1"},
+    {**QUOTE, "tokenInAddress": ZUSD, "tokenOutAddress": "coin"},
+    {k: v for k, v in {**QUOTE, "amountOut": "10"}.items() if k != "amountIn"},
+])
+def test_different_requests_get_different_keys(body):
+    assert quote_key(body) != quote_key(QUOTE)
+
+
+def test_unparseable_amount_is_kept_as_given():
+    assert quote_key({**QUOTE, "amountIn": " ten "})[2] == "ten"
+
+
+# Caching
+
+def test_repeat_is_served_from_cache_until_ttl(clock):
+    cache, fetch = QuoteCache(ttl=10), _counting()
+    assert cache.get(QUOTE, fetch) == {**RESULT, "cacheAgeSeconds": 0}
+    clock.now += 4
+    assert cache.get({**QUOTE, "amountIn": "10.0"}, fetch) == {**RESULT, "cacheAgeSeconds": 4.0}
+    assert fetch.calls == 1
+    clock.now += 6
+    assert cache.get(QUOTE, fetch) == {**RESULT, "cacheAgeSeconds": 0}
+    assert fetch.calls == 2
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 2, "coalesced": 0}
+
+
+def test_error_results_are_not_cached(clock):
+    cache, fetch = QuoteCache(ttl=10), _counting({"error": "Liquidity pool not found"})
+    assert cache.get(QUOTE, fetch) == {"error": "Liquidity pool not found"}
+    cache.get(QUOTE, fetch)
+    assert fetch.calls == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache, fetch = QuoteCache(ttl=10, max_entries=2), _counting()
+    for amount in ("1", "2"):
+        cache.get({**QUOTE, "amountIn": amount}, fetch)
+    cache.get({**QUOTE, "amountIn": "1"}, fetch)
+    cache.get({**QUOTE, "amountIn": "3"}, fetch)
+    # "2" was the least recently used
+    cache.get({**QUOTE, "amountIn": "1"}, fetch)
+    assert fetch.calls == 3
+    cache.get({**QUOTE, "amountIn": "2"}, fetch)
+    assert fetch.calls == 4
+
+
+# Coalescing
+
+def _gated(result=RESULT):
+    """
+    A fetch that blocks until `release` is set, then returns or raises `result`.
+    """
+    release = threading.Event()
+    fetch = _counting(result)
+
+    def gated():
+        release.wait(2)
+        return fetch()
+
+    gated.release, gated.counter = release, fetch
+    return gated
+
+
+def _run_threads(cache, fetch, count):
+    outcomes = [None] * count
+
+    def call(i):
+        try:
+            outcomes[i] = cache.get({**QUOTE, "amountIn": ["10", "10.0"][i % 2]}, fetch)
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+    threads[0].start()
+    _wait_for(lambda: cache.misses == 1)
+    for thread in threads[1:]:
+        thread.start()
+    _wait_for(lambda: cache.coalesced == count - 1)
+    fetch.release.set()
+    for thread in threads:
+        thread.join(2)
+    return outcomes
+
+
+def test_sync_callers_share_one_fetch():
+    cache, fetch = QuoteCache(ttl=10), _gated()
+    outcomes = _run_threads(cache, fetch, WAITERS)
+    assert fetch.counter.calls == 1
+    assert all(outcome["amountOut"] == "12.34" for outcome in outcomes)
+
+
+def test_sync_waiters_receive_the_leaders_error():
+    error = RuntimeError("connection reset")
+    cache, fetch = QuoteCache(ttl=10), _gated(error)
+    outcomes = _run_threads(cache, fetch, WAITERS)
+    # Waiters re-raise the leader's error instead of returning None or fetching again
+    assert fetch.counter.calls == 1
+    assert all(outcome is error for outcome in outcomes)
+    assert cache.stats() == {"entries": 0, "hits": 0, "misses": 1, "coalesced": WAITERS - 1}
+
+
+def test_async_callers_share_one_fetch():
+    cache, calls = QuoteCache(ttl=10), []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return RESULT
+
+    async def main():
+        return await asyncio.gather(*(cache.aget({**QUOTE, "amountIn": ["10", 10][i % 2]}, fetch) for i in range(WAITERS)))
+
+    outcomes = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(outcome["amountOut"] == "12.34" for outcome in outcomes)
+    assert cache.stats() == {"entries": 1, "hits": 0, "misses": 1, "coalesced": WAITERS - 1}
+
+
+def test_async_waiters_receive_the_leaders_error():
+    cache = QuoteCache(ttl=10)
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("connection reset")
+
+    async def main():
+        return await asyncio.gather(*(cache.aget(QUOTE, fetch) for _ in range(WAITERS)), return_exceptions=True)
+
+    outcomes = asyncio.run(main())
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    assert cache.stats()["misses"] == 1
+
+
+def test_async_waiter_fetches_itself_when_the_leader_is_cancelled():
+    cache = QuoteCache(ttl=10)
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return RESULT
+
+    async def main():
+        leader = asyncio.create_task(cache.aget(QUOTE, fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.aget(QUOTE, fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await waiter
+
+    assert asyncio.run(main()) == RESULT
@@ -0,0 +1,224 @@
+import asyncio
+
+import httpx
+import pytest
+import requests
+
+import resilience
+from agent import _retries
+from config import UPSTREAM_RETRIES
+from resilience import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, acall_with_retry, backoff_delay, call_with_retry
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _send(*outcomes):
+    """
+    A send function returning (or raising) outcomes[n] on its n-th call; `calls` counts them.
+    """
+    def send():
+        outcome = outcomes[send.calls]
+        send.calls += 1
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return FakeResponse(outcome)
+
+    send.calls = 0
+    return send
+
+
+def _asend(*outcomes):
+    sync = _send(*outcomes)
+
+    async def send():
+        return sync()
+
+    send.sync = sync
+    return send
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0)
+
+
+# Circuit breaker
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=10)
+    for _ in range(2):
+        breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.allow()
+    assert raised.value.retry_after == 10
+    assert breaker.stats() == {"state": OPEN, "consecutive_failures": 3, "retry_after_seconds": 10.0}
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=10)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=10)
+    breaker.record_failure()
+    clock.now += 10
+    breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Only the one trial call goes through while it is in flight
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+
+def test_half_open_trial_success_closes(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=10)
+    breaker.record_failure()
+    clock.now += 10
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.stats() == {"state": CLOSED, "consecutive_failures": 0}
+    breaker.allow()
+
+
+def test_half_open_trial_failure_reopens(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=10)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 10
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    clock.now += 9
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+
+def test_released_trial_can_be_retried(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=10)
+    breaker.record_failure()
+    clock.now += 10
+    breaker.allow()
+    breaker.release()
+    breaker.allow()
+    assert breaker.state == HALF_OPEN
+
+
+# Retries
+
+def test_retryable_status_is_retried_until_success(clock):
+    breaker = CircuitBreaker("test", failure_threshold=10)
+    send = _send(503, 502, 200)
+    assert call_with_retry(breaker, send, retries=3).status_code == 200
+    assert send.calls == 3
+    assert breaker.stats() == {"state": CLOSED, "consecutive_failures": 0}
+
+
+def test_last_response_is_returned_when_retries_run_out(clock):
+    breaker = CircuitBreaker("test", failure_threshold=10)
+    send = _send(503, 503, 503)
+    assert call_with_retry(breaker, send, retries=2).status_code == 503
+    assert send.calls == 3
+
+
+def test_connection_error_is_retried_then_raised(clock):
+    breaker = CircuitBreaker("test", failure_threshold=10)
+    send = _send(requests.exceptions.ConnectionError(), requests.exceptions.Timeout())
+    with pytest.raises(requests.exceptions.Timeout):
+        call_with_retry(breaker, send, retries=1)
+    assert send.calls == 2
+
+
+@pytest.mark.parametrize("status", [200, 400, 404, 422])
+def test_other_statuses_are_not_retried(clock, status):
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    send = _send(status)
+    assert call_with_retry(breaker, send, retries=3).status_code == status
+    assert send.calls == 1
+    assert breaker.state == CLOSED
+
+
+def test_unexpected_error_releases_the_trial(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=10)
+    breaker.record_failure()
+    clock.now += 10
+    with pytest.raises(ValueError):
+        call_with_retry(breaker, _send(ValueError("bad payload")))
+    assert breaker.state == HALF_OPEN
+    breaker.allow()
+
+
+def test_open_circuit_fails_without_calling(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=10)
+    send = _send(503, 503, 200)
+    # The circuit opens after two failures, so the third attempt is never sent
+    with pytest.raises(CircuitOpenError):
+        call_with_retry(breaker, send, retries=5)
+    assert send.calls == 2
+    with pytest.raises(CircuitOpenError):
+        call_with_retry(breaker, send)
+    assert send.calls == 2
+
+
+def test_only_idempotent_endpoints_are_retried(clock):
+    assert _retries("quote") == UPSTREAM_RETRIES
+    for endpoint in ("transfer", "swap"):
+        assert _retries(endpoint) == 0
+        send = _send(503, 200)
+        assert call_with_retry(CircuitBreaker("test"), send, retries=_retries(endpoint)).status_code == 503
+        assert send.calls == 1
+
+
+def test_async_retry():
+    breaker = CircuitBreaker("test", failure_threshold=10)
+    send = _asend(httpx.ConnectError("refused"), 503, 200)
+    assert asyncio.run(acall_with_retry(breaker, send, retries=2)).status_code == 200
+    assert send.sync.calls == 3
+
+
+def test_async_cancellation_counts_as_neither_outcome():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+
+    async def send():
+        raise asyncio.CancelledError()
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(acall_with_retry(breaker, send))
+    assert breaker.stats() == {"state": CLOSED, "consecutive_failures": 0}
+
+
+# Backoff
+
+@pytest.mark.parametrize("attempt, bound", [(0, 0.5), (1, 1.0), (2, 2.0), (3, 4.0), (10, 4.0)])
+def test_backoff_is_jittered_within_bounds(attempt, bound):
+    delays = [backoff_delay(attempt, base=0.5, cap=4.0) for _ in range(200)]
+    assert all(0 <= delay <= bound for delay in delays)
+    # Full jitter spreads delays over the whole range
+    assert max(delays) > bound / 2
@@ -0,0 +1,79 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+
+from router import IntentRouter, parse_intent
+
+ZUSD = "n_b742b4e9c600892af545afb408326e82a6c0c6ed.zUSD"
+SENDER = "k:" + "a" * 64
+RECEIVER = "k:" + "b" * 64
+
+# (query, tool input the agent would have produced, or None to leave it to the agent)
+PARSE_CASES: List[Tuple[str, Optional[Dict[str, Any]]]] = [
+    ("quote 100 KDA to zUSD on chain 2", {"endpoint": "quote", "tokenInAddress": "coin", "tokenOutAddress": ZUSD, "amountIn": "100", "chainId": "2"}),
+    ("Get a quote for 10 kda into zusd", {"endpoint": "quote", "tokenInAddress": "coin", "tokenOutAddress": ZUSD, "amountIn": "10", "chainId": "2"}),
+    ("price of 0.5 KDX in KDA on chain 1?", {"endpoint": "quote", "tokenInAddress": "kaddex.kdx", "tokenOutAddress": "coin", "amountIn": "0.5", "chainId": "1"}),
+    ("How much zUSD do I get for 10 KDA?", {"endpoint": "quote", "tokenInAddress": "coin", "tokenOutAddress": ZUSD, "amountIn": "10", "chainId": "2"}),
+    ("how   much zUSD for .5 KDA", {"endpoint": "quote", "tokenInAddress": "coin", "tokenOutAddress": ZUSD, "amountIn": ".5", "chainId": "2"}),
+    (f"quote 3 coin -> {ZUSD}", {"endpoint": "quote", "tokenInAddress": "coin", "tokenOutAddress": ZUSD, "amountIn": "3", "chainId": "2"}),
+    (f"transfer 5 KDA from {SENDER} to {RECEIVER}", {"endpoint": "transfer", "tokenAddress": "coin", "sender": SENDER, "receiver": RECEIVER, "amount": "5", "chainId": "2"}),
+    (f"Send 1.25 {ZUSD} to {RECEIVER} from {SENDER} on chain 3.", {"endpoint": "transfer", "tokenAddress": ZUSD, "sender": SENDER, "receiver": RECEIVER, "amount": "1.25", "chainId": "3"}),
+    # Unknown or unusable tokens
+    ("quote 100 KDA to FOO", None),
+    ("quote 100 KDA to KDA", None),
+    (f"send 5 FOO from {SENDER} to {RECEIVER}", None),
+    # Missing or unparseable amounts
+    ("quote KDA to zUSD", None),
+    ("quote a hundred KDA to zUSD", None),
+    (f"send KDA from {SENDER} to {RECEIVER}", None),
+    # Extra clauses
+    ("quote 100 KDA to zUSD and then swap it", None),
+    ("quote 100 KDA to zUSD on chain 2 please", None),
+    (f"transfer 5 KDA from {SENDER} to {RECEIVER} tomorrow", None),
+    # Bad chain or accounts
+    ("quote 100 KDA to zUSD on chain 25", None),
+    (f"send 5 KDA to {RECEIVER}", None),
+    (f"send 5 KDA from {SENDER} to {SENDER}", None),
+    (f"send 5 KDA from alice to {RECEIVER}", None),
+    # Not formulaic
+    ("What is Kadena's consensus mechanism?", None),
+    ("Swap 10 KDA for zUSD", None),
+    ("", None),
+]
+
+
+@pytest.mark.parametrize("query, expected", PARSE_CASES)
+def test_parse_intent(query, expected):
+    assert parse_intent(query) == expected
+
+
+def test_stats_count_hits_and_misses():
+    router = IntentRouter(enabled=True)
+    assert router.route("quote 100 KDA to zUSD") is not None
+    assert router.route(f"transfer 5 KDA from {SENDER} to {RECEIVER}") is not None
+    assert router.route("Swap 10 KDA for zUSD") is None
+    stats = router.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (2, 1, round(2 / 3, 4))
+    assert stats["avg_route_ms"] is not None
+    # No agent call timed yet, so there is nothing to estimate from
+    assert (stats["avg_agent_ms"], stats["est_saved_ms"]) == (None, None)
+
+
+def test_stats_estimate_saved_time_from_agent_calls():
+    router = IntentRouter(enabled=True)
+    router.route("quote 100 KDA to zUSD")
+    router.route("Swap 10 KDA for zUSD")
+    with router.timing_agent():
+        pass
+    router.agent_seconds = 0.5
+    stats = router.stats()
+    assert stats["avg_agent_ms"] == 500.0
+    # One hit saved one agent call, less the time both queries spent parsing
+    assert stats["est_saved_ms"] == round(500 - router.route_seconds * 1000, 1)
+
+
+def test_disabled_router_passes_everything_on():
+    router = IntentRouter(enabled=False)
+    assert router.route("quote 100 KDA to zUSD") is None
+    stats = router.stats()
+    assert (stats["enabled"], stats["hits"], stats["misses"], stats["hit_rate"]) == (False, 0, 0, None)
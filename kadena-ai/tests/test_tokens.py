@@ -0,0 +1,33 @@
+import yaml
+
+from metrics import TOKEN_CONTEXT_CHARS
+from tokens import MAINNET, TESTNET, TOKEN_REGISTRY
+
+
+def _counted(kind: str) -> float:
+    return TOKEN_CONTEXT_CHARS._values.get((kind,), 0)
+
+
+def test_full_list_keeps_testnet_tokens():
+    context = TOKEN_REGISTRY.context_for("hello there")
+    document = yaml.safe_load(context.prompt)
+    assert context.tokens == ()
+    assert set(document[MAINNET]) == {token.address for token in TOKEN_REGISTRY.tokens(MAINNET) if not token.blacklisted}
+    assert set(document[TESTNET]) == {token.address for token in TOKEN_REGISTRY.tokens(TESTNET)}
+    assert context.saved_chars == 0
+
+
+def test_filtered_context_lists_mentioned_and_default_tokens():
+    context = TOKEN_REGISTRY.context_for("swap KDA for KDX")
+    document = yaml.safe_load(context.prompt)
+    assert set(document[MAINNET]) == set(context.tokens) == {"coin", "n_b742b4e9c600892af545afb408326e82a6c0c6ed.zUSD", "kaddex.kdx"}
+    assert TESTNET not in document
+    assert set(document["blacklist"]) == TOKEN_REGISTRY.blacklist
+    assert context.saved_chars > 0
+
+
+def test_sent_and_saved_chars_are_counted():
+    sent, saved = _counted("sent"), _counted("saved")
+    context = TOKEN_REGISTRY.context_for("swap KDA for KDX")
+    assert _counted("sent") - sent == len(context.prompt)
+    assert _counted("saved") - saved == context.saved_chars
@@ -0,0 +1,66 @@
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from errors import ErrorCode, explain_error
+from validation import TRANSACTION_VALIDATOR, validation_error
+
+ZUSD = "n_b742b4e9c600892af545afb408326e82a6c0c6ed.zUSD"
+SENDER = "k:" + "a" * 64
+RECEIVER = "k:" + "b" * 64
+QUOTE = {"tokenInAddress": "coin", "tokenOutAddress": ZUSD, "amountIn": "10", "chainId": "2"}
+TRANSFER = {"tokenAddress": "coin", "sender": SENDER, "receiver": RECEIVER, "amount": "5", "chainId": "2"}
+SWAP = {**QUOTE, "account": SENDER, "slippage": "0.005"}
+LAUNCH = {
+    "account": SENDER, "guard": {"keys": ["a" * 64], "pred": "keys-all"}, "mintTo": RECEIVER,
+    "uri": "ipfs://meta", "collectionId": "collection:1234567890", "chainId": "2",
+}
+
+# (endpoint, body, expected codes in order)
+CASES: List[Tuple[str, Dict[str, Any], List[ErrorCode]]] = [
+    ("quote", QUOTE, []),
+    ("transfer", TRANSFER, []),
+    ("transfer", {**TRANSFER, "sender": "my-named-account", "chainId": 7}, []),
+    ("swap", SWAP, []),
+    ("nft/launch", LAUNCH, []),
+    ("nft/collection", {"account": SENDER, "name": "Heron Heroes", "chainId": "2"}, []),
+    ("mint", QUOTE, [ErrorCode.INVALID_ENDPOINT]),
+    ("quote", {**QUOTE, "amountOut": "3"}, [ErrorCode.AMOUNT_CONFLICT]),
+    ("swap", {k: v for k, v in SWAP.items() if k != "amountIn"}, [ErrorCode.AMOUNT_MISSING]),
+    ("transfer", {"tokenAddress": "coin", "amount": "5", "chainId": "2"}, [ErrorCode.MISSING_PARAMS]),
+    ("quote", {**QUOTE, "chainId": "25"}, [ErrorCode.INVALID_CHAIN]),
+    ("quote", {**QUOTE, "chainId": "two"}, [ErrorCode.INVALID_CHAIN]),
+    ("quote", {**QUOTE, "chainId": "1"}, [ErrorCode.WRONG_CHAIN]),
+    ("nft/collection", {"account": SENDER, "name": "Heron Heroes", "chainId": "8"}, [ErrorCode.WRONG_CHAIN]),
+    ("quote", {**QUOTE, "tokenOutAddress": "zUSD"}, [ErrorCode.UNKNOWN_TOKEN]),
+    ("transfer", {**TRANSFER, "tokenAddress": "free.not-a-token"}, [ErrorCode.UNKNOWN_TOKEN]),
+    ("transfer", {**TRANSFER, "amount": "0"}, [ErrorCode.INVALID_AMOUNT]),
+    ("transfer", {**TRANSFER, "amount": "five"}, [ErrorCode.INVALID_AMOUNT]),
+    ("transfer", {**TRANSFER, "amount": "1.1234567890123"}, [ErrorCode.AMOUNT_PRECISION]),
+    ("transfer", {**TRANSFER, "amount": "1.123456789012"}, []),
+    ("transfer", {**TRANSFER, "receiver": "k:abc"}, [ErrorCode.INVALID_ACCOUNT]),
+    ("transfer", {**TRANSFER, "sender": "k:abc"}, [ErrorCode.INVALID_ACCOUNT]),
+    ("swap", {**SWAP, "account": "alice"}, [ErrorCode.INVALID_ACCOUNT]),
+    ("swap", {**SWAP, "slippage": "0.9"}, [ErrorCode.INVALID_SLIPPAGE]),
+    ("nft/launch", {**LAUNCH, "guard": {"keys": ["abc"], "pred": "keys-all"}}, [ErrorCode.INVALID_GUARD]),
+    ("nft/launch", {**LAUNCH, "guard": {"keys": ["a" * 64]}}, [ErrorCode.INVALID_GUARD]),
+    ("transfer", {**TRANSFER, "amount": "-1", "receiver": "k:abc", "chainId": "30"}, [ErrorCode.INVALID_CHAIN, ErrorCode.INVALID_AMOUNT, ErrorCode.INVALID_ACCOUNT]),
+]
+
+
+@pytest.mark.parametrize("endpoint,body,expected", CASES)
+def test_diagnostics(endpoint, body, expected):
+    diagnostics = TRANSACTION_VALIDATOR.validate(endpoint, body)
+    assert [d.code for d in diagnostics] == expected
+
+
+@pytest.mark.parametrize("endpoint,body,expected", [case for case in CASES if case[2]])
+def test_every_rejection_is_explained(endpoint, body, expected):
+    error = validation_error(TRANSACTION_VALIDATOR.validate(endpoint, body))
+    assert error["code"] == expected[0].value
+    assert [d["code"] for d in error["diagnostics"]] == [code.value for code in expected]
+    assert explain_error({"endpoint": endpoint, **body}, error)
+
+
+def test_valid_request_has_no_error():
+    assert validation_error(TRANSACTION_VALIDATOR.validate("quote", QUOTE)) is None
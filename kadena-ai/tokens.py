@@ -0,0 +1,204 @@
+import difflib
+import logging
+import re
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+import yaml
+
+from config import TOKENS
+from metrics import TOKEN_CONTEXT_CHARS
+
+logger = logging.getLogger(__name__)
+
+MAINNET = "mainnet"
+TESTNET = "testnet"
+
+# Always included in a filtered token context: KDA and zUSD (the default quote currency)
+DEFAULT_CONTEXT_TOKENS = ("coin", "n_b742b4e9c600892af545afb408326e82a6c0c6ed.zUSD")
+
+# Words shorter than this are never fuzzy-matched against token names
+FUZZY_MIN_LENGTH = 5
+FUZZY_CUTOFF = 0.85
+
+# Fields worth sending to the model. Presentation-only fields (img, color) are dropped.
+PROMPT_FIELDS = ("symbol", "name", "description", "precision", "totalSupply", "circulatingSupply", "socials")
+
+
+@dataclass(frozen=True)
+class Token:
+    address: str
+    symbol: str
+    name: str
+    network: str
+    precision: Optional[int] = None
+    description: Optional[str] = None
+    blacklisted: bool = False
+    details: Mapping[str, Any] = field(default_factory=dict, repr=False, compare=False)
+
+
+@dataclass(frozen=True)
+class TokenContext:
+    """
+    Token section for one prompt. `tokens` lists the selected addresses and is
+    empty when nothing matched and the full list was used instead.
+    """
+    prompt: str
+    tokens: Tuple[str, ...]
+    full_chars: int
+
+    @property
+    def saved_chars(self) -> int:
+        return self.full_chars - len(self.prompt)
+
+
+class TokenRegistry:
+    """
+    Immutable index over the TOKENS YAML document. Parsed once; lookups by contract
+    address and by case-insensitive symbol are dict hits, and the blacklist is a set.
+    """
+
+    def __init__(self, document: str):
+        data = yaml.safe_load(document) or {}
+        self._blacklist_order = tuple(data.get("blacklist") or [])
+        self.blacklist: FrozenSet[str] = frozenset(self._blacklist_order)
+
+        by_address: Dict[str, Dict[str, Token]] = {}
+        by_symbol: Dict[str, Dict[str, Token]] = {}
+        for network in (MAINNET, TESTNET):
+            by_address[network] = {}
+            by_symbol[network] = {}
+            for address, entry in (data.get(network) or {}).items():
+                entry = entry or {}
+                token = Token(
+                    address=address,
+                    symbol=str(entry.get("symbol") or address),
+                    name=str(entry.get("name") or entry.get("symbol") or address),
+                    network=network,
+                    precision=entry.get("precision"),
+                    description=entry.get("description"),
+                    blacklisted=address in self.blacklist,
+                    details=MappingProxyType(dict(entry)),
+                )
+                by_address[network][address] = token
+                # First listing wins if two tokens share a symbol
+                by_symbol[network].setdefault(token.symbol.lower(), token)
+
+        self._by_address = MappingProxyType({n: MappingProxyType(t) for n, t in by_address.items()})
+        self._by_symbol = MappingProxyType({n: MappingProxyType(t) for n, t in by_symbol.items()})
+        self._default_prompt: Optional[str] = None
+        # Lowercased names and symbols for fuzzy matching, mapped back to tokens
+        self._fuzzy_names: Dict[str, Token] = {}
+        for token in by_address[MAINNET].values():
+            self._fuzzy_names.setdefault(token.name.lower(), token)
+            self._fuzzy_names.setdefault(token.symbol.lower(), token)
+
+    def __len__(self) -> int:
+        return len(self._by_address[MAINNET])
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._by_address[MAINNET]
+
+    def tokens(self, network: str = MAINNET) -> List[Token]:
+        """
+        All tokens listed for a network, in document order.
+        """
+        return list(self._by_address[network].values())
+
+    def get(self, address: str, network: str = MAINNET) -> Optional[Token]:
+        """
+        Look up a token by contract address (e.g. "coin", "kaddex.kdx").
+        """
+        return self._by_address[network].get(address)
+
+    def by_symbol(self, symbol: str, network: str = MAINNET) -> Optional[Token]:
+        """
+        Look up a token by symbol, case-insensitively (e.g. "kda", "zUSD").
+        """
+        return self._by_symbol[network].get(symbol.lower())
+
+    def resolve(self, symbol_or_address: str, network: str = MAINNET) -> Optional[Token]:
+        """
+        Look up a token by contract address, falling back to symbol.
+        """
+        return self.get(symbol_or_address, network) or self.by_symbol(symbol_or_address, network)
+
+    def is_blacklisted(self, address: str) -> bool:
+        return address in self.blacklist
+
+    def to_prompt(self, tokens: Optional[Iterable[Token]] = None) -> str:
+        """
+        Render tokens (default: every token, mainnet and testnet) as YAML for a prompt,
+        grouped by network. Blacklisted tokens are listed only under the blacklist,
+        never as tradable entries.
+        """
+        if tokens is None:
+            # The full rendering never changes, so it is only built once
+            if self._default_prompt is None:
+                self._default_prompt = self._render(self.tokens(MAINNET) + self.tokens(TESTNET))
+            return self._default_prompt
+        return self._render(tokens)
+
+    def match(self, text: str) -> List[Token]:
+        """
+        Mainnet tokens mentioned in free text, by contract address, symbol or a close
+        match on the token name. Symbols of two characters or fewer must match case.
+        """
+        found: Dict[str, Token] = {}
+        for word in re.findall(r"[\w$.\-]+", text):
+            word = word.strip(".-")
+            if not word:
+                continue
+            token = self.get(word)
+            if token is None:
+                candidate = self.by_symbol(word)
+                if candidate is not None and (len(word) > 2 or candidate.symbol == word):
+                    token = candidate
+            if token is None and len(word) >= FUZZY_MIN_LENGTH:
+                close = difflib.get_close_matches(word.lower(), self._fuzzy_names, n=1, cutoff=FUZZY_CUTOFF)
+                if close:
+                    token = self._fuzzy_names[close[0]]
+            if token is not None:
+                found.setdefault(token.address, token)
+        return list(found.values())
+
+    def context_for(self, text: str) -> TokenContext:
+        """
+        Build the token section for a prompt about `text`: the mainnet tokens it
+        mentions plus the default set. Falls back to the full list, testnet included,
+        when nothing matches. Characters sent and saved are counted in metrics.
+        """
+        full = self.to_prompt()
+        matched = self.match(text)
+        if not matched:
+            context = TokenContext(prompt=full, tokens=(), full_chars=len(full))
+        else:
+            selected = {address: self.get(address) for address in DEFAULT_CONTEXT_TOKENS}
+            selected.update((token.address, token) for token in matched)
+            context = TokenContext(
+                prompt=self._render(selected.values()),
+                tokens=tuple(selected),
+                full_chars=len(full)
+            )
+        TOKEN_CONTEXT_CHARS.inc(len(context.prompt), kind="sent")
+        TOKEN_CONTEXT_CHARS.inc(max(0, context.saved_chars), kind="saved")
+        logger.info(
+            f"Token context: {len(context.tokens) or 'all'} tokens, "
+            f"{len(context.prompt)} chars (saved {context.saved_chars})"
+        )
+        return context
+
+    def _render(self, tokens: Iterable[Token]) -> str:
+        document: Dict[str, Any] = {MAINNET: {}}
+        for token in tokens:
+            if not token.blacklisted:
+                document.setdefault(token.network, {})[token.address] = {
+                    k: token.details[k] for k in PROMPT_FIELDS if token.details.get(k) not in (None, [], "")
+                }
+        document["blacklist"] = list(self._blacklist_order)
+        return yaml.safe_dump(document, sort_keys=False, allow_unicode=True, width=1000)
+
+
+# Built once at import time and shared by the agent and the API
+TOKEN_REGISTRY = TokenRegistry(TOKENS)
@@ -0,0 +1,198 @@
+import re
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from config import API_DOCS, DEFAULT_TOKEN_PRECISION, ENDPOINT_CHAIN_IDS, MAX_SLIPPAGE
+from errors import ErrorCode, tool_error
+from tokens import TOKEN_REGISTRY, Token, TokenRegistry
+
+CHAIN_ID = re.compile(r"[0-9]|1[0-9]")
+K_ACCOUNT = re.compile(r"k:[0-9a-fA-F]{64}")
+PUBLIC_KEY = re.compile(r"[0-9a-fA-F]{64}")
+
+# Parameters naming a token, and the amount parameters priced in each
+TOKEN_PARAMS = ("tokenAddress", "tokenInAddress", "tokenOutAddress")
+AMOUNT_TOKENS = {"amount": "tokenAddress", "amountIn": "tokenInAddress", "amountOut": "tokenOutAddress"}
+# Accounts that must be k: accounts; transfer senders may be any account name
+K_ACCOUNT_PARAMS = ("receiver", "account", "mintTo")
+
+
+@dataclass(frozen=True)
+class Diagnostic:
+    """
+    One problem with a transaction request: its error code, the parameter at
+    fault (empty for the request as a whole) and a message in the tool's error
+    style. `params` fill in the code's explanation template.
+    """
+    code: ErrorCode
+    param: str
+    message: str
+    params: Mapping[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"code": self.code.value, "param": self.param, "message": self.message, **dict(self.params)}
+
+
+@dataclass(frozen=True)
+class EndpointSpec:
+    required: Tuple[str, ...]
+    # Exactly one of these must be given (amountIn/amountOut)
+    one_of: Tuple[str, ...] = ()
+    chains: Optional[Tuple[str, ...]] = None
+
+
+def _specs(api_docs: Mapping[str, Any]) -> Dict[str, EndpointSpec]:
+    specs = {}
+    for doc in api_docs.values():
+        endpoint = doc["endpoint"].lstrip("/")
+        specs[endpoint] = EndpointSpec(
+            required=tuple(doc["required_params"]),
+            one_of=tuple(param["name"] for param in doc.get("conditional_params", [])),
+            chains=ENDPOINT_CHAIN_IDS.get(endpoint),
+        )
+    return specs
+
+
+def _amount(value: Any) -> Optional[Decimal]:
+    """
+    `value` as a finite Decimal, or None if it is not a number.
+    """
+    if isinstance(value, bool):
+        return None
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        return None
+    return amount if amount.is_finite() else None
+
+
+class TransactionValidator:
+    """
+    Checks kadena_transaction requests before any network I/O, using the
+    endpoint specs in API_DOCS and the token registry. Catches what the Kadena
+    API would reject: missing or conflicting parameters, unknown or blacklisted
+    tokens, malformed accounts and guards, non-positive amounts or amounts finer
+    than the token's precision, bad slippage and chains the endpoint is not on.
+    """
+
+    def __init__(self, api_docs: Mapping[str, Any] = API_DOCS, registry: TokenRegistry = TOKEN_REGISTRY):
+        self.specs = _specs(api_docs)
+        self.registry = registry
+
+    def validate(self, endpoint: str, body: Dict[str, Any]) -> List[Diagnostic]:
+        """
+        Every problem with the request, most basic first. Empty if it is valid.
+        """
+        spec = self.specs.get(endpoint)
+        if spec is None:
+            return [Diagnostic(ErrorCode.INVALID_ENDPOINT, "endpoint", f"Invalid endpoint. Must be one of: {set(self.specs)}")]
+
+        diagnostics = []
+        if spec.one_of:
+            given = [param for param in spec.one_of if param in body]
+            if len(given) > 1:
+                diagnostics.append(Diagnostic(ErrorCode.AMOUNT_CONFLICT, "amountIn", f"Cannot specify both amountIn and amountOut for {endpoint}"))
+            elif not given:
+                diagnostics.append(Diagnostic(ErrorCode.AMOUNT_MISSING, "amountIn", f"Must specify either amountIn or amountOut for {endpoint}"))
+
+        missing = [param for param in spec.required if param not in body]
+        if missing:
+            diagnostics.append(Diagnostic(ErrorCode.MISSING_PARAMS, missing[0], f"Missing required parameters: {missing}", {"missing": missing}))
+
+        if "chainId" in body:
+            diagnostics.extend(self._check_chain(endpoint, spec, body["chainId"]))
+        tokens = {}
+        for param in TOKEN_PARAMS:
+            if param in body:
+                diagnostic = self._check_token(param, body[param])
+                if diagnostic:
+                    diagnostics.append(diagnostic)
+                else:
+                    tokens[param] = self.registry.get(str(body[param]))
+        for param, token_param in AMOUNT_TOKENS.items():
+            if param in body:
+                diagnostics.extend(self._check_amount(param, body[param], tokens.get(token_param)))
+        diagnostics.extend(self._check_accounts(body))
+        if "slippage" in body:
+            slippage = _amount(body["slippage"])
+            if slippage is None or not 0 <= slippage <= Decimal(str(MAX_SLIPPAGE)):
+                diagnostics.append(Diagnostic(ErrorCode.INVALID_SLIPPAGE, "slippage", f"Invalid slippage. Must be between 0 and {MAX_SLIPPAGE}", {"slippage": body["slippage"]}))
+        if "guard" in body:
+            diagnostics.extend(self._check_guard(body["guard"]))
+        return diagnostics
+
+    def _check_chain(self, endpoint: str, spec: EndpointSpec, chain_id: Any) -> List[Diagnostic]:
+        chain = str(chain_id)
+        if not CHAIN_ID.fullmatch(chain):
+            return [Diagnostic(ErrorCode.INVALID_CHAIN, "chainId", "Invalid chainId. Must be between 0 and 19")]
+        if spec.chains and chain not in spec.chains:
+            return [Diagnostic(
+                ErrorCode.WRONG_CHAIN, "chainId", f"Invalid chainId for {endpoint}. Must be one of: {list(spec.chains)}",
+                {"chains": " or ".join(spec.chains)}
+            )]
+        return []
+
+    def _check_token(self, param: str, address: Any) -> Optional[Diagnostic]:
+        address = str(address)
+        if self.registry.is_blacklisted(address):
+            return Diagnostic(ErrorCode.BLACKLISTED_TOKEN, param, f"Token {address} is blacklisted and cannot be used", {"token": address})
+        if address not in self.registry:
+            # A symbol passed as the address is the usual mistake
+            token = self.registry.by_symbol(address)
+            suggestion = f" (did you mean {token.symbol}, `{token.address}`?)" if token and not token.blacklisted else ""
+            return Diagnostic(ErrorCode.UNKNOWN_TOKEN, param, f"Unknown token address: {address}", {"token": address, "suggestion": suggestion})
+        return None
+
+    def _check_amount(self, param: str, value: Any, token: Optional[Token]) -> List[Diagnostic]:
+        amount = _amount(value)
+        if amount is None or amount <= 0:
+            return [Diagnostic(ErrorCode.INVALID_AMOUNT, param, f"Invalid {param}: {value}", {"amount": value})]
+        if token is None:
+            return []
+        precision = token.precision if token.precision is not None else DEFAULT_TOKEN_PRECISION
+        decimals = -amount.normalize().as_tuple().exponent
+        if decimals > precision:
+            return [Diagnostic(
+                ErrorCode.AMOUNT_PRECISION, param, f"Invalid {param}: {token.symbol} has {precision} decimal places, {value} has {decimals}",
+                {"amount": value, "token": token.address, "precision": precision}
+            )]
+        return []
+
+    def _check_accounts(self, body: Dict[str, Any]) -> List[Diagnostic]:
+        diagnostics = []
+        for param in ("sender",) + K_ACCOUNT_PARAMS:
+            if param not in body:
+                continue
+            account = str(body[param])
+            # Senders may be named accounts, but a k: account must be a full public key
+            if param == "sender" and not account.startswith("k:") and account.strip():
+                continue
+            if not K_ACCOUNT.fullmatch(account):
+                diagnostics.append(Diagnostic(
+                    ErrorCode.INVALID_ACCOUNT, param, f"Invalid {param} account: {account}",
+                    {"details": f"{param} {account}"}
+                ))
+        return diagnostics
+
+    def _check_guard(self, guard: Any) -> List[Diagnostic]:
+        if not isinstance(guard, dict) or not guard.get("keys") or not guard.get("pred") or not isinstance(guard["keys"], list):
+            return [Diagnostic(ErrorCode.INVALID_GUARD, "guard", "Missing required guard parameters", {"details": "the guard must have a keys list and a pred"})]
+        if not all(isinstance(key, str) and PUBLIC_KEY.fullmatch(key) for key in guard["keys"]):
+            return [Diagnostic(ErrorCode.INVALID_GUARD, "guard", "Invalid guard keys", {"details": "guard keys must be 64-character hex public keys"})]
+        return []
+
+
+def validation_error(diagnostics: List[Diagnostic]) -> Optional[Dict[str, Any]]:
+    """
+    The tool's error dict for a failed validation: the first diagnostic as the
+    error, and all of them under `diagnostics`. None if there are none.
+    """
+    if not diagnostics:
+        return None
+    first = diagnostics[0]
+    return {**tool_error(first.code, first.message, **first.params), "diagnostics": [d.to_dict() for d in diagnostics]}
+
+
+# Built once at import time, like TOKEN_REGISTRY
+TRANSACTION_VALIDATOR = TransactionValidator()
@@ -1,26 +1,40 @@
+import asyncio
 import os
 import json
 import logging
-from typing import Dict, List, Any, Optional
-from fastapi import FastAPI, HTTPException
+import time
+import uuid
+from typing import Dict, List, Any, Literal, Optional
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('kadena_trader.log')
-    ]
-)
+from log_setup import configure_logging, request_id_var
+
+# Configure logging: JSON lines written by a background thread, rotated by size
+configure_logging('kadena_trader.log')
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
+from sessions import create_session_store, new_session_id
+from jobs import JobQueue, QueueFullError, create_job_store
+from metrics import REQUEST_SECONDS, collect_spans, render_metrics
+
+# Server-side prompt dialogue for clients that opt into sessions
+session_store = create_session_store()
+
+def _run_code_job(payload: Dict[str, Any], on_stage) -> Dict[str, Any]:
+    """Job handler for /code/jobs, run in a worker thread"""
+    from coder import code
+    return code(prompt=payload["prompt"], cache=payload["cache"], on_stage=on_stage)
+
+# Background /code generation for clients that submit and poll
+code_jobs = JobQueue(_run_code_job, create_job_store())
+
 # Initialize FastAPI
 app = FastAPI(
     title="Kadena Trader API",
@@ -37,13 +51,54 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    """Tag log records with a request id, log the duration and observe it in the HTTP latency histogram"""
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:16]
+    token = request_id_var.set(request_id)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, method=request.method, status=status)
+        logger.info("Request finished", extra={
+            "method": request.method, "endpoint": endpoint, "status": status, "duration_ms": round(elapsed * 1000, 1)
+        })
+        request_id_var.reset(token)
+
 class PromptRequest(BaseModel):
     prompt: str
     history: Optional[List[str]] = Field(default_factory=list)
+    session_id: Optional[str] = None  # Continue a server-side session; history is then not sent or returned
+    use_session: bool = False  # Start a new server-side session when no session_id is given
+    trace: bool = False  # Include per-stage timings (spans) in the response
 
 class CodeRequest(BaseModel):
     prompt: str
     history: Optional[List[str]] = Field(default_factory=list)
+    cache: Literal["default", "bypass"] = "default"  # "bypass" regenerates instead of serving cached code
+    trace: bool = False  # Include per-stage timings (spans) in the response
+
+@app.on_event("startup")
+async def startup():
+    """Start the code job workers"""
+    await code_jobs.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop the code job workers and release the session and job stores"""
+    await code_jobs.close()
+    await session_store.close()
+
+def _stage_summary(spans: List[Dict[str, Any]]) -> str:
+    return ", ".join(f"{s['stage']}={s['ms']}ms" for s in spans if "ms" in s) or "no stages"
 
 @app.get("/")
 async def health_check():
@@ -56,7 +111,7 @@ async def process_prompt(request: PromptRequest):
     Process a trading agent prompt, evaluate it, and provide improvement suggestions.
     
     Args:
-        request: PromptRequest containing the prompt and optional history
+        request: PromptRequest containing the prompt and optional history or session
         
     Returns:
         Dict containing the evaluation results and improvement suggestions
@@ -65,13 +120,39 @@ async def process_prompt(request: PromptRequest):
     
     try:
         from prompt import improve_prompt
-        result = improve_prompt(prompt=request.prompt, history=request.history)
-        logger.info("Prompt processing completed successfully")
+        session_id = request.session_id or (new_session_id() if request.use_session else None)
+        history = request.history
+        if session_id:
+            history = await session_store.get(session_id) or []
+
+        with collect_spans() as spans:
+            result = await asyncio.to_thread(improve_prompt, prompt=request.prompt, history=history)
+        logger.info(f"Prompt processing completed successfully: {_stage_summary(spans)}")
+        if request.trace:
+            result["spans"] = spans
+
+        if session_id:
+            await session_store.set(session_id, result.pop("history"))
+            result["session_id"] = session_id
         return result
     except Exception as e:
         logger.error(f"Error processing prompt: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.delete("/session/{session_id}", summary="End a server-side prompt session")
+async def end_session(session_id: str):
+    """
+    Delete a server-side prompt session.
+    
+    Args:
+        session_id: Session to delete
+        
+    Returns:
+        Dict confirming the deletion
+    """
+    await session_store.delete(session_id)
+    return {"status": "deleted", "session_id": session_id}
+
 @app.post("/code", summary="Generate code for a trading agent")
 async def generate_code(request: CodeRequest):
     """
@@ -87,13 +168,72 @@ async def generate_code(request: CodeRequest):
     
     try:
         from coder import code
-        result = code(prompt=request.prompt)
-        logger.info("Code generation completed successfully")
+        with collect_spans() as spans:
+            # In a worker thread, so job polls and stage callbacks aren't stuck behind the LLM calls
+            result = await asyncio.to_thread(code, prompt=request.prompt, cache=request.cache)
+        logger.info(f"Code generation completed successfully (cache: {result.get('cache')}): {_stage_summary(spans)}")
+        if request.trace:
+            result["spans"] = spans
         return result
     except Exception as e:
         logger.error(f"Error generating code: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/code/jobs", status_code=202, summary="Submit a code generation job")
+async def submit_code_job(request: CodeRequest):
+    """
+    Queue code generation and return immediately. Poll GET /code/jobs/{job_id}
+    for progress and the result.
+    
+    Args:
+        request: CodeRequest containing the prompt and optional cache mode
+        
+    Returns:
+        Dict containing the job id and its initial status
+    """
+    try:
+        job = await code_jobs.submit({"prompt": request.prompt, "cache": request.cache})
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=f"Too many queued jobs: {str(e)}")
+    logger.info(f"Queued code job {job['id']} for prompt: {request.prompt[:100]}...")
+    return {"job_id": job["id"], "status": job["status"], "poll": f"/code/jobs/{job['id']}"}
+
+@app.get("/code/jobs/{job_id}", summary="Get the status of a code generation job")
+async def get_code_job(job_id: str):
+    """
+    Get a job's status, the stages completed so far and, once finished, the
+    generated code (result) or error.
+    
+    Args:
+        job_id: Id returned by POST /code/jobs
+        
+    Returns:
+        Dict containing the job record
+    """
+    job = await code_jobs.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@app.get("/code/cache", summary="Generated code cache statistics")
+async def code_cache_stats():
+    """
+    Hit-rate counters and size of the generated code cache.
+
+    Returns:
+        Dict of counters, entry count and bytes used
+    """
+    from coder import CODE_CACHE
+    return CODE_CACHE.stats()
+
+@app.get("/metrics", summary="Prometheus metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Stage and request latency histograms and token counters, in the Prometheus
+    text format.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,36 @@
+import asyncio
+import time
+from typing import List
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for ChatOpenAI. Sleeps for `latency` seconds per call
+    plus `token_latency` per word of `content`, answers with `content` and records
+    the size of every prompt it receives.
+    """
+    model: str = "fake"
+    latency: float = 0.0
+    token_latency: float = 0.0
+    content: str = "{}"
+    prompt_chars: List[int] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        self.prompt_chars.append(sum(len(str(m.content)) for m in messages))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.content))])
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency + self.token_latency * len(self.content.split()))
+        return self._result(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency + self.token_latency * len(self.content.split()))
+        return self._result(messages)
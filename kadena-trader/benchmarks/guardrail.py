@@ -0,0 +1,64 @@
+"""
+/code latency and guardrail calls for clean vs faulty generated code.
+
+Fake models stand in for o4-mini (the generator) and gpt-5 (the guardrail), each
+with a fixed latency. For clean output the gpt-5 round trip is skipped, so /code
+costs one model call. For output with a const reassignment, one repair round runs
+on the failing snippet only and the result is re-validated. Before this change
+every request paid for both calls. Runs bypass the code cache, which points at a
+throwaway directory, so the faulty run is not served the clean run's entry.
+
+Usage (from kadena-trader/):
+    python -m benchmarks.guardrail --latency 0.5
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import coder
+from benchmarks.fakes import FakeChatModel
+from code_cache import CodeCache
+
+CLEAN = {
+    "code": "async function baselineFunction() {\n  const q = await quote({ tokenInAddress: 'coin', tokenOutAddress: 'kaddex.kdx', amountIn: '1', chainId: '2' });\n  let transaction = await swap({ tokenInAddress: 'coin', tokenOutAddress: 'kaddex.kdx', amountIn: '1', account: 'k:abc', chainId: '2' });\n  return transaction;\n}",
+    "interval": "setInterval(baselineFunction, 60 * 60 * 1000);"
+}
+FAULTY = {**CLEAN, "code": CLEAN["code"].replace("let transaction", "const transaction").replace("  return transaction;", "  transaction = transaction.transaction;\n  return transaction;")}
+
+
+def _run(generated, latency: float):
+    models = {
+        "o4-mini": FakeChatModel(model="o4-mini", latency=latency, content=json.dumps(generated), prompt_chars=[]),
+        "gpt-5": FakeChatModel(model="gpt-5", latency=latency, content=json.dumps({"code": CLEAN["code"]}), prompt_chars=[]),
+    }
+    coder.ChatOpenAI = lambda model, **kwargs: models[model]
+    start = time.perf_counter()
+    result = coder.code("Buy KDX with 1 KDA every hour", cache="bypass")
+    elapsed = time.perf_counter() - start
+    return result, elapsed, len(models["gpt-5"].prompt_chars), models["gpt-5"].prompt_chars
+
+
+def main(latency: float) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        coder.CODE_CACHE = CodeCache(coder.CODE_CACHE.version, path=os.path.join(tmp, "code_cache.sqlite3"))
+        for label, generated in (("clean", CLEAN), ("faulty", FAULTY)):
+            result, elapsed, guard_calls, guard_prompt_chars = _run(generated, latency)
+            print(
+                f"{label:<7} total={elapsed * 1000:7.1f}ms  gpt-5 calls={guard_calls}  "
+                f"guardrail prompt chars={sum(guard_prompt_chars)}  rounds={result['guardrail_rounds']}"
+            )
+            print(f"        timings_ms={result['timings_ms']}")
+            assert "warnings" not in result, result["warnings"]
+            if label == "clean":
+                assert guard_calls == 0, "clean code should not reach the guardrail"
+            else:
+                assert guard_calls == 1 and result["guardrail_rounds"] == 1, "faulty code should get one repair round"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per fake model call")
+    args = parser.parse_args()
+    main(args.latency)
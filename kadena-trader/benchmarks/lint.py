@@ -0,0 +1,86 @@
+"""
+Lint time against file size: the old regex _lint_check vs the single-pass AST linter.
+
+Generates trading snippets of increasing size (each block declares consts, an async
+helper and calls it) and times both linters. The regex version rescans the rest of
+the source for every const and async function, so it grows quadratically; the AST
+linter visits each node once. esprima parse time is reported separately since
+coder.py parses once for the syntax check and the linter reuses the tree.
+
+Usage (from kadena-trader/):
+    python -m benchmarks.lint --blocks 100 200 400 800
+"""
+import argparse
+import re
+import time
+
+import esprima
+
+from linter import lint
+
+BLOCK = """
+  const price{i} = await quote({{ tokenInAddress: "coin", tokenOutAddress: "kaddex.kdx", amountIn: "{i}", chainId: "2" }});
+  const limit{i} = {i} * 1.5;
+  async function step{i}(amount) {{
+    if (price{i}.amountOut > limit{i} && amount < 100) {{
+      return await swap({{ tokenInAddress: "coin", tokenOutAddress: "kaddex.kdx", amountIn: String(amount), chainId: "2" }});
+    }}
+    return null;
+  }}
+  let result{i} = await step{i}({i});
+"""
+
+
+def generate(blocks: int) -> str:
+    body = "".join(BLOCK.format(i=i) for i in range(blocks))
+    return f"async function baselineFunction() {{\n{body}}}\n"
+
+
+def regex_lint(js_code: str):
+    """The regex _lint_check this linter replaced, kept here for comparison."""
+    errors = []
+    for const_match in re.finditer(r'\bconst\s+([A-Za-z_$][0-9A-Za-z_$]*)', js_code):
+        name = const_match.group(1)
+        rest = js_code[const_match.end():]
+        if re.search(rf'\b{name}\s*=', rest):
+            errors.append(f"Cannot reassign const `{name}`")
+    for fn in re.findall(r'async function\s+([A-Za-z_$][0-9A-Za-z_$]*)', js_code):
+        calls = re.findall(rf'\b{fn}\(', js_code)
+        awaited = re.findall(rf'await\s+{fn}\(', js_code)
+        if calls and not awaited:
+            errors.append(f"Missing `await` for `{fn}()` call")
+    if "price" in js_code:
+        gt = bool(re.search(r'\bprice\W*>\W*\d', js_code))
+        lt = bool(re.search(r'\bprice\W*<\W*\d', js_code))
+        if gt and lt:
+            errors.append("Suspicious: both `price > x` and `price < y` found")
+    return errors
+
+
+def _time(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main(sizes) -> None:
+    print(f"{'blocks':>6}  {'lines':>6}  {'regex':>9}  {'parse':>9}  {'ast lint':>9}  {'ast/line':>9}")
+    for blocks in sizes:
+        source = generate(blocks)
+        lines = source.count("\n")
+        regex = _time(regex_lint, source)
+        start = time.perf_counter()
+        tree = esprima.parseScript(source, {"loc": True})
+        parse = time.perf_counter() - start
+        start = time.perf_counter()
+        errors = lint(tree)
+        ast = time.perf_counter() - start
+        assert not errors, errors
+        print(f"{blocks:>6}  {lines:>6}  {regex * 1000:>7.1f}ms  {parse * 1000:>7.1f}ms  {ast * 1000:>7.1f}ms  {ast / lines * 1e6:>7.2f}us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blocks", type=int, nargs="+", default=[100, 200, 400, 800])
+    args = parser.parse_args()
+    main(args.blocks)
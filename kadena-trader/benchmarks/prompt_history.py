@@ -0,0 +1,43 @@
+"""
+Prompt size over repeated improve_prompt rounds.
+
+Plays 20 refinement rounds against a fake model, feeding each round's history
+into the next, and prints the rendered prompt and history size per round. Before
+the fix each round stored the whole rendered prompt in history. The bound itself
+is checked in tests/test_history.py.
+
+Usage (from kadena-trader/):
+    python -m benchmarks.prompt_history --rounds 20
+"""
+import argparse
+import json
+
+import prompt
+from benchmarks.fakes import FakeChatModel
+from history import CHARS_PER_TOKEN, HISTORY_TOKEN_BUDGET
+
+RESULT = {
+    "rating": 6,
+    "justification": "The strategy is clear but the trade size and schedule are ambiguous.",
+    "questions": ["How much KDA should each purchase use?", "At what time of day should it run?"],
+}
+
+
+def main(args) -> None:
+    model = FakeChatModel(content=json.dumps(RESULT))
+    prompt.ChatOpenAI = lambda model_name=None, **kwargs: model
+
+    history = []
+    for round_number in range(1, args.rounds + 1):
+        draft = f"Agent Name: DCA bot\nStrategy: buy {round_number} KDA with zUSD every day at noon. " * 5
+        history = prompt.improve_prompt(prompt=draft, history=history)["history"]
+        print(f"round {round_number:>2}: prompt {model.prompt_chars[-1]:>6} chars, history {sum(map(len, history)):>6} chars")
+
+    bound = model.prompt_chars[0] + HISTORY_TOKEN_BUDGET * CHARS_PER_TOKEN
+    print(f"max prompt {max(model.prompt_chars)} chars, budget allows {bound}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,143 @@
+"""
+Offline /prompt and /code benchmark suite: latency percentiles, throughput and
+allocations, with no OpenAI calls.
+
+    prompt   improve_prompt scoring a draft, with a short dialogue history
+    code     coder.code generating clean code: one o4-mini call plus validation
+    repair   coder.code generating faulty code: adds a gpt-5 repair round
+
+Fake models answer after --llm-latency plus --token-latency per word. Each
+scenario runs --requests calls with --concurrency in flight on worker threads
+(the pipelines are blocking), then again under tracemalloc to measure
+allocations per request. /code runs with cache="bypass" against a throwaway
+cache file, so every call generates. Pass --output to save a JSON baseline.
+
+Usage (from kadena-trader/):
+    python -m benchmarks.suite --requests 100 --concurrency 4 --llm-latency 0.05
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+import coder
+import prompt
+from benchmarks.fakes import FakeChatModel
+from benchmarks.guardrail import CLEAN, FAULTY
+from benchmarks.prompt_history import RESULT
+from code_cache import CodeCache
+
+HISTORY = ["User: Buy KDA every day", "Agent K0: How much KDA should each purchase use?"]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of `samples`.
+    """
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def _use_models(args, generated: Dict[str, str]) -> None:
+    def fake(model: str = "fake", **kwargs) -> FakeChatModel:
+        if model == coder.GUARDRAIL_MODEL:
+            content = json.dumps({"code": CLEAN["code"]})
+        elif generated is None:
+            content = json.dumps(RESULT)
+        else:
+            content = json.dumps(generated)
+        return FakeChatModel(model=model, latency=args.llm_latency, token_latency=args.token_latency, content=content)
+
+    coder.ChatOpenAI = fake
+    prompt.ChatOpenAI = fake
+
+
+def _scenarios() -> Dict[str, Any]:
+    return {
+        "prompt": (None, lambda i: prompt.improve_prompt(f"Agent Name: DCA bot\nStrategy: buy {i} KDA with zUSD every day.", HISTORY)),
+        "code": (CLEAN, lambda i: coder.code(f"Buy KDX with {i} KDA every hour", cache="bypass")),
+        "repair": (FAULTY, lambda i: coder.code(f"Buy KDX with {i} KDA every hour", cache="bypass")),
+    }
+
+
+def _run(call: Callable[[int], Any], requests: int, concurrency: int) -> Dict[str, Any]:
+    def timed(i: int) -> float:
+        start = time.perf_counter()
+        result = call(i)
+        assert "error" not in result, result
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed, range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+        "throughput_rps": round(requests / elapsed, 2),
+    }
+
+
+def _allocations(call: Callable[[int], Any], requests: int) -> Dict[str, Any]:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        for i in range(requests):
+            call(i)
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    return {
+        "alloc_blocks_per_request": blocks // requests,
+        "peak_kib": round((peak - base) / 1024, 1),
+        "retained_kib_per_request": round((current - base) / 1024 / requests, 2),
+    }
+
+
+def main(args) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    scenarios = _scenarios()
+    with tempfile.TemporaryDirectory() as tmp:
+        coder.CODE_CACHE = CodeCache(coder.CODE_CACHE.version, path=os.path.join(tmp, "code_cache.sqlite3"))
+        for name in args.scenarios:
+            generated, call = scenarios[name]
+            _use_models(args, generated)
+            call(0)  # warm up
+            results[name] = _run(call, args.requests, args.concurrency)
+            results[name].update(_allocations(call, args.alloc_requests))
+
+    print(f"{'scenario':<10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'blocks/req':>11} {'peak KiB':>9}")
+    for name, r in results.items():
+        print(
+            f"{name:<10} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} "
+            f"{r['throughput_rps']:>9.1f} {r['alloc_blocks_per_request']:>11} {r['peak_kib']:>9.1f}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        print(f"saved {args.output}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(_scenarios()), default=list(_scenarios()))
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--alloc-requests", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per fake model call")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds per generated word")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    main(parser.parse_args())
@@ -1,6 +1,8 @@
 import os
 import json
-from typing import Dict, Any
+import logging
+import time
+from typing import Callable, Dict, Any, Tuple
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 import re
@@ -12,7 +14,11 @@ from langchain_openai import ChatOpenAI
 
 # Set your OpenAI API key
 from dotenv import load_dotenv
-from variables import TRANSACTIONS_CODE, TRANSACTIONS_USAGE, TOKENS, BASELINE_JS, PREDEFINED_PARAMETERS, CODER_PROMPT
+from variables import TRANSACTIONS_CODE, TRANSACTIONS_USAGE, BASELINE_JS, PREDEFINED_PARAMETERS, CODER_PROMPT, TOKENS
+from tokens import TOKEN_REGISTRY
+from linter import lint
+from code_cache import CodeCache, fingerprint
+from metrics import record_message_tokens, span
 
 # Load environment variables from .env file
 load_dotenv()
@@ -20,87 +26,110 @@ load_dotenv()
 # Get OpenAI API key from environment variables
 os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
 
+logger = logging.getLogger(__name__)
 
-def _syntax_check(js_code: str) -> str | None:
-    """Parse with esprima to catch syntax errors."""
-    print("🔍 Running syntax check…")
+# Maximum guardrail repair rounds before code is returned with warnings
+GUARDRAIL_MAX_ROUNDS = int(os.getenv("GUARDRAIL_MAX_ROUNDS", "2"))
+
+CODER_MODEL = "o4-mini"
+GUARDRAIL_MODEL = "gpt-5"
+
+# Validated outputs by prompt. The version changes whenever the prompts, docs, token
+# list or models change, so stale code is never served after a deploy.
+CODE_CACHE = CodeCache(fingerprint(
+    CODER_PROMPT, TRANSACTIONS_CODE, TRANSACTIONS_USAGE, BASELINE_JS, PREDEFINED_PARAMETERS, TOKENS,
+    CODER_MODEL, GUARDRAIL_MODEL
+))
+
+
+def _syntax_check(js_code: str) -> Tuple[Any, str | None]:
+    """Parse with esprima to catch syntax errors. Returns (tree, error); the tree is reused by the linter."""
+    logger.debug("Running syntax check")
     try:
-        esprima.parseScript(js_code)
-        print("✅ Syntax looks good")
-        return None
+        tree = esprima.parseScript(js_code, {"loc": True})
+        logger.debug("Syntax looks good")
+        return tree, None
     except Exception as e:
         err = str(e).split("\n")[0]
-        print(f"❌ Syntax error: {err}")
-        return err
+        logger.info(f"Syntax error: {err}")
+        return None, err
     
-def _lint_check(js_code: str) -> str | None:
+def _lint_check(tree: Any) -> str | None:
     """
-    Shallow lint via regex:
+    Lint the parsed tree in a single pass (see linter.py):
       - const reassignment
-      - missing await in async functions
-      - suspicious comparison operators
+      - missing await for async calls
+      - unbounded loops
+      - suspicious comparisons
     """
-    print("🔍 Running lint check…")
-    errors = []
+    if tree is None:
+        return None
+    logger.debug("Running lint check")
+    errors = lint(tree)
+    if errors:
+        logger.info(f"Lint issues found ({len(errors)}): {errors}")
+        return "\n".join(errors)
+    logger.debug("Lint looks good")
+    return None
 
-    # 1) const reassignment
-    for const_match in re.finditer(r'\bconst\s+([A-Za-z_$][0-9A-Za-z_$]*)', js_code):
-        name = const_match.group(1)
-        # look for a second assignment to that name
-        # ignore the declaration line
-        rest = js_code[const_match.end():]
-        if re.search(rf'\b{name}\s*=', rest):
-            errors.append(f"Cannot reassign const `{name}`")
-
-    # 2) missing await for async calls
-    async_funcs = re.findall(r'async function\s+([A-Za-z_$][0-9A-Za-z_$]*)', js_code)
-    for fn in async_funcs:
-        # if the function is invoked but never awaited
-        calls = re.findall(rf'\b{fn}\(', js_code)
-        awaited = re.findall(rf'await\s+{fn}\(', js_code)
-        if calls and not awaited:
-            errors.append(f"Missing `await` for `{fn}()` call")
-
-    # 3) wrong comparison direction (e.g. `>` instead of `<`) — heuristic
-    # If both `price > number` and `price < number` appear, warn
-    if "price" in js_code:
-        gt = bool(re.search(r'\bprice\W*>\W*\d', js_code))
-        lt = bool(re.search(r'\bprice\W*<\W*\d', js_code))
-        if gt and lt:
-            errors.append("Suspicious: both `price > x` and `price < y` found")
 
+def _token_check(js_code: str) -> str | None:
+    """
+    Flag string literals that name a blacklisted token contract.
+    """
+    errors = []
+    for literal in re.findall(r'["\'`]([^"\'`\s]+\.[^"\'`\s]+)["\'`]', js_code):
+        if TOKEN_REGISTRY.is_blacklisted(literal):
+            errors.append(f"Token `{literal}` is blacklisted and must not be traded")
     if errors:
-        print(f"❌ Lint issues found ({len(errors)}):", errors)
+        logger.info(f"Token issues found ({len(errors)}): {errors}")
         return "\n".join(errors)
-    print("✅ Lint looks good (shallow checks)")
     return None
 
 
-def _invoke_guardrail(original: dict, syntax_err: str | None, lint_err: str | None) -> dict:
-    print("🤖 Invoking guardrail model…")
-    guard = ChatOpenAI(model="gpt-5")
+def _validate(snippets: Dict[str, str]) -> Dict[str, str]:
+    """
+    Syntax, lint and token checks for each snippet ("code", "interval").
+    Returns diagnostics keyed by the snippets that fail; empty when all are clean.
+    """
+    failures = {}
+    for name, js_code in snippets.items():
+        tree, syntax_err = _syntax_check(js_code)
+        lint_err = _lint_check(tree)
+        token_err = _token_check(js_code)
+        if token_err:
+            lint_err = f"{lint_err}\n{token_err}" if lint_err else token_err
+        if syntax_err or lint_err:
+            failures[name] = f"Syntax errors: {syntax_err or 'None'}\nLint errors: {lint_err or 'None'}"
+    return failures
+
+
+def _invoke_guardrail(snippets: Dict[str, str], diagnostics: Dict[str, str]) -> Dict[str, str]:
+    """
+    Ask the guardrail model to repair only the failing snippets. Returns the
+    corrected snippets, keyed like `snippets`.
+    """
+    logger.info(f"Invoking guardrail model for {', '.join(snippets)}")
+    guard = ChatOpenAI(model=GUARDRAIL_MODEL)
     system = SystemMessage(
 """
 You are a JavaScript code specialist whose sole job is to correct and refine trading-agent snippets.
 
-You will receive JSON with these fields:
+You will receive one or both of these snippets, each with the errors found in it:
   • code       — the body of an async function baselineFunction()
   • interval   — the code that schedules baselineFunction()
 
-You may also receive:
-  • syntax_errors — a string describing any parser errors
-  • lint_errors   — a string describing any lint warnings
+Errors are given as:
+  • Syntax errors — parser errors
+  • Lint errors   — lint warnings, each with a line number
 
-Your job is to ensure that there are no errors in the code or logic and correct any issues/mistakes.
-Do not change the code unnecessarily, but fix any issues/mistakes.
+Your job is to fix the reported errors and any mistakes in the logic that cause them.
+Do not change the code unnecessarily.
 Ignore any undefined-reference errors (those functions live elsewhere).
 For any linting errors, consider whether the error is significant enough to break the code. If it is, fix it. If it is not, ignore it.
 
-If there are no errors, simply return the original code and interval.
-If there are errors, fix them and return the corrected code and interval.
-
 
-Output valid JSON with **only** `code` and `interval` fields.
+Output valid JSON with **only** the fields you received (`code`, `interval` or both).
 Do NOT include any markdown, comments, or extra keys—just the JSON.
 
 Output Format:
@@ -112,37 +141,71 @@ Output Format:
 ```
 """
     )
-    human = HumanMessage(
-        f"Here is the code:\n```js\n{original['code']}\n```\n"
-        f"Here is the interval:\n```js\n{original['interval']}\n```\n\n"
-        f"Syntax errors: {syntax_err or 'None'}\n"
-        f"Lint errors: {lint_err or 'None'}\n\n"
-    )
-    resp = guard.invoke([system, human]).content.strip()
+    human = HumanMessage("".join(
+        f"Here is the {name}:\n```js\n{snippet}\n```\n{diagnostics[name]}\n\n"
+        for name, snippet in snippets.items()
+    ))
+    with span("llm_guardrail", model=GUARDRAIL_MODEL, endpoint="code"):
+        message = guard.invoke([system, human])
+    record_message_tokens(GUARDRAIL_MODEL, message)
+    resp = message.content.strip()
     # strip markdown fences if present
     if resp.startswith("```"):
         resp = resp.strip("```json").strip("```").strip()
-    return json.loads(resp)
+    with span("json_parse", endpoint="code"):
+        repaired = json.loads(resp)
+    return {name: repaired.get(name, snippet) for name, snippet in snippets.items()}
+
 
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
 
-def code(prompt: str) -> Dict[str, Any]:
-    model = ChatOpenAI(model="o4-mini")
+
+def _no_stage(stage: str, data: Dict[str, Any]) -> None:
+    pass
+
+
+def code(prompt: str, cache: str = "default", on_stage: Callable[[str, Dict[str, Any]], None] = _no_stage) -> Dict[str, Any]:
+    """
+    Generate, validate and if needed repair trading-agent code for `prompt`.
+    Validated outputs are cached by prompt; pass cache="bypass" to regenerate.
+    `on_stage(name, data)` is called with partial results as each stage finishes.
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    if cache == "bypass":
+        CODE_CACHE.record_bypass()
+    else:
+        cached = CODE_CACHE.get(prompt)
+        if cached is not None:
+            logger.info("Serving validated code from cache")
+            timings["total"] = _elapsed_ms(started)
+            return {**cached, "guardrail_rounds": 0, "cache": "hit", "timings_ms": timings}
+
+    model = ChatOpenAI(model=CODER_MODEL)
 
     prompt_template = ChatPromptTemplate.from_messages([
     ("system", CODER_PROMPT),
     ("human", "{input}")
   ])
 
-    formatted_prompt = prompt_template.format(
-        input=prompt,
-        TOKENS=TOKENS,
-        TRANSACTIONS_CODE=TRANSACTIONS_CODE,
-        TRANSACTIONS_USAGE=TRANSACTIONS_USAGE,
-        BASELINE_JS=BASELINE_JS,
-        PREDEFINED_PARAMETERS=PREDEFINED_PARAMETERS
-    )
+    with span("prompt_render", endpoint="code"):
+        formatted_prompt = prompt_template.format(
+            input=prompt,
+            TOKENS=TOKEN_REGISTRY.context_for(prompt).prompt,
+            TRANSACTIONS_CODE=TRANSACTIONS_CODE,
+            TRANSACTIONS_USAGE=TRANSACTIONS_USAGE,
+            BASELINE_JS=BASELINE_JS,
+            PREDEFINED_PARAMETERS=PREDEFINED_PARAMETERS
+        )
 
-    response = model.invoke(formatted_prompt).content
+    stage = time.perf_counter()
+    with span("llm_generate", model=CODER_MODEL, endpoint="code"):
+        message = model.invoke(formatted_prompt)
+    timings["generate"] = _elapsed_ms(stage)
+    record_message_tokens(CODER_MODEL, message)
+    response = message.content
 
     if response.startswith('```json'):
         response = response.replace('```json', '').replace('```', '').strip()
@@ -150,18 +213,56 @@ def code(prompt: str) -> Dict[str, Any]:
         response = response.replace('```', '').strip()
 
     try:
-        result = json.loads(response)
+        with span("json_parse", endpoint="code"):
+            result = json.loads(response)
     except json.JSONDecodeError:
         return {"error": "Generated output not valid JSON", "raw": response}
 
-    code_str = result.get("code", "")
-    interval_str = result.get("interval", "")
+    snippets = {
+        "code": result.get("code", ""),
+        "interval": result.get("interval", "")
+    }
+    on_stage("generate", {**snippets, "ms": timings["generate"]})
+
+    # 1. Validate (syntax, lint, tokens)
+    stage = time.perf_counter()
+    with span("validate", endpoint="code"):
+        failures = _validate(snippets)
+    timings["validate"] = _elapsed_ms(stage)
+    on_stage("validate", {"failures": failures, "ms": timings["validate"]})
+
+    # 2. Repair only what fails, re-validating after each round
+    rounds = 0
+    while failures and rounds < GUARDRAIL_MAX_ROUNDS:
+        rounds += 1
+        stage = time.perf_counter()
+        try:
+            repaired = _invoke_guardrail({name: snippets[name] for name in failures}, failures)
+        except json.JSONDecodeError:
+            logger.warning("Guardrail output not valid JSON; keeping the last version")
+            timings[f"repair_{rounds}"] = _elapsed_ms(stage)
+            break
+        timings[f"repair_{rounds}"] = _elapsed_ms(stage)
+        snippets.update(repaired)
+        on_stage(f"repair_{rounds}", {**repaired, "ms": timings[f"repair_{rounds}"]})
+
+        stage = time.perf_counter()
+        with span("validate", endpoint="code"):
+            failures = _validate(repaired)
+        timings[f"revalidate_{rounds}"] = _elapsed_ms(stage)
+        on_stage(f"revalidate_{rounds}", {"failures": failures, "ms": timings[f"revalidate_{rounds}"]})
+
+    if not failures:
+        CODE_CACHE.put(prompt, snippets)
 
-    # 1. Syntax check
-    syntax_err = _syntax_check(code_str) or _syntax_check(interval_str)
-    # 2. Shallow lint
-    lint_err = _lint_check(code_str) or _lint_check(interval_str)
-    # 3. Always run guardrail
-    final = _invoke_guardrail(result, syntax_err, lint_err)
-    print("🎉 Guardrail complete; returning final code.")
+    timings["total"] = _elapsed_ms(started)
+    final = {**snippets, "guardrail_rounds": rounds, "cache": "bypass" if cache == "bypass" else "miss", "timings_ms": timings}
+    if failures:
+        # Out of repair rounds: return the best version with what is still wrong
+        final["warnings"] = failures
+        logger.warning(f"Returning code with unresolved issues after {rounds} repair round(s)")
+    elif rounds:
+        logger.info(f"Guardrail repaired the code in {rounds} round(s)")
+    else:
+        logger.info("Code is clean; skipped the guardrail")
     return final
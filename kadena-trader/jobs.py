@@ -0,0 +1,218 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+# "memory" or a redis:// URL shared by all workers
+JOB_STORE_URL = os.getenv("JOB_STORE_URL", "memory")
+# Concurrent /code jobs per process
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Queued jobs beyond which new submissions are refused
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "100"))
+# Seconds a job record is kept after it was submitted
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", "3600"))
+# In-memory store size before the oldest jobs are dropped
+JOB_MAX_ENTRIES = int(os.getenv("JOB_MAX_ENTRIES", "10000"))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+logger = logging.getLogger(__name__)
+
+# A job handler runs in a worker thread: handler(payload, on_stage) -> result
+Handler = Callable[[Dict[str, Any], Callable[[str, Dict[str, Any]], None]], Dict[str, Any]]
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while JOB_QUEUE_MAX jobs are waiting."""
+
+
+class JobStore(ABC):
+    """
+    Job records keyed by job id. A record is a JSON-serializable dict with id, status,
+    timestamps, the list of completed stages and, once finished, result or error.
+    """
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def set(self, job: Dict[str, Any]) -> None:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryJobStore(JobStore):
+    """
+    Jobs for a single worker process, dropped after `ttl` seconds or once
+    `max_entries` is reached, oldest first.
+    """
+
+    def __init__(self, max_entries: int = JOB_MAX_ENTRIES, ttl: float = JOB_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job is None or job["created_at"] + self.ttl < time.time():
+            return None
+        return json.loads(json.dumps(job))
+
+    async def set(self, job: Dict[str, Any]) -> None:
+        self._jobs[job["id"]] = job
+        while self._jobs:
+            oldest = next(iter(self._jobs.values()))
+            if len(self._jobs) <= self.max_entries and oldest["created_at"] + self.ttl >= time.time():
+                break
+            self._jobs.popitem(last=False)
+
+
+class RedisJobStore(JobStore):
+    """
+    Jobs in a Redis-compatible server, so any worker can answer a poll. Expiry is
+    left to the server via SET ... EX.
+    """
+
+    def __init__(self, url: str, ttl: float = JOB_TTL_SECONDS, prefix: str = "kadena-trader:job:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ImportError("JOB_STORE_URL points at Redis but the redis package is not installed") from e
+        self.ttl = int(ttl)
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self._client.get(self.prefix + job_id)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, job: Dict[str, Any]) -> None:
+        await self._client.set(self.prefix + job["id"], json.dumps(job), ex=self.ttl)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def create_job_store(url: str = JOB_STORE_URL) -> JobStore:
+    """
+    Build the store named by JOB_STORE_URL: "memory" (default) or a redis:// URL.
+    """
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        logger.info("Using Redis job store")
+        return RedisJobStore(url)
+    logger.info(f"Using in-memory job store (max {JOB_MAX_ENTRIES} jobs)")
+    return InMemoryJobStore()
+
+
+class JobQueue:
+    """
+    Bounded queue of jobs served by `workers` asyncio tasks. Each job runs `handler`
+    in a thread (the LLM pipeline is blocking), and every stage it reports is written
+    to the store as it happens, so pollers see partial progress.
+    """
+
+    def __init__(self, handler: Handler, store: JobStore, workers: int = JOB_WORKERS, max_queued: int = JOB_QUEUE_MAX):
+        self.handler = handler
+        self.store = store
+        self.workers = max(1, workers)
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=max_queued)
+        self._payloads: Dict[str, Dict[str, Any]] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.store.close()
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    async def submit(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue a job and return its initial record. Raises QueueFullError when full.
+        """
+        if self._queue.full():
+            raise QueueFullError(f"{self._queue.maxsize} jobs already queued")
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": QUEUED,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "stages": [],
+            "result": None,
+            "error": None
+        }
+        await self.store.set(job)
+        self._payloads[job["id"]] = payload
+        self._queue.put_nowait(job["id"])
+        return job
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            payload = self._payloads.pop(job_id)
+            try:
+                await self._run_job(job_id, payload)
+            except Exception as e:
+                # A store error (e.g. Redis down) must not end the worker
+                logger.error(f"Job {job_id} could not be run: {str(e)}", exc_info=True)
+
+    async def _run_job(self, job_id: str, payload: Dict[str, Any]) -> None:
+        loop = asyncio.get_running_loop()
+        job = await self.store.get(job_id)
+        if job is None:
+            # Expired while queued
+            return
+        try:
+            job.update(status=RUNNING, started_at=time.time())
+            await self.store.set(job)
+        except Exception:
+            job.update(status=FAILED, error="Job store unavailable", finished_at=time.time())
+            await self._save_failed(job)
+            raise
+
+        async def record_stage(stage: str, data: Dict[str, Any]) -> None:
+            job["stages"].append({"stage": stage, "at": time.time(), **data})
+            try:
+                await self.store.set(job)
+            except Exception as e:
+                # The stage is kept on the job and saved with the result
+                logger.warning(f"Job {job_id}: could not save stage {stage}: {str(e)}")
+
+        def on_stage(stage: str, data: Dict[str, Any]) -> None:
+            # Called from the handler thread; the job and store belong to the event loop
+            asyncio.run_coroutine_threadsafe(record_stage(stage, data), loop).result()
+
+        try:
+            result = await asyncio.to_thread(self.handler, payload, on_stage)
+            job.update(result=result, status=SUCCEEDED)
+            if isinstance(result, dict) and "error" in result:
+                job.update(status=FAILED, error=result["error"])
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}", exc_info=True)
+            job.update(status=FAILED, error=str(e))
+        job["finished_at"] = time.time()
+        await self.store.set(job)
+
+    async def _save_failed(self, job: Dict[str, Any]) -> None:
+        """
+        Best-effort save of a failed job, so polls don't see it queued forever.
+        """
+        try:
+            await self.store.set(job)
+        except Exception as e:
+            logger.error(f"Job {job['id']} could not be marked failed: {str(e)}")
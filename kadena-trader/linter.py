@@ -0,0 +1,378 @@
+"""
+Single-pass linter over the esprima AST of generated trading code.
+
+The tree is walked once with an explicit stack (no recursion limit on long
+expression chains). Scopes are tracked as the walk enters and leaves functions,
+blocks, loops and catch clauses. References are resolved when their scope closes,
+so hoisted declarations are handled. Each unresolved reference moves up one scope
+at a time until it is bound, so the cost is O(nodes + references × scope depth).
+Generated code nests a few scopes deep, so in practice that is close to linear.
+
+Checks:
+  - reassignment of a `const` binding
+  - async calls whose promise is dropped or stored without `await`, inside async functions
+  - loops with a constant-true condition and no break, return or throw
+  - suspicious comparisons: assignment used as a condition, comparisons with NaN or of
+    a value with itself, constant comparisons, and impossible `&&` ranges
+"""
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from esprima.nodes import Node
+
+# Async helpers provided by the execution environment (see TRANSACTIONS_CODE and BASELINE_JS)
+KNOWN_ASYNC_FUNCTIONS = frozenset({
+    "transfer", "swap", "quote", "makeRequest",
+    "getKeys", "getBalances", "signTransaction", "submitTransaction"
+})
+
+FUNCTION_TYPES = ("FunctionDeclaration", "FunctionExpression", "ArrowFunctionExpression")
+LOOP_TYPES = ("WhileStatement", "DoWhileStatement", "ForStatement", "ForInStatement", "ForOfStatement")
+SCOPE_TYPES = ("BlockStatement", "ForStatement", "ForInStatement", "ForOfStatement", "CatchClause")
+COMPARISON_OPERATORS = ("<", "<=", ">", ">=", "==", "===", "!=", "!==")
+LOWER_BOUND = (">", ">=")
+UPPER_BOUND = ("<", "<=")
+FLIPPED = {"<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+# Walk phases
+ENTER, EXIT = 0, 1
+
+
+class _Binding:
+    __slots__ = ("kind", "is_async")
+
+    def __init__(self, kind: str, is_async: bool = False):
+        self.kind = kind
+        self.is_async = is_async
+
+
+class _Scope:
+    __slots__ = ("parent", "is_function", "bindings", "refs")
+
+    def __init__(self, parent: Optional["_Scope"], is_function: bool):
+        self.parent = parent
+        self.is_function = is_function
+        self.bindings: Dict[str, _Binding] = {}
+        # (kind, name, line): kind is "assign" or "call"
+        self.refs: List[Tuple[str, str, int]] = []
+
+    def function_scope(self) -> "_Scope":
+        scope = self
+        while not scope.is_function:
+            scope = scope.parent
+        return scope
+
+
+class _Frame:
+    """
+    An enclosing loop, switch or function, used to see whether loops can exit.
+    """
+    __slots__ = ("kind", "label", "unbounded", "exits", "node")
+
+    def __init__(self, kind: str, node: Node, label: Optional[str] = None, unbounded: bool = False):
+        self.kind = kind
+        self.node = node
+        self.label = label
+        self.unbounded = unbounded
+        self.exits = False
+
+
+def _children(node: Node) -> Iterator[Node]:
+    for key, value in vars(node).items():
+        if key == "loc":
+            continue
+        if isinstance(value, Node):
+            yield value
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, Node):
+                    yield item
+
+
+def _pattern_names(pattern: Optional[Node]) -> Iterator[str]:
+    """
+    Names bound by an identifier or destructuring pattern.
+    """
+    stack = [pattern]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        if node.type == "Identifier":
+            yield node.name
+        elif node.type == "AssignmentPattern":
+            stack.append(node.left)
+        elif node.type == "RestElement":
+            stack.append(node.argument)
+        elif node.type == "ArrayPattern":
+            stack.extend(node.elements)
+        elif node.type == "ObjectPattern":
+            stack.extend(prop.argument if prop.type == "RestElement" else prop.value for prop in node.properties)
+
+
+def _line(node: Node) -> int:
+    return node.loc.start.line if node.loc else 0
+
+
+def _path(node: Node) -> Optional[str]:
+    """
+    Dotted name for an identifier or a non-computed member chain (`a.b.c`), else None.
+    """
+    parts = []
+    while node is not None and node.type == "MemberExpression" and not node.computed:
+        parts.append(node.property.name)
+        node = node.object
+    if node is None:
+        return None
+    if node.type == "Identifier":
+        parts.append(node.name)
+    elif node.type == "ThisExpression":
+        parts.append("this")
+    else:
+        return None
+    return ".".join(reversed(parts))
+
+
+def _is_constant_true(test: Optional[Node]) -> bool:
+    return test is None or (test.type == "Literal" and bool(test.value) and test.regex is None)
+
+
+def _is_nan(node: Node) -> bool:
+    return (node.type == "Identifier" and node.name == "NaN") or _path(node) == "Number.NaN"
+
+
+def _bound(node: Node) -> Optional[Tuple[str, str, float]]:
+    """
+    (subject, operator, number) for `subject <op> number` or `number <op> subject`,
+    normalized so the subject is on the left.
+    """
+    if node.type != "BinaryExpression" or node.operator not in FLIPPED:
+        return None
+    left, right, operator = node.left, node.right, node.operator
+    if left.type == "Literal" and right.type != "Literal":
+        left, right, operator = right, left, FLIPPED[operator]
+    subject = _path(left)
+    if subject is None or right.type != "Literal" or isinstance(right.value, bool) or not isinstance(right.value, (int, float)):
+        return None
+    return subject, operator, right.value
+
+
+class Linter:
+    """
+    One lint run over one parsed script. Use `lint(tree)` rather than this class.
+    """
+
+    def __init__(self):
+        self.errors: List[Tuple[int, str]] = []
+        self.scope: Optional[_Scope] = None
+        self.frames: List[_Frame] = []
+        self.async_stack: List[bool] = []
+
+    def error(self, message: str, node: Node) -> None:
+        self.report(message, _line(node))
+
+    def report(self, message: str, line: int) -> None:
+        self.errors.append((line, f"{message} (line {line})" if line else message))
+
+    # Scopes
+
+    def push_scope(self, is_function: bool) -> None:
+        self.scope = _Scope(self.scope, is_function)
+
+    def pop_scope(self) -> None:
+        scope = self.scope
+        for ref in scope.refs:
+            kind, name, line = ref
+            binding = scope.bindings.get(name)
+            if binding is None:
+                if scope.parent is not None:
+                    scope.parent.refs.append(ref)
+                elif kind == "call" and name in KNOWN_ASYNC_FUNCTIONS:
+                    self.report(f"Missing `await` for `{name}()` call", line)
+                continue
+            if kind == "assign" and binding.kind == "const":
+                self.report(f"Cannot reassign const `{name}`", line)
+            elif kind == "call" and binding.is_async:
+                self.report(f"Missing `await` for `{name}()` call", line)
+        self.scope = scope.parent
+
+    def declare(self, names: Iterator[str], kind: str, is_async: bool = False, function_scoped: bool = False) -> None:
+        scope = self.scope.function_scope() if function_scoped else self.scope
+        for name in names:
+            scope.bindings[name] = _Binding(kind, is_async)
+
+    def reference(self, kind: str, name: str, node: Node) -> None:
+        self.scope.refs.append((kind, name, _line(node)))
+
+    # Loop exits
+
+    def mark_exit(self, label: Optional[str], is_continue: bool = False) -> None:
+        """
+        Record a break (or labelled continue to an outer loop) leaving loops.
+        """
+        for frame in reversed(self.frames):
+            if frame.kind == "function":
+                return
+            if label is None and frame.kind in ("loop", "switch"):
+                frame.exits = True
+                return
+            if label is not None:
+                if frame.label == label:
+                    if not is_continue:
+                        frame.exits = True
+                    return
+                # Jumping to an outer label leaves this loop
+                frame.exits = True
+
+    def mark_return(self) -> None:
+        for frame in reversed(self.frames):
+            if frame.kind == "function":
+                return
+            frame.exits = True
+
+    # Walk
+
+    def run(self, tree: Node) -> List[str]:
+        self.push_scope(is_function=True)
+        self.async_stack.append(False)
+        self.frames.append(_Frame("function", tree))
+        labels: Dict[int, str] = {}
+        stack: List[Tuple[Node, Optional[Node], int]] = [(tree, None, ENTER)]
+        while stack:
+            node, parent, phase = stack.pop()
+            if phase == EXIT:
+                self.leave(node, parent)
+                continue
+            self.enter(node, parent, labels)
+            stack.append((node, parent, EXIT))
+            stack.extend((child, node, ENTER) for child in reversed(list(_children(node))))
+        self.pop_scope()
+        # Scope-resolved findings arrive late, so sort; drop repeated messages
+        return list(dict.fromkeys(message for _, message in sorted(self.errors, key=lambda e: e[0])))
+
+    def enter(self, node: Node, parent: Optional[Node], labels: Dict[int, str]) -> None:
+        kind = node.type
+        if kind in FUNCTION_TYPES:
+            if kind == "FunctionDeclaration" and node.id is not None:
+                self.declare([node.id.name], "function", node.isAsync, function_scoped=True)
+            self.push_scope(is_function=True)
+            if kind == "FunctionExpression" and node.id is not None:
+                self.declare([node.id.name], "function", node.isAsync)
+            for param in node.params:
+                self.declare(_pattern_names(param), "param")
+            self.async_stack.append(bool(node.isAsync))
+            self.frames.append(_Frame("function", node))
+        elif kind in SCOPE_TYPES and not (kind == "BlockStatement" and parent is not None and parent.type in FUNCTION_TYPES):
+            self.push_scope(is_function=False)
+            if kind == "CatchClause":
+                self.declare(_pattern_names(node.param), "param")
+
+        if kind in LOOP_TYPES:
+            unbounded = kind in ("WhileStatement", "DoWhileStatement", "ForStatement") and _is_constant_true(node.test)
+            self.frames.append(_Frame("loop", node, labels.pop(id(node), None), unbounded))
+            if kind in ("ForInStatement", "ForOfStatement") and node.left.type != "VariableDeclaration":
+                for name in _pattern_names(node.left):
+                    self.reference("assign", name, node)
+        elif kind == "SwitchStatement":
+            self.frames.append(_Frame("switch", node, labels.pop(id(node), None)))
+        elif kind == "LabeledStatement":
+            labels[id(node.body)] = node.label.name
+        elif kind == "BreakStatement":
+            self.mark_exit(node.label.name if node.label else None)
+        elif kind == "ContinueStatement" and node.label is not None:
+            self.mark_exit(node.label.name, is_continue=True)
+        elif kind in ("ReturnStatement", "ThrowStatement"):
+            self.mark_return()
+        elif kind == "VariableDeclaration":
+            for declarator in node.declarations:
+                init = declarator.init
+                is_async = init is not None and init.type in FUNCTION_TYPES and bool(init.isAsync)
+                self.declare(_pattern_names(declarator.id), node.kind, is_async, function_scoped=node.kind == "var")
+        elif kind == "ClassDeclaration" and node.id is not None:
+            self.declare([node.id.name], "class")
+        elif kind == "AssignmentExpression":
+            for name in _pattern_names(node.left):
+                self.reference("assign", name, node)
+        elif kind == "UpdateExpression" and node.argument.type == "Identifier":
+            self.reference("assign", node.argument.name, node)
+        elif kind == "CallExpression":
+            self.check_call(node, parent)
+        elif kind in ("BinaryExpression", "LogicalExpression"):
+            self.check_comparison(node)
+
+        if kind in ("IfStatement", "WhileStatement", "DoWhileStatement", "ForStatement", "ConditionalExpression"):
+            if node.test is not None and node.test.type == "AssignmentExpression" and node.test.operator == "=":
+                self.error("Suspicious: assignment `=` used as a condition; did you mean `===`?", node.test)
+
+    def leave(self, node: Node, parent: Optional[Node]) -> None:
+        kind = node.type
+        if kind in LOOP_TYPES or kind == "SwitchStatement":
+            frame = self.frames.pop()
+            if frame.unbounded and not frame.exits:
+                keyword = {"WhileStatement": "while (true)", "DoWhileStatement": "do … while (true)"}.get(kind, "for (;;)")
+                self.error(f"Unbounded loop: `{keyword}` has no break, return or throw", node)
+        if kind in FUNCTION_TYPES:
+            self.frames.pop()
+            self.async_stack.pop()
+            self.pop_scope()
+        elif kind in SCOPE_TYPES and not (kind == "BlockStatement" and parent is not None and parent.type in FUNCTION_TYPES):
+            self.pop_scope()
+
+    # Checks
+
+    def check_call(self, node: Node, parent: Optional[Node]) -> None:
+        """
+        Inside an async function, a call whose promise is discarded (expression
+        statement) or stored (variable initializer, assignment) needs an await.
+        """
+        if node.callee.type != "Identifier" or not self.async_stack[-1] or parent is None:
+            return
+        dropped = parent.type == "ExpressionStatement"
+        stored = (parent.type == "VariableDeclarator" and parent.init is node) or \
+                 (parent.type == "AssignmentExpression" and parent.right is node)
+        if dropped or stored:
+            self.reference("call", node.callee.name, node)
+
+    def check_comparison(self, node: Node) -> None:
+        if node.type == "LogicalExpression":
+            if node.operator == "&&":
+                self.check_range(node)
+            return
+        if node.operator not in COMPARISON_OPERATORS:
+            return
+        if _is_nan(node.left) or _is_nan(node.right):
+            self.error("Suspicious: comparison with NaN is always false; use Number.isNaN()", node)
+        elif node.left.type == "Literal" and node.right.type == "Literal":
+            self.error(f"Suspicious: constant comparison `{node.left.raw} {node.operator} {node.right.raw}`", node)
+        else:
+            left = _path(node.left)
+            if left is not None and left == _path(node.right):
+                self.error(f"Suspicious: `{left}` is compared with itself", node)
+
+    def check_range(self, node: Node) -> None:
+        """
+        `x > 10 && x < 5` can never be true, which usually means the bounds or the
+        comparison directions are swapped.
+        """
+        left, right = _bound(node.left), _bound(node.right)
+        if left is None or right is None or left[0] != right[0]:
+            return
+        lower, upper = (left, right) if left[1] in LOWER_BOUND else (right, left)
+        if lower[1] not in LOWER_BOUND or upper[1] not in UPPER_BOUND:
+            return
+        empty = lower[2] > upper[2] or (lower[2] == upper[2] and (lower[1] == ">" or upper[1] == "<"))
+        if empty:
+            self.error(
+                f"Suspicious: `{lower[0]} {lower[1]} {lower[2]} && {upper[0]} {upper[1]} {upper[2]}` is never true; "
+                f"check the comparison directions",
+                node
+            )
+
+
+def lint(tree: Optional[Node]) -> List[str]:
+    """
+    Lint a tree from esprima.parseScript(..., {"loc": True}). Returns messages,
+    empty when the code is clean.
+    """
+    if tree is None:
+        return []
+    return Linter().run(tree)
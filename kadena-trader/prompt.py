@@ -1,5 +1,6 @@
 import os
 import json
+import logging
 import requests
 from typing import Dict, List, Any, Optional, Union, Tuple
 
@@ -14,7 +15,10 @@ from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_core.runnables.history import RunnableWithMessageHistory
 # Set your OpenAI API key
 from dotenv import load_dotenv
-from variables import API_DOCS, TOKENS
+from history import compact_history, record_turn
+from variables import API_DOCS
+from tokens import TOKEN_REGISTRY
+from metrics import record_message_tokens, span
 
 # Load environment variables from .env file
 load_dotenv()
@@ -22,6 +26,8 @@ load_dotenv()
 # Get OpenAI API key from environment variables
 os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
 
+logger = logging.getLogger(__name__)
+
 
 OUTPUT_FORMAT = {
   "rating": "<1–10>",
@@ -33,12 +39,14 @@ OUTPUT_FORMAT = {
   ]
 }
 
+PROMPT_MODEL = "o4-mini"
+
 def improve_prompt(prompt: str, history: List[str] = None) -> Dict[str, Any]:
 
-    model = ChatOpenAI(model="o4-mini")
+    model = ChatOpenAI(model=PROMPT_MODEL)
 
-    if history is None:
-        history = []
+    # Older rounds are folded into a summary so the history stays within budget
+    history = compact_history(history or [])
 
     formatted_history = "\n".join(history) if history else "No previous conversation"
 
@@ -65,7 +73,7 @@ Previous Dialogue:
 Here are some resources to help you in your task:
   1. Documentation for Tokens:
     {TOKENS}
-  This documentation contains information about all the tokens on the Kadena blockchain, so you can validate any on-chain addresses or symbols the user provides.
+  This documentation contains the Kadena tokens relevant to this prompt (or all of them if none were mentioned), so you can validate any on-chain addresses or symbols the user provides.
   Assume that whenever USD is mentioned, the user is referring to zUSD.
   2. Onchain Information:
   The agent will be working on the Kadena blockchain (mainnet01) on Chain ID 2. The DEX used will be Agent K, a custom DEX built by Xade. Do not ask questions about this.
@@ -92,11 +100,15 @@ Output Format:
     ("human", "{input}")
 ])
     
-    formatted_prompt = prompt_template.format(input=prompt, HISTORY=formatted_history, TOKENS=TOKENS)
+    with span("prompt_render", endpoint="prompt"):
+        formatted_prompt = prompt_template.format(input=prompt, HISTORY=formatted_history, TOKENS=TOKEN_REGISTRY.context_for(prompt).prompt)
     
-    response = model.invoke(formatted_prompt).content
+    with span("llm_score", model=PROMPT_MODEL, endpoint="prompt"):
+        message = model.invoke(formatted_prompt)
+    record_message_tokens(PROMPT_MODEL, message)
+    response = message.content
 
-    print(response)
+    logger.info("Prompt model response", extra={"payload": response})
     
     # Handle JSON response wrapped in markdown code blocks
     if response.startswith('```json'):
@@ -104,12 +116,11 @@ Output Format:
     elif response.startswith('```'):
         response = response.replace('```', '').strip()
     
-    result = json.loads(response)
+    with span("json_parse", endpoint="prompt"):
+        result = json.loads(response)
     
-    history.extend([
-        "Human: "+formatted_prompt,
-        "AI: "+str(result)
-    ])
+    # Record only the user's draft and the structured result, never the rendered prompt
+    history = record_turn(history, prompt, result)
 
     return {
         "response": result,
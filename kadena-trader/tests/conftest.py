@@ -0,0 +1,4 @@
+import os
+
+# prompt.py and coder.py copy the key into os.environ at import; the tests never call OpenAI
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,45 @@
+import json
+
+import prompt
+from benchmarks.fakes import FakeChatModel
+from history import CHARS_PER_TOKEN, HISTORY_TOKEN_BUDGET, SUMMARY_PREFIX, compact_history, estimate_tokens
+
+RESULT = {
+    "rating": 6,
+    "justification": "The strategy is clear but the trade size and schedule are ambiguous.",
+    "questions": ["How much KDA should each purchase use?", "At what time of day should it run?"],
+}
+
+
+def _draft(round_number: int) -> str:
+    return f"Agent Name: DCA bot\nStrategy: buy {round_number} KDA with zUSD every day at noon. " * 5
+
+
+def test_history_within_budget_is_unchanged():
+    history = ["Human: buy KDA", "AI: " + json.dumps(RESULT)]
+    assert compact_history(history) == history
+
+
+def test_old_entries_fold_into_one_summary():
+    history = []
+    for round_number in range(30):
+        history += ["Human: " + _draft(round_number), "AI: " + json.dumps(RESULT)]
+
+    compacted = compact_history(history, budget=500)
+
+    assert compacted[0].startswith(SUMMARY_PREFIX)
+    assert not any(entry.startswith(SUMMARY_PREFIX) for entry in compacted[1:])
+    assert compacted[-1] == history[-1]
+    assert sum(estimate_tokens(entry) for entry in compacted) <= 500
+
+
+def test_prompt_stays_bounded_over_rounds(monkeypatch):
+    model = FakeChatModel(content=json.dumps(RESULT), prompt_chars=[])
+    monkeypatch.setattr(prompt, "ChatOpenAI", lambda model_name=None, **kwargs: model)
+
+    history = []
+    for round_number in range(1, 21):
+        history = prompt.improve_prompt(prompt=_draft(round_number), history=history)["history"]
+
+    # The prompt may grow by at most the history budget over the first round
+    assert max(model.prompt_chars) <= model.prompt_chars[0] + HISTORY_TOKEN_BUDGET * CHARS_PER_TOKEN
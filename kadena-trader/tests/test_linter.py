@@ -0,0 +1,125 @@
+import esprima
+import pytest
+
+from linter import lint
+
+
+def _lint(js: str):
+    return lint(esprima.parseScript(js, {"loc": True}))
+
+
+def _assert_one(js: str, fragment: str):
+    errors = _lint(js)
+    assert len(errors) == 1 and fragment in errors[0], errors
+
+
+# const reassignment
+
+@pytest.mark.parametrize("js", [
+    "const a = 1; a = 2;",
+    "const a = 1; a++;",
+    "const a = 1; a += 2;",
+    "const [a, b] = [1, 2]; b = 3;",
+    "const a = 1; function f() { a = 2; }",
+    "const a = []; for (a of [1]) {}",
+    "const k = ''; for (k in {}) {}",
+])
+def test_const_reassignment(js):
+    _assert_one(js, "Cannot reassign const")
+
+
+@pytest.mark.parametrize("js", [
+    # The old regex lint flagged these: the same name declared in separate scopes
+    "function f() { const tx = 1; return tx; } function g() { let tx = 2; tx = 3; return tx; }",
+    "const x = 1; { let x = 2; x = 3; }",
+    "const x = 1; function f(x) { x = 2; }",
+    "const e = 1; try {} catch (e) { e = 2; }",
+    "const a = { n: 1 }; a.n = 2;",
+    "for (const item of [1, 2]) { let total = item; total = 0; }",
+])
+def test_no_const_reassignment(js):
+    assert _lint(js) == []
+
+
+# un-awaited async calls
+
+@pytest.mark.parametrize("js", [
+    "async function main() { swap({}); }",
+    "async function main() { const t = transfer({}); return t; }",
+    "async function main() { let q; q = quote({}); return q; }",
+    "async function helper() {} async function main() { helper(); }",
+    "const helper = async () => 1; async function main() { helper(); }",
+])
+def test_missing_await(js):
+    _assert_one(js, "Missing `await`")
+
+
+@pytest.mark.parametrize("js", [
+    "async function main() { await swap({}); const q = await quote({}); return q; }",
+    # Only async functions are checked
+    "function main() { swap({}); }",
+    # A local non-async function shadows the environment's swap
+    "async function main() { function swap() {} swap(); }",
+    # Passing the promise on is fine
+    "async function main() { return Promise.all([quote({}), quote({})]); }",
+])
+def test_no_missing_await(js):
+    assert _lint(js) == []
+
+
+# unbounded loops
+
+@pytest.mark.parametrize("js, keyword", [
+    ("while (true) { tick(); }", "while (true)"),
+    ("for (;;) { tick(); }", "for (;;)"),
+    ("do { tick(); } while (1);", "do … while (true)"),
+    # The nested break leaves the inner loop, not the outer one
+    ("while (true) { for (;;) { break; } }", "while (true)"),
+    # The break leaves the switch
+    ("while (true) { switch (a) { case 1: break; } }", "while (true)"),
+    # A return inside a nested function does not leave the loop
+    ("while (true) { const f = () => { return 1; }; }", "while (true)"),
+])
+def test_unbounded_loop(js, keyword):
+    _assert_one(js, f"`{keyword}` has no break")
+
+
+@pytest.mark.parametrize("js", [
+    "while (true) { if (done) break; }",
+    "while (true) { if (done) { for (const x of xs) {} break; } }",
+    "outer: while (true) { while (true) { break outer; } }",
+    "function f() { while (true) { return 1; } }",
+    "while (true) { throw new Error('stop'); }",
+    "while (i < 10) { i++; }",
+])
+def test_bounded_loop(js):
+    assert _lint(js) == []
+
+
+# suspicious comparisons
+
+@pytest.mark.parametrize("js, fragment", [
+    ("if (x === NaN) {}", "comparison with NaN"),
+    ("if (price != Number.NaN) {}", "comparison with NaN"),
+    ("if (x > 10 && x < 5) {}", "is never true"),
+    ("if (x > 5 && x < 5) {}", "is never true"),
+    ("if (10 < x && x < 5) {}", "is never true"),
+    ("if (a.b === a.b) {}", "compared with itself"),
+    ("if (1 === 2) {}", "constant comparison"),
+    ("if (a = 1) {}", "assignment `=` used as a condition"),
+])
+def test_suspicious_comparison(js, fragment):
+    _assert_one(js, fragment)
+
+
+@pytest.mark.parametrize("js", [
+    "if (Number.isNaN(x)) {}",
+    "if (x > 5 && x < 10) {}",
+    "if (x >= 5 && x <= 5) {}",
+    "if (x > 10 && y < 5) {}",
+    "if (x > 10 || x < 5) {}",
+    "if (a.b === a.c) {}",
+    "if ((a = next()) !== null) {}",
+])
+def test_no_suspicious_comparison(js):
+    assert _lint(js) == []
@@ -727,7 +727,7 @@ CODER_PROMPT = """
         This contains examples to call/access the various endpoints of the Transactions API.
       3. Documentation for Tokens:
         {TOKENS}
-        This documentation contains information about all the tokens on the Kadena Blockchain.
+        This documentation contains the Kadena tokens relevant to this prompt (or all of them if none were mentioned).
      4. Predefined Parameters:
         {PREDEFINED_PARAMETERS}
         This documentation contains information about some variables that are predefined within the execution environment.